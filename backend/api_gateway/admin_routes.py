@@ -1,5 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from backend.utils.db_utils import get_db_connection,verify_jwt_token
+from external_integrations.maps.main import route_cache
+from backend.utils.surge_engine import surge_engine
+from backend.gamification.app import get_leaderboard_engine, update_driver_acceptance
+from .models import AcceptanceUpdateRequest
 
 
 router = APIRouter()
@@ -83,4 +87,40 @@ async def get_all_trips(user_data: dict = Depends(verify_jwt_token)):
         return trips
     finally:
         cursor.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+@router.get("/route-cache")
+async def get_route_cache_stats(user_data: dict = Depends(verify_jwt_token)):
+    if user_data['user_type'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Unauthorized"
+        )
+    
+    return route_cache.stats()
+
+@router.get("/surge")
+async def get_surge_zones(user_data: dict = Depends(verify_jwt_token)):
+    if user_data['user_type'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Unauthorized"
+        )
+    
+    return surge_engine.snapshot()
+
+@router.put("/drivers/{driver_id}/acceptance")
+def update_acceptance_rates(driver_id: str, request: AcceptanceUpdateRequest, user_data: dict = Depends(verify_jwt_token)):
+    """Set a driver's acceptance rates (driver_data id, e.g. DRV0001); the leaderboard re-ranks them in place"""
+    if user_data['user_type'] != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Unauthorized"
+        )
+    
+    if not update_driver_acceptance(driver_id, request.base_acceptance_rate, request.peak_acceptance_rate):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Driver not found"
+        )
+    return get_leaderboard_engine().get(driver_id)
@@ -11,6 +11,7 @@ from  backend.prebooking.app import router as prebooking_router
 from backend.gamification.app import router as gamification_router
 from .realtime_voting_routes import router as realtime_voting_router
 from .recommender_routes import router as recommender_router
+from .maps_routes import router as maps_router
 
 app = FastAPI(
     title="Namma Yatri API",
@@ -39,6 +40,7 @@ app.include_router(prebooking_router, prefix="/api/prebooking", tags=["Prebookin
 app.include_router(gamification_router, prefix="/api/gamification", tags=["Gamification"])
 app.include_router(realtime_voting_router, prefix="/api/realtime-voting", tags=["Realtime Voting"])
 app.include_router(recommender_router, prefix="/api/recommender", tags=["Recommender"])
+app.include_router(maps_router, prefix="/api/maps", tags=["Maps"])
 
 # Root endpoint
 @app.get("/")
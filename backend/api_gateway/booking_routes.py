@@ -1,5 +1,68 @@
-from fastapi import APIRouter
+import mysql.connector
+from fastapi import APIRouter, Depends, HTTPException, status
+from .models import RideTransitionRequest
+from backend.utils.db_utils import verify_jwt_token
+from backend.utils.ride_lifecycle import SYSTEM_ACTIONS, TRANSITIONS, TransitionError, get_ride_state, transition_ride
+from backend.utils.driver_reservations import close_offer, end_ride, recover_offers, redispatch_ride, release_driver
+from backend.gamification.app import record_completed_ride
 
 router = APIRouter()
 
-# Add booking-related routes here
\ No newline at end of file
+ERROR_STATUS = {
+    "not_found": status.HTTP_404_NOT_FOUND,
+    "invalid": status.HTTP_409_CONFLICT,
+    "conflict": status.HTTP_409_CONFLICT,
+    "driver_busy": status.HTTP_409_CONFLICT,
+    "forbidden": status.HTTP_403_FORBIDDEN,
+}
+
+@router.on_event("startup")
+def recover_ride_offers():
+    """Re-arm the timeouts of offers made before a restart, so no driver is left waiting on one"""
+    try:
+        print(f"Recovered {recover_offers()} ride offer timeouts")
+    except mysql.connector.Error as e:
+        print(f"Could not recover ride offers: {e}")
+
+@router.get("/rides/{ride_id}")
+async def get_ride(ride_id: int, user_data: dict = Depends(verify_jwt_token)):
+    ride = get_ride_state(ride_id)
+    if not ride:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ride not found")
+    if user_data['user_id'] not in (ride['customer_id'], ride['driver_id']) and user_data['user_type'] != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized")
+    return ride
+
+@router.post("/rides/{ride_id}/{action}")
+def change_ride_status(ride_id: int, action: str, request: RideTransitionRequest = None,
+                       user_data: dict = Depends(verify_jwt_token)):
+    """accept / decline / start / complete / cancel. Pass the last seen `version` to fail on concurrent edits."""
+    if action not in TRANSITIONS or action in SYSTEM_ACTIONS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown action '{action}'")
+    if action != "cancel" and user_data['user_type'] != 'driver':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only drivers can do this")
+
+    try:
+        ride = transition_ride(ride_id, action, user_data['user_id'], request.version if request else None)
+    except TransitionError as e:
+        detail = {"reason": e.reason, "message": str(e)}
+        if e.ride:
+            detail.update(status=e.ride["status"], version=e.ride["version"])
+        raise HTTPException(status_code=ERROR_STATUS[e.reason], detail=detail)
+
+    if action == "accept":
+        close_offer(ride_id)
+    elif action == "decline":
+        # The driver was only held by the dispatch reservation; the ride goes to the next one
+        release_driver(ride_id, user_data['user_id'])
+        redispatch_ride(ride_id)
+    elif action == "cancel" and ride["previous_status"] == "pending":
+        close_offer(ride_id)
+        if ride["driver_id"] is not None:
+            release_driver(ride_id, ride["driver_id"])
+    elif ride["status"] in ("completed", "cancelled"):
+        # The lifecycle has freed the driver; their dispatch claim goes too
+        end_ride(ride_id, ride["driver_id"])
+    if ride["status"] == "completed":
+        record_completed_ride(ride["driver_id"])
+    return ride
@@ -1,9 +1,32 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
 from .models import CustomerRequest
-from backend.utils.db_utils import get_customer_location, update_customer_location, generate_random_bengaluru_location, get_nearest_driver, book_ride_with_coords, verify_jwt_token
+from backend.utils.db_utils import get_customer_location, update_customer_location, generate_random_bengaluru_location, get_nearest_available_drivers, book_ride_with_coords, verify_jwt_token, get_available_drivers_in_box
+from backend.utils.geofence import ward_of
+from backend.utils.driver_reservations import availability_writer, driver_reservations, offer_ride
+from backend.utils.batch_dispatch import DISPATCH_MODE, BatchDispatcher
+from backend.utils.surge_engine import surge_engine
 
 router = APIRouter()
 
+batch_dispatcher = None
+
+def get_batch_dispatcher():
+    global batch_dispatcher
+    if batch_dispatcher is None:
+        batch_dispatcher = BatchDispatcher(get_available_drivers_in_box, driver_reservations)
+    return batch_dispatcher
+
+async def claim_batched_driver(customer_id, latitude, longitude):
+    """Wait for the customer's dispatch window to close and return (driver_id, token)."""
+    match = await asyncio.wrap_future(get_batch_dispatcher().submit(customer_id, latitude, longitude))
+    if match is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No drivers available"
+        )
+    return match["driver_id"], match["token"]
+
 @router.get("/{customer_id}/location")
 async def get_customer_location_api(customer_id: int, user_data: dict = Depends(verify_jwt_token)):
     if user_data['user_id'] != customer_id and user_data['user_type'] != 'admin':
@@ -14,6 +37,7 @@ async def get_customer_location_api(customer_id: int, user_data: dict = Depends(
     
     location = get_customer_location(customer_id)
     if location:
+        location["ward"] = ward_of(location["latitude"], location["longitude"])
         return location
     else:
         raise HTTPException(
@@ -38,6 +62,7 @@ async def refresh_customer_location(customer_id: int, user_data: dict = Depends(
     )
     
     if result:
+        new_location["ward"] = ward_of(new_location["latitude"], new_location["longitude"])
         return new_location
     else:
         raise HTTPException(
@@ -53,14 +78,34 @@ async def request_ride(customer_id: int, request: CustomerRequest, user_data: di
             detail="Unauthorized"
         )
     
-    drivers = get_nearest_driver(customer_id)
-    if not drivers:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No drivers available"
-        )
+    # The pickup point is resolved once and shared by surge demand and driver search
+    if request.pickup_lat is not None and request.pickup_lng is not None:
+        pickup_lat, pickup_lng = request.pickup_lat, request.pickup_lng
+    else:
+        location = get_customer_location(customer_id)
+        pickup_lat, pickup_lng = float(location["latitude"]), float(location["longitude"])
+    
+    # Demand for surge pricing counts every request, including ones no driver can take
+    surge_engine.record_request(pickup_lat, pickup_lng)
     
-    driver_id = drivers[0]['driver_id']
+    if DISPATCH_MODE == "batch":
+        driver_id, token = await claim_batched_driver(customer_id, pickup_lat, pickup_lng)
+    else:
+        drivers = get_nearest_available_drivers(pickup_lat, pickup_lng)
+        if not drivers:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No drivers available"
+            )
+        
+        # Claim the nearest driver nobody else is dispatching to; a Redis SET NX per candidate
+        token = driver_reservations.new_token()
+        driver_id = driver_reservations.claim_first([driver['driver_id'] for driver in drivers], token)
+        if driver_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="All nearby drivers are busy, please retry"
+            )
     
     ride_id = book_ride_with_coords(
         customer_id, 
@@ -73,6 +118,8 @@ async def request_ride(customer_id: int, request: CustomerRequest, user_data: di
     )
     
     if ride_id:
+        offer_ride(ride_id, driver_id, token)
+        availability_writer.set_available(driver_id, False)
         return {
             'ride_id': ride_id,
             'driver_id': driver_id,
@@ -80,6 +127,7 @@ async def request_ride(customer_id: int, request: CustomerRequest, user_data: di
             'destination': request.destination
         }
     else:
+        driver_reservations.release(driver_id, token)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to book ride"
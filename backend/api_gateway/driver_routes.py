@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from .models import StatusUpdateRequest
 from backend.utils.db_utils import get_driver_location, update_driver_location, generate_random_bengaluru_location, get_db_connection, verify_jwt_token
+from backend.utils.geofence import ward_of
+from data_processing.kafka_producer import emit_event
 
 router = APIRouter()
 
@@ -14,6 +16,7 @@ async def get_driver_location_api(driver_id: int, user_data: dict = Depends(veri
     
     location = get_driver_location(driver_id)
     if location:
+        location["ward"] = ward_of(location["latitude"], location["longitude"])
         return location
     else:
         raise HTTPException(
@@ -38,6 +41,7 @@ async def refresh_driver_location(driver_id: int, user_data: dict = Depends(veri
     )
     
     if result:
+        new_location["ward"] = ward_of(new_location["latitude"], new_location["longitude"])
         return new_location
     else:
         raise HTTPException(
@@ -88,6 +92,7 @@ async def update_driver_status(driver_id: int, request: StatusUpdateRequest, use
             (request.is_available, driver_id)
         )
         conn.commit()
+        emit_event("driver_status", driver_id=driver_id, is_available=request.is_available)
         
         return {'message': 'Status updated successfully'}
     except Exception as e:
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from backend.utils.db_utils import verify_jwt_token
+from external_integrations.maps.matrix import distance_matrix, to_json_matrix
+from backend.utils.geofence import get_ward_index
+from .models import MatrixRequest, WardLookupRequest
+
+router = APIRouter()
+
+# Plain def: road mode runs many graph searches, so FastAPI runs it in its threadpool
+# instead of on the event loop
+@router.post("/matrix")
+def get_distance_matrix(request: MatrixRequest, user_data: dict = Depends(verify_jwt_token)):
+    if request.mode not in ("auto", "road", "haversine"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="mode must be auto, road or haversine"
+        )
+
+    try:
+        matrix = distance_matrix(
+            [point.model_dump() for point in request.origins],
+            [point.model_dump() for point in request.destinations],
+            mode=request.mode,
+            max_eta_min=request.max_eta_min,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    return {
+        "mode": matrix["mode"],
+        "distances_km": to_json_matrix(matrix["distances_km"]),
+        "durations_min": to_json_matrix(matrix["durations_min"], digits=2),
+    }
+
+def _ward_index():
+    index = get_ward_index()
+    if index is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ward boundaries have not been loaded"
+        )
+    return index
+
+@router.get("/ward")
+async def get_ward(lat: float, lng: float, user_data: dict = Depends(verify_jwt_token)):
+    return {"ward": _ward_index().ward_of(lat, lng)}
+
+@router.post("/wards")
+async def get_wards(request: WardLookupRequest, user_data: dict = Depends(verify_jwt_token)):
+    wards = _ward_index().wards_of([point.latitude for point in request.points],
+                                   [point.longitude for point in request.points])
+    return {"wards": wards}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import List, Optional
 
 class LoginRequest(BaseModel):
     email: str
@@ -23,4 +23,24 @@ class StatusUpdateRequest(BaseModel):
 
 class PriceVoteRequest(BaseModel):
     driver_id: int
-    vote: int  # 1 for increase, -1 for decrease
\ No newline at end of file
+    vote: int  # 1 for increase, -1 for decrease
+
+class AcceptanceUpdateRequest(BaseModel):
+    base_acceptance_rate: Optional[float] = Field(None, ge=0, le=1)
+    peak_acceptance_rate: Optional[float] = Field(None, ge=0, le=1)
+
+class RideTransitionRequest(BaseModel):
+    version: Optional[int] = None  # last seen ride version, for compare-and-set
+
+class MatrixPoint(BaseModel):
+    latitude: float
+    longitude: float
+
+class MatrixRequest(BaseModel):
+    origins: List[MatrixPoint] = Field(..., min_length=1, max_length=200)
+    destinations: List[MatrixPoint] = Field(..., min_length=1, max_length=2000)
+    mode: str = "auto"  # auto, road or haversine
+    max_eta_min: Optional[float] = None
+
+class WardLookupRequest(BaseModel):
+    points: List[MatrixPoint] = Field(..., min_length=1, max_length=100000)
@@ -1,5 +1,4 @@
-from fastapi import APIRouter
+from backend.realtime_voting.app import router
 
-router = APIRouter()
-
-# Add realtime voting-related routes here
\ No newline at end of file
+# Realtime voting routes live with the hub in backend.realtime_voting
+__all__ = ["router"]
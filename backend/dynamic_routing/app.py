@@ -1,19 +1,22 @@
 from fastapi import FastAPI, HTTPException, APIRouter
 from pydantic import BaseModel
+from typing import Optional
 import pandas as pd
 import numpy as np
-import redis
 import networkx as nx
 from sklearn.ensemble import RandomForestRegressor
 import os
+from backend.utils.redis_client import get_redis_client
+from .votes import VoteAggregator, DEFAULT_WINDOW
 
 
 router=APIRouter()
 
 # Load demand data
 base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..",".."))
-hourly_demand_path = os.path.join(base_dir, "datasets", "hourly_demand_data.csv")
-od_flows_path = os.path.join(base_dir, "datasets", "od_flows_data.csv")
+datasets_dir = os.getenv("DATASETS_DIR", os.path.join(base_dir, "datasets"))
+hourly_demand_path = os.path.join(datasets_dir, "hourly_demand_data.csv")
+od_flows_path = os.path.join(datasets_dir, "od_flows_data.csv")
 
 demand_data = pd.read_csv(hourly_demand_path)
 od_flows = pd.read_csv(od_flows_path)
@@ -31,11 +34,13 @@ def train_demand_model():
 
 demand_model = train_demand_model()
 
-redis_client = redis.StrictRedis(host='localhost', port=6379, decode_responses=True)
+redis_client = get_redis_client()
+vote_aggregator = VoteAggregator(redis_client)
 
 class PriceVote(BaseModel):
     driver_id: str
     vote: str
+    ward: Optional[str] = None
 
 @router.get("/peak_hours")
 def get_peak_hours():
@@ -90,13 +95,12 @@ def get_optimal_routes():
 @router.post("/vote")
 def submit_vote(vote: PriceVote):
     vote_value = 1 if vote.vote == "Increase (+1)" else -1
-    redis_client.hincrby("price_votes", "total_votes", vote_value)
-    redis_client.hincrby("price_votes", "vote_count", 1)
+    vote_aggregator.submit(vote.driver_id, vote_value, vote.ward)
     return {"message": "Vote Registered Successfully!"}
 
 @router.get("/price_adjustment")
-def get_price_adjustment():
-    total_votes = int(redis_client.hget("price_votes", "total_votes") or 0)
-    vote_count = int(redis_client.hget("price_votes", "vote_count") or 1)  # Avoid division by zero
-    adjustment_factor = total_votes / vote_count
-    return {"adjustment_factor": adjustment_factor}
+def get_price_adjustment(ward: Optional[str] = None, window: int = DEFAULT_WINDOW):
+    """Share of unique drivers voting up minus down over the last `window` seconds, city-wide or for a ward"""
+    if window <= 0:
+        raise HTTPException(status_code=400, detail="window must be positive")
+    return vote_aggregator.tally(ward, window)
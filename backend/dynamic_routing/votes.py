@@ -0,0 +1,71 @@
+import time
+
+BUCKET_SECONDS = 60
+DEFAULT_WINDOW = 15 * 60
+MAX_WINDOW = 24 * 3600
+ALL_WARDS = "all"
+
+class VoteAggregator:
+    """Driver price votes counted per ward in fixed time buckets.
+
+    Each bucket holds two HyperLogLogs of driver ids, one for increase votes and one
+    for decrease votes, so a driver voting repeatedly is counted once. A window read
+    is a single PFCOUNT over its buckets (the union of their HLLs), which makes it
+    O(buckets) and dedups voters across the whole window. Writes go through one
+    pipeline and every vote is also recorded under ALL_WARDS for the city-wide figure.
+    Works with redis-py clients and the LocalRedis stand-in.
+    """
+
+    def __init__(self, redis_client, prefix="price_votes", bucket_seconds=BUCKET_SECONDS, max_window=MAX_WINDOW):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.bucket_seconds = bucket_seconds
+        self.max_window = max_window
+
+    def _key(self, ward, bucket, direction):
+        return f"{self.prefix}:{ward}:{bucket}:{direction}"
+
+    def submit_many(self, votes, now=None):
+        """Record [(driver_id, vote, ward)] with vote > 0 for increase; one round trip for the batch"""
+        now = time.time() if now is None else now
+        bucket = int(now // self.bucket_seconds)
+        # Keys live until no window that can be queried still covers their bucket
+        ttl = self.max_window + self.bucket_seconds
+        pipe = self.redis.pipeline(transaction=False)
+        touched = set()
+        for driver_id, vote, ward in votes:
+            direction = "up" if vote > 0 else "down"
+            for scope in {ward or ALL_WARDS, ALL_WARDS}:
+                key = self._key(scope, bucket, direction)
+                pipe.pfadd(key, driver_id)
+                touched.add(key)
+        for key in touched:
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+    def submit(self, driver_id, vote, ward=None, now=None):
+        self.submit_many([(driver_id, vote, ward)], now)
+
+    def tally(self, ward=None, window=DEFAULT_WINDOW, now=None):
+        """Unique up/down voters in the last `window` seconds and the resulting adjustment in [-1, 1].
+
+        Windows are rounded out to whole buckets: the bucket holding `now - window` is counted
+        in full, so a window shorter than a bucket still reads at least the current one.
+        """
+        now = time.time() if now is None else now
+        window = min(max(window, 0), self.max_window)
+        last = int(now // self.bucket_seconds)
+        first = int((now - window) // self.bucket_seconds)
+        ward = ward or ALL_WARDS
+        pipe = self.redis.pipeline(transaction=False)
+        for direction in ("up", "down"):
+            pipe.pfcount(*[self._key(ward, bucket, direction) for bucket in range(first, last + 1)])
+        up, down = pipe.execute()
+        total = up + down
+        return {
+            "ward": ward,
+            "window": window,
+            "up_voters": up,
+            "down_voters": down,
+            "adjustment_factor": (up - down) / total if total else 0.0,
+        }
@@ -1,9 +1,14 @@
-from fastapi import APIRouter
-import pandas as pd
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from typing import Optional
+from datetime import date
 import os
-import math
+import threading
+import time
 import mysql.connector
+from backend.utils.redis_client import get_redis_client
+from .leaderboard import Leaderboard
+from .rollups import WINDOWS, get_window_leaderboard, get_driver_window_stats
 
 router = APIRouter()
 
@@ -24,68 +29,159 @@ def get_db_connection():
         database=DB_CONFIG["database"]
     )
 
-# Tier Calculation Function
-def calculate_tier(base_acceptance, peak_acceptance, total_rides):
-    if base_acceptance >= 0.80 and peak_acceptance >= 0.85 and total_rides >= 200:
-        return "Platinum"
-    elif base_acceptance >= 0.70 and peak_acceptance >= 0.75 and total_rides >= 100:
-        return "Gold"
-    elif base_acceptance >= 0.50 and peak_acceptance >= 0.60 and total_rides >= 50:
-        return "Silver"
-    else:
-        return "Bronze"
+# Completed live rides per driver_data id, kept in the shared Redis so every worker and every
+# restart sees the same credits; ride_data only holds historical rides
+LIVE_RIDES_KEY = "leaderboard:live_rides"
+# How often a worker pulls credits recorded by other workers
+LEADERBOARD_SYNC_SECONDS = float(os.getenv("LEADERBOARD_SYNC_SECONDS", "5"))
+
+leaderboard = Leaderboard()
+_leaderboard_lock = threading.Lock()
+_leaderboard_loaded = False
+_synced_at = 0.0
+_historical_rides = {}  # driver_data.driver_id -> rides in ride_data
+_driver_data_ids = {}  # driver user_id -> driver_data.driver_id
+_redis = None
+
+def _live_rides_store():
+    global _redis
+    if _redis is None:
+        _redis = get_redis_client()
+    return _redis
 
 # Function to get total rides per driver
 def get_total_rides():
     conn = get_db_connection()
-    query = "SELECT driver_id, COUNT(*) as total_rides FROM ride_data GROUP BY driver_id"
-    total_rides = pd.read_sql(query, conn)
-    conn.close()
-    return total_rides
-
-# Load and Process Driver Data
-def get_driver_data():
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT driver_id, COUNT(*) as total_rides FROM ride_data GROUP BY driver_id")
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_driver_data_id(user_id):
+    """The driver_data id (e.g. DRV0001) linked to a driver account, or None if unlinked."""
+    if user_id not in _driver_data_ids:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT driver_data_id FROM driver WHERE driver_id = %s", (user_id,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        if row is None or row[0] is None:
+            return None  # not cached, so a later link is picked up
+        _driver_data_ids[user_id] = row[0]
+    return _driver_data_ids[user_id]
+
+# Load Driver Data into the leaderboard
+def load_leaderboard():
     conn = get_db_connection()
-    query = "SELECT driver_id, base_acceptance_rate, peak_acceptance_rate FROM driver_data"
-    df = pd.read_sql(query, conn)
-    
-    # Get total rides from ride_data table
-    rides_df = get_total_rides()
-
-    # Merge total_rides into drivers data
-    df = df.merge(rides_df, on="driver_id", how="left").fillna(0)
-
-    # Ensure values are between 0 and 1
-    df["base_acceptance_rate"] = df["base_acceptance_rate"].clip(0, 1)
-    df["peak_acceptance_rate"] = df["peak_acceptance_rate"].clip(0, 1)
-
-    # Calculate Rank Score (Weighted)
-    df["rank_score"] = (df["base_acceptance_rate"] * 0.3) + (df["peak_acceptance_rate"] * 0.7) + (df["total_rides"] / 1000)
-
-    # Realistic Coin Calculation
-    df["coins"] = (
-        (df["base_acceptance_rate"] * 50) +  # Base acceptance reward
-        (df["peak_acceptance_rate"] * 100) +  # Peak acceptance reward
-        (df["total_rides"] * 2)  # Rides bonus (2 coins per ride)
-    )
-
-    # Round off to whole number
-    df["coins"] = df["coins"].apply(math.floor)
-
-    # Assign Tiers
-    df["tier"] = df.apply(lambda row: calculate_tier(row["base_acceptance_rate"], row["peak_acceptance_rate"], row["total_rides"]), axis=1)
-
-    # Sort by Rank Score (Leaderboard)
-    df = df.sort_values(by="rank_score", ascending=False).reset_index(drop=True)
-
-    # Assign Rank
-    df["rank"] = df.index + 1  # Ranks start from 1
-
-    conn.close()
-    return df[["driver_id", "rank", "coins", "tier"]].to_dict(orient="records")
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT driver_id, base_acceptance_rate, peak_acceptance_rate FROM driver_data")
+        drivers = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    global _historical_rides, _synced_at
+    _historical_rides = get_total_rides()
+    ride_counts = dict(_historical_rides)
+    for driver_id, rides in get_live_rides().items():
+        ride_counts[driver_id] = ride_counts.get(driver_id, 0) + rides
+    _synced_at = time.monotonic()
+    leaderboard.load(drivers, ride_counts)
+
+def get_live_rides():
+    """{driver_data id: completed live rides} credited by any worker."""
+    return {driver_id: int(rides) for driver_id, rides in _live_rides_store().hgetall(LIVE_RIDES_KEY).items()}
+
+def sync_live_rides():
+    """Apply credits other workers have recorded since the last sync."""
+    global _synced_at
+    _synced_at = time.monotonic()
+    for driver_id, rides in get_live_rides().items():
+        leaderboard.sync_rides(driver_id, _historical_rides.get(driver_id, 0) + rides)
+
+def get_leaderboard_engine():
+    """Load the leaderboard from the database and the shared live credits on first use;
+    afterwards it is updated in place and re-synced every LEADERBOARD_SYNC_SECONDS."""
+    global _leaderboard_loaded
+    if not _leaderboard_loaded:
+        with _leaderboard_lock:
+            if not _leaderboard_loaded:
+                load_leaderboard()
+                _leaderboard_loaded = True
+    elif time.monotonic() - _synced_at >= LEADERBOARD_SYNC_SECONDS and _leaderboard_lock.acquire(blocking=False):
+        try:
+            sync_live_rides()
+        finally:
+            _leaderboard_lock.release()
+    return leaderboard
+
+def record_completed_ride(user_id):
+    """Credit a completed live ride (rides.driver_id is the driver's user id) on the leaderboard.
+
+    The credit is counted in the shared Redis first, then this worker's leaderboard is raised
+    to the resulting total, so a concurrent first load cannot count it twice.
+    """
+    driver_id = get_driver_data_id(user_id)
+    if driver_id is None:
+        print(f"Driver {user_id} has no driver_data profile; ride not credited on the leaderboard")
+        return
+    engine = get_leaderboard_engine()
+    live_rides = _live_rides_store().hincrby(LIVE_RIDES_KEY, driver_id, 1)
+    engine.sync_rides(driver_id, _historical_rides.get(driver_id, 0) + live_rides)
+
+def update_driver_acceptance(driver_id, base_acceptance_rate=None, peak_acceptance_rate=None):
+    """Store new acceptance rates in driver_data and re-rank the driver; False if unknown."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT driver_id FROM driver_data WHERE driver_id = %s", (driver_id,))
+        if cursor.fetchone() is None:
+            return False
+        cursor.execute(
+            "UPDATE driver_data SET base_acceptance_rate = COALESCE(%s, base_acceptance_rate), "
+            "peak_acceptance_rate = COALESCE(%s, peak_acceptance_rate) WHERE driver_id = %s",
+            (base_acceptance_rate, peak_acceptance_rate, driver_id)
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    get_leaderboard_engine().update_acceptance(driver_id, base_acceptance_rate, peak_acceptance_rate)
+    return True
+
+def get_driver_data(offset=0, limit=None):
+    return get_leaderboard_engine().top(offset, limit)
 
 # API Endpoint
 @router.get("/driver")
-def get_leaderboard():
-    leaderboard = get_driver_data()
+def get_leaderboard(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
+    leaderboard = get_driver_data(offset, limit)
     return {"leaderboard": leaderboard}
+
+@router.get("/driver/{driver_id}")
+def get_driver_standing(driver_id: str):
+    entry = get_leaderboard_engine().get(driver_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Driver not found on leaderboard")
+    return entry
+
+@router.get("/leaderboard/{window}")
+def get_windowed_leaderboard(window: str, limit: int = Query(10, ge=1, le=1000), as_of: Optional[date] = None):
+    """Daily, weekly or monthly competition standings from the rollup buckets."""
+    if window not in WINDOWS:
+        raise HTTPException(status_code=404, detail=f"Unknown window '{window}'")
+    return {"window": window, "leaderboard": get_window_leaderboard(window, as_of, limit)}
+
+@router.get("/driver/{driver_id}/{window}")
+def get_driver_window(driver_id: str, window: str, as_of: Optional[date] = None):
+    if window not in WINDOWS:
+        raise HTTPException(status_code=404, detail=f"Unknown window '{window}'")
+    return get_driver_window_stats(driver_id, window, as_of)
@@ -0,0 +1,107 @@
+import math
+import threading
+from backend.utils.sorted_set import SortedSet
+
+# Tier Calculation Function
+def calculate_tier(base_acceptance, peak_acceptance, total_rides):
+    if base_acceptance >= 0.80 and peak_acceptance >= 0.85 and total_rides >= 200:
+        return "Platinum"
+    elif base_acceptance >= 0.70 and peak_acceptance >= 0.75 and total_rides >= 100:
+        return "Gold"
+    elif base_acceptance >= 0.50 and peak_acceptance >= 0.60 and total_rides >= 50:
+        return "Silver"
+    else:
+        return "Bronze"
+
+def calculate_rank_score(base_acceptance, peak_acceptance, total_rides):
+    return (base_acceptance * 0.3) + (peak_acceptance * 0.7) + (total_rides / 1000)
+
+def calculate_coins(base_acceptance, peak_acceptance, total_rides):
+    return math.floor(
+        (base_acceptance * 50) +  # Base acceptance reward
+        (peak_acceptance * 100) +  # Peak acceptance reward
+        (total_rides * 2)  # Rides bonus (2 coins per ride)
+    )
+
+def _clip(rate):
+    return min(max(float(rate), 0.0), 1.0)
+
+class Leaderboard:
+    """Driver leaderboard kept sorted as stats change.
+
+    Scores live in a SortedSet keyed by the negated rank score, so rank lookups,
+    updates and page reads are O(log n) instead of a full re-sort per request.
+    """
+
+    def __init__(self):
+        self._stats = {}  # driver_id -> [base_acceptance_rate, peak_acceptance_rate, total_rides]
+        self._scores = SortedSet()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._stats)
+
+    def load(self, drivers, ride_counts):
+        """Bulk load (driver_id, base_rate, peak_rate) rows and a {driver_id: total_rides} dict."""
+        with self._lock:
+            self._stats.clear()
+            self._scores = SortedSet()
+            for driver_id, base_rate, peak_rate in drivers:
+                self._set(driver_id, _clip(base_rate), _clip(peak_rate), int(ride_counts.get(driver_id, 0)))
+
+    def record_ride(self, driver_id, count=1):
+        """Credit completed rides to a driver."""
+        with self._lock:
+            base_rate, peak_rate, total_rides = self._stats.get(driver_id, (0.0, 0.0, 0))
+            self._set(driver_id, base_rate, peak_rate, total_rides + count)
+
+    def sync_rides(self, driver_id, total_rides):
+        """Raise a driver's ride count to a total read from the shared store. Counts only grow,
+        so a read that is older than the one already applied is ignored."""
+        with self._lock:
+            base_rate, peak_rate, current = self._stats.get(driver_id, (0.0, 0.0, 0))
+            if total_rides > current or driver_id not in self._stats:
+                self._set(driver_id, base_rate, peak_rate, max(total_rides, current))
+
+    def update_acceptance(self, driver_id, base_acceptance_rate=None, peak_acceptance_rate=None):
+        with self._lock:
+            base_rate, peak_rate, total_rides = self._stats.get(driver_id, (0.0, 0.0, 0))
+            if base_acceptance_rate is not None:
+                base_rate = _clip(base_acceptance_rate)
+            if peak_acceptance_rate is not None:
+                peak_rate = _clip(peak_acceptance_rate)
+            self._set(driver_id, base_rate, peak_rate, total_rides)
+
+    def remove(self, driver_id):
+        with self._lock:
+            self._stats.pop(driver_id, None)
+            self._scores.remove(driver_id)
+
+    def get(self, driver_id):
+        """Rank, coins and tier for one driver, or None if unknown."""
+        with self._lock:
+            rank = self._scores.rank(driver_id)
+            if rank is None:
+                return None
+            return self._entry(driver_id, rank + 1)
+
+    def top(self, offset=0, limit=None):
+        """A page of the leaderboard, best first."""
+        with self._lock:
+            stop = None if limit is None else offset + limit
+            return [self._entry(driver_id, offset + i + 1)
+                    for i, (driver_id, _) in enumerate(self._scores.slice(offset, stop))]
+
+    def _set(self, driver_id, base_rate, peak_rate, total_rides):
+        self._stats[driver_id] = (base_rate, peak_rate, total_rides)
+        # Negated so ascending order is best-first; ties break on driver_id
+        self._scores.add(driver_id, -calculate_rank_score(base_rate, peak_rate, total_rides))
+
+    def _entry(self, driver_id, rank):
+        base_rate, peak_rate, total_rides = self._stats[driver_id]
+        return {
+            "driver_id": driver_id,
+            "rank": rank,
+            "coins": calculate_coins(base_rate, peak_rate, total_rides),
+            "tier": calculate_tier(base_rate, peak_rate, total_rides),
+        }
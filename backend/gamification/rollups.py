@@ -0,0 +1,208 @@
+import argparse
+import os
+import time
+from datetime import date, datetime, timedelta
+import mysql.connector
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", ""),
+    "database": os.getenv("DB_NAME", "namma_yatri_db")
+}
+
+PEAK_HOURS = (8, 9, 17, 18, 19, 20, 21)
+WINDOWS = {"day": 1, "week": 7, "month": 30}
+# Rides stamped within this many seconds of now are left for the next run, so a transaction
+# that stamped its row earlier but commits late is not passed over by the watermark
+COMMIT_LAG_SECONDS = 5
+
+# Ride sources folded into driver_daily_stats. Each is read in (timestamp, ride_id) order
+# past its watermark, so every ride is counted once.
+SOURCES = {
+    # Historical rides; append-only
+    "ride_data": {
+        "table": "ride_data",
+        "ts": "timestamp",
+        "hour": "hour",
+        "driver": "driver_id",
+        "where": "driver_id IS NOT NULL",
+    },
+    # Live rides; counted once they reach the terminal 'completed' state, keyed on the write-once
+    # completed_at so later updates to the row neither skip nor re-count it. rides.driver_id is
+    # the driver's user id, credited to the driver_data profile linked in driver.driver_data_id
+    "rides": {
+        "table": "rides",
+        "ts": "completed_at",
+        "hour": "HOUR(created_at)",
+        "driver": "(SELECT driver_data_id FROM driver WHERE driver.driver_id = rides.driver_id)",
+        "where": "status = 'completed' AND completed_at IS NOT NULL "
+                 "AND driver_id IN (SELECT driver_id FROM driver WHERE driver_data_id IS NOT NULL)",
+        "lag": COMMIT_LAG_SECONDS,
+    },
+}
+
+def get_db_connection():
+    return mysql.connector.connect(
+        host=DB_CONFIG["host"],
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        database=DB_CONFIG["database"]
+    )
+
+def _get_watermark(cursor, source):
+    cursor.execute("SELECT last_ts, last_id FROM rollup_watermarks WHERE source = %s", (source,))
+    row = cursor.fetchone()
+    return row if row else (datetime(1970, 1, 1), "")
+
+def rollup_batch(source, batch_size=50000):
+    """Fold the next batch of rides past the source's watermark into daily buckets.
+
+    The aggregation and the watermark move happen in one transaction. Returns the
+    number of rides processed, 0 when caught up.
+    """
+    spec = SOURCES[source]
+    table, ts, where, driver = spec["table"], spec["ts"], spec["where"], spec["driver"]
+    if spec.get("lag"):
+        where += f" AND {ts} < NOW() - INTERVAL {int(spec['lag'])} SECOND"
+    after_watermark = f"({ts} > %s OR ({ts} = %s AND ride_id > %s))"
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        last_ts, last_id = _get_watermark(cursor, source)
+
+        # Upper bound of this batch: the batch_size-th ride past the watermark, or the last one
+        cursor.execute(
+            f"SELECT {ts}, ride_id FROM {table} WHERE {where} AND {after_watermark} "
+            f"ORDER BY {ts}, ride_id LIMIT 1 OFFSET %s",
+            (last_ts, last_ts, last_id, batch_size - 1)
+        )
+        upper = cursor.fetchone()
+        if upper is None:
+            cursor.execute(
+                f"SELECT {ts}, ride_id FROM {table} WHERE {where} AND {after_watermark} "
+                f"ORDER BY {ts} DESC, ride_id DESC LIMIT 1",
+                (last_ts, last_ts, last_id)
+            )
+            upper = cursor.fetchone()
+            if upper is None:
+                return 0
+        upper_ts, upper_id = upper
+
+        in_batch = f"{after_watermark} AND ({ts} < %s OR ({ts} = %s AND ride_id <= %s))"
+        params = (last_ts, last_ts, last_id, upper_ts, upper_ts, upper_id)
+        peak_hours = ", ".join(str(h) for h in PEAK_HOURS)
+
+        cursor.execute(
+            f"""
+            INSERT INTO driver_daily_stats (driver_id, day, rides, fare, peak_rides)
+            SELECT {driver}, DATE({ts}), COUNT(*), COALESCE(SUM(fare), 0), SUM({spec['hour']} IN ({peak_hours}))
+            FROM {table}
+            WHERE {where} AND {in_batch}
+            GROUP BY {driver}, DATE({ts})
+            ON DUPLICATE KEY UPDATE
+                rides = rides + VALUES(rides),
+                fare = fare + VALUES(fare),
+                peak_rides = peak_rides + VALUES(peak_rides)
+            """,
+            params
+        )
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {where} AND {in_batch}", params)
+        processed = cursor.fetchone()[0]
+
+        cursor.execute(
+            "INSERT INTO rollup_watermarks (source, last_ts, last_id) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE last_ts = VALUES(last_ts), last_id = VALUES(last_id)",
+            (source, upper_ts, str(upper_id))
+        )
+        conn.commit()
+        return processed
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+def run_rollups(batch_size=50000):
+    """Catch every source up to its latest ride. Returns rides processed per source."""
+    processed = {}
+    for source in SOURCES:
+        total = 0
+        while True:
+            count = rollup_batch(source, batch_size)
+            total += count
+            if count == 0:
+                break
+        processed[source] = total
+    return processed
+
+def _window_bounds(window, as_of=None):
+    if window not in WINDOWS:
+        raise ValueError(f"Unknown window '{window}', expected one of {', '.join(WINDOWS)}")
+    as_of = as_of or date.today()
+    return as_of - timedelta(days=WINDOWS[window]), as_of
+
+def get_window_leaderboard(window, as_of=None, limit=10):
+    """Top drivers by rides (then fare) over the last day/week/month of daily buckets."""
+    start, end = _window_bounds(window, as_of)
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT driver_id, SUM(rides) AS rides, SUM(fare) AS fare, SUM(peak_rides) AS peak_rides
+            FROM driver_daily_stats
+            WHERE day > %s AND day <= %s
+            GROUP BY driver_id
+            ORDER BY rides DESC, fare DESC, driver_id
+            LIMIT %s
+            """,
+            (start, end, limit)
+        )
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    return [
+        {"driver_id": row["driver_id"], "rank": i + 1, "rides": int(row["rides"]),
+         "fare": float(row["fare"]), "peak_rides": int(row["peak_rides"])}
+        for i, row in enumerate(rows)
+    ]
+
+def get_driver_window_stats(driver_id, window, as_of=None):
+    """One driver's totals for a window, summed from at most WINDOWS[window] buckets."""
+    start, end = _window_bounds(window, as_of)
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            """
+            SELECT COALESCE(SUM(rides), 0) AS rides, COALESCE(SUM(fare), 0) AS fare,
+                   COALESCE(SUM(peak_rides), 0) AS peak_rides
+            FROM driver_daily_stats
+            WHERE driver_id = %s AND day > %s AND day <= %s
+            """,
+            (driver_id, start, end)
+        )
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {"driver_id": driver_id, "window": window, "rides": int(row["rides"]),
+            "fare": float(row["fare"]), "peak_rides": int(row["peak_rides"])}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold new rides into per-driver daily rollups")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--interval", type=float, help="Keep running, catching up every N seconds")
+    args = parser.parse_args()
+
+    while True:
+        print(f"Rollups processed: {run_rollups(args.batch_size)}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
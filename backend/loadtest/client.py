@@ -0,0 +1,141 @@
+import asyncio
+import collections
+import json
+import time
+from urllib.parse import urlencode
+import numpy as np
+
+class HttpError(Exception):
+    pass
+
+class EndpointStats:
+    """Latencies and outcomes per endpoint name, recorded only while `recording` is set."""
+
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)  # name -> seconds
+        self.statuses = collections.defaultdict(collections.Counter)  # name -> status -> count
+        self.recording = False
+        self.started = None
+        self.stopped = None
+
+    def start(self):
+        self.recording = True
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.recording = False
+        self.stopped = time.perf_counter()
+
+    def record(self, name, seconds, status):
+        if self.recording:
+            self.latencies[name].append(seconds)
+            self.statuses[name][status] += 1
+
+    def summary(self):
+        """{endpoint: {requests, rps, p50_ms, p95_ms, p99_ms, error_rate}}; errors are 5xx and
+        transport failures (status 0), since 4xx answers like 409 are part of the scenarios."""
+        elapsed = (self.stopped or time.perf_counter()) - self.started
+        report = {}
+        for name in sorted(self.latencies):
+            latencies = np.array(self.latencies[name]) * 1000
+            statuses = self.statuses[name]
+            errors = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            report[name] = {
+                "requests": len(latencies),
+                "rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "error_rate": round(errors / len(latencies), 4),
+                "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            }
+        return report
+
+class HttpClient:
+    """Minimal asyncio HTTP/1.1 client with a pool of keep-alive connections.
+
+    JSON in, JSON out; every call is timed under its endpoint name (a route template such as
+    'GET /api/booking/rides/{id}') so per-endpoint latency is not split by path parameters.
+    """
+
+    def __init__(self, host, port, stats, max_connections=256, timeout=30.0):
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.timeout = timeout
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _connection(self):
+        """(reader, writer) and whether it was reused from the pool."""
+        if self._idle:
+            return self._idle.pop(), True
+        return await asyncio.open_connection(self.host, self.port), False
+
+    async def request(self, method, path, name, params=None, body=None):
+        """(status, parsed JSON body or None). Transport errors are recorded as status 0."""
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        payload = b"" if body is None else json.dumps(body).encode()
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n").encode()
+
+        async with self._slots:
+            began = time.perf_counter()
+            while True:
+                connection, reused = None, False
+                try:
+                    connection, reused = await self._connection()
+                    reader, writer = connection
+                    writer.write(head + payload)
+                    status, data, keep_alive = await asyncio.wait_for(self._read_response(reader), self.timeout)
+                    break
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, HttpError) as e:
+                    if connection is not None:
+                        connection[1].close()
+                    if reused and not isinstance(e, asyncio.TimeoutError):
+                        continue  # the server closed an idle keep-alive connection; retry on a new one
+                    self.stats.record(name, time.perf_counter() - began, 0)
+                    return 0, {"error": str(e) or type(e).__name__}
+            self.stats.record(name, time.perf_counter() - began, status)
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                writer.close()
+
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    async def _read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise HttpError("Connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b"".join(chunks)
+        else:
+            data = await reader.readexactly(int(headers.get("content-length", "0")))
+        return status, data, headers.get("connection", "").lower() != "close"
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
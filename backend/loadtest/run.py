@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from urllib.parse import urlparse
+from .client import EndpointStats, HttpClient
+from .scenarios import assign_users, parse_mix, run_user
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def spawn_server(port, workdir, customers, drivers, boot_timeout=180):
+    """Start backend.loadtest.server in a child process and wait until it answers."""
+    os.makedirs(workdir, exist_ok=True)
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.loadtest.server", "--port", str(port), "--workdir", workdir,
+         "--customers", str(customers), "--drivers", str(drivers)],
+        cwd=REPO_ROOT, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + boot_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}; see {log.name}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Server did not come up within {boot_timeout}s; see {log.name}")
+
+async def drive(host, port, users, warmup, duration, think_time, max_connections):
+    stats = EndpointStats()
+    client = HttpClient(host, port, stats, max_connections)
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + warmup + duration
+    loop.call_later(warmup, stats.start)
+    loop.call_later(warmup + duration, stats.stop)
+    await asyncio.gather(*(run_user(client, name, index, deadline, think_time, seed)
+                           for seed, (name, index) in enumerate(users)))
+    await client.close()
+    return stats.summary()
+
+def print_report(report):
+    print(f"{'endpoint':<48} {'requests':>8} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, row in report.items():
+        print(f"{name:<48} {row['requests']:>8} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['error_rate']:>7.2%}")
+
+def find_unhealthy(report, max_error_rate):
+    """Endpoints whose 5xx/transport error rate is above the absolute limit."""
+    return [f"{name}: error rate {row['error_rate']:.2%} > {max_error_rate:.2%} ({row['statuses']})"
+            for name, row in report.items() if row["error_rate"] > max_error_rate]
+
+def find_regressions(report, baseline, tolerance):
+    """Endpoints whose p95/p99 grew, throughput fell, or error rate rose past the baseline."""
+    regressions = []
+    for name, base in baseline["endpoints"].items():
+        row = report.get(name)
+        if row is None:
+            regressions.append(f"{name}: no requests (baseline {base['requests']})")
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if row[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {row[metric]} > {base[metric]} (+{tolerance:.0%})")
+        if row["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {row['rps']} < {base['rps']} (-{tolerance:.0%})")
+        if row["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{name}: error rate {row['error_rate']:.2%} > {base['error_rate']:.2%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API gateway and compare against saved baselines")
+    parser.add_argument("--url", help="Target a running gateway instead of spawning one on SQLite and stand-ins")
+    parser.add_argument("--concurrency", type=int, default=50, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=60.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=10.0, help="Seconds of load before measuring")
+    parser.add_argument("--think", type=float, default=0.2, help="Mean pause between a user's steps (seconds)")
+    parser.add_argument("--mix", default="customer=6,driver=2,admin=1,leaderboard=1")
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--drivers", type=int, default=500, help="Drivers seeded into a spawned server")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "namma_yatri_loadtest"))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change before failing")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Fail (and refuse to save a baseline) when any endpoint's 5xx rate is above this")
+    parser.add_argument("--report", help="Also write the report as JSON here")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    users = assign_users(args.concurrency, mix)
+    settings = {"concurrency": args.concurrency, "duration": args.duration, "think": args.think, "mix": mix}
+
+    server = None
+    if args.url:
+        target = urlparse(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        customers = sum(1 for name, _ in users if name == "customer")
+        drivers = max(args.drivers, sum(1 for name, _ in users if name == "driver"))
+        print(f"Starting gateway on SQLite and in-process stand-ins (port {port}, workdir {args.workdir})")
+        try:
+            server = spawn_server(port, args.workdir, max(customers, 1), drivers)
+        except RuntimeError as e:
+            print(e)
+            sys.exit(2)
+
+    try:
+        print(f"{len(users)} virtual users ({', '.join(f'{name}={weight:g}' for name, weight in mix.items())}), "
+              f"{args.warmup:g}s warmup + {args.duration:g}s measured")
+        report = asyncio.run(drive(host, port, users, args.warmup, args.duration, args.think, args.max_connections))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"settings": settings, "endpoints": report}, f, indent=2)
+
+    # A broken endpoint must not become the baseline it is later compared against
+    unhealthy = find_unhealthy(report, args.max_error_rate)
+    if unhealthy:
+        print(f"{len(unhealthy)} endpoints failing:")
+        for line in unhealthy:
+            print(f"  {line}")
+        if args.save_baseline:
+            print("Baseline not saved")
+        sys.exit(1)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"settings": settings, "endpoints": report}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != settings:
+        print(f"Warning: baseline was recorded with {baseline.get('settings')}, this run used {settings}")
+    regressions = find_regressions(report, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions against {args.baseline}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+if __name__ == "__main__":
+    main()
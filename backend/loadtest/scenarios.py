@@ -0,0 +1,133 @@
+import asyncio
+import random
+import time
+from .server import ADMIN_EMAIL, MAX_LAT, MAX_LNG, MIN_LAT, MIN_LNG, PASSWORD, customer_email, driver_email, driver_index
+
+COMPLETED_SHARE = 0.5  # Booked rides the assigned driver takes to completion; the rest are cancelled
+
+async def login(client, email):
+    status, body = await client.request("POST", "/api/auth/login", "POST /api/auth/login",
+                                        body={"email": email, "password": PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"Login failed for {email}: {status} {body}")
+    return body["user"]["user_id"], body["token"]
+
+async def think(rng, mean):
+    if mean > 0:
+        await asyncio.sleep(rng.expovariate(1 / mean))
+
+_driver_tokens = {}  # driver user id -> token, shared by every virtual user in the run
+
+async def driver_token(client, driver_id):
+    if driver_id not in _driver_tokens:
+        _, _driver_tokens[driver_id] = await login(client, driver_email(driver_index(driver_id)))
+    return _driver_tokens[driver_id]
+
+async def complete_trip(client, ride_id, driver_id, think_time, rng):
+    """The assigned driver accepts, starts and completes the ride (credited on the leaderboard)."""
+    auth = {"token": await driver_token(client, driver_id)}
+    for action in ("accept", "start", "complete"):
+        status, _ = await client.request("POST", f"/api/booking/rides/{ride_id}/{action}",
+                                         f"POST /api/booking/rides/{{id}}/{action}", params=auth)
+        if status != 200:
+            return
+        await think(rng, think_time)
+
+async def customer(client, index, deadline, think_time, rng, pings=3):
+    """Login, a few location pings, request a ride, look at it, then either have the driver
+    complete it or cancel it (freeing the driver)."""
+    user_id, token = await login(client, customer_email(index))
+    auth = {"token": token}
+    while time.monotonic() < deadline:
+        for _ in range(pings):
+            await client.request("POST", f"/api/customers/{user_id}/refresh-location",
+                                 "POST /api/customers/{id}/refresh-location", params=auth)
+            await client.request("GET", f"/api/customers/{user_id}/location", "GET /api/customers/{id}/location", params=auth)
+            await think(rng, think_time)
+        status, ride = await client.request(
+            "POST", f"/api/customers/{user_id}/request-ride", "POST /api/customers/{id}/request-ride", params=auth,
+            body={"destination": "Load test drop", "destination_lat": rng.uniform(MIN_LAT, MAX_LAT),
+                  "destination_lng": rng.uniform(MIN_LNG, MAX_LNG)})
+        if status == 200:
+            ride_id = ride["ride_id"]
+            await client.request("GET", f"/api/booking/rides/{ride_id}", "GET /api/booking/rides/{id}", params=auth)
+            await think(rng, think_time)
+            if rng.random() < COMPLETED_SHARE:
+                await complete_trip(client, ride_id, ride["driver_id"], think_time, rng)
+            else:
+                await client.request("POST", f"/api/booking/rides/{ride_id}/cancel",
+                                     "POST /api/booking/rides/{id}/cancel", params=auth)
+        await think(rng, think_time)
+
+async def driver(client, index, deadline, think_time, rng):
+    """Login, then location pings and status checks, going online again when a ride left them busy."""
+    user_id, token = await login(client, driver_email(index))
+    auth = {"token": token}
+    while time.monotonic() < deadline:
+        await client.request("POST", f"/api/drivers/{user_id}/refresh-location", "POST /api/drivers/{id}/refresh-location",
+                             params=auth)
+        status, body = await client.request("GET", f"/api/drivers/{user_id}/status", "GET /api/drivers/{id}/status",
+                                            params=auth)
+        if status == 200 and not body.get("is_available"):
+            await client.request("POST", f"/api/drivers/{user_id}/update-status", "POST /api/drivers/{id}/update-status",
+                                 params=auth, body={"is_available": True})
+        await think(rng, think_time)
+
+ADMIN_PAGES = ["/api/admin/drivers", "/api/admin/customers", "/api/admin/trips", "/api/admin/surge", "/api/admin/route-cache"]
+
+async def admin(client, index, deadline, think_time, rng):
+    """Login once, then walk the admin dashboard pages."""
+    _, token = await login(client, ADMIN_EMAIL)
+    while time.monotonic() < deadline:
+        for page in ADMIN_PAGES:
+            await client.request("GET", page, f"GET {page}", params={"token": token})
+            await think(rng, think_time)
+
+async def leaderboard(client, index, deadline, think_time, rng):
+    """Poll the overall and windowed leaderboards and a driver's standing."""
+    while time.monotonic() < deadline:
+        status, body = await client.request("GET", "/api/gamification/driver", "GET /api/gamification/driver",
+                                            params={"limit": 20})
+        await client.request("GET", f"/api/gamification/leaderboard/{rng.choice(['day', 'week', 'month'])}",
+                             "GET /api/gamification/leaderboard/{window}")
+        if status == 200 and body["leaderboard"]:
+            driver_id = rng.choice(body["leaderboard"])["driver_id"]
+            await client.request("GET", f"/api/gamification/driver/{driver_id}", "GET /api/gamification/driver/{id}")
+        await think(rng, think_time)
+
+SCENARIOS = {
+    "customer": customer,
+    "driver": driver,
+    "admin": admin,
+    "leaderboard": leaderboard,
+}
+
+def parse_mix(text):
+    """'customer=6,driver=2' -> {'customer': 6.0, 'driver': 2.0}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name.strip()}', expected one of {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def assign_users(concurrency, mix):
+    """(scenario name, account index) for each virtual user, split by the mix weights."""
+    total = sum(mix.values())
+    users, counts = [], {}
+    for name, weight in mix.items():
+        counts[name] = int(round(concurrency * weight / total))
+    # Rounding can miss or overshoot by a user or two; settle it on the heaviest scenario
+    heaviest = max(mix, key=mix.get)
+    counts[heaviest] += concurrency - sum(counts.values())
+    for name, count in counts.items():
+        users.extend((name, i) for i in range(count))
+    return users
+
+async def run_user(client, name, index, deadline, think_time, seed):
+    rng = random.Random(seed)
+    try:
+        await SCENARIOS[name](client, index, deadline, think_time, rng)
+    except Exception as e:
+        print(f"{name} user {index} stopped: {e}")
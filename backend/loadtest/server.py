@@ -0,0 +1,143 @@
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+import pandas as pd
+from . import sqlite_mysql
+
+# Bengaluru bounding box, as in db_utils.generate_random_bengaluru_location
+MIN_LAT, MAX_LAT = 12.8340, 13.0827
+MIN_LNG, MAX_LNG = 77.4799, 77.7145
+WARDS = [f"Ward {i}" for i in range(1, 41)]
+PASSWORD = "loadtest"
+
+# In-process stand-ins for Redis, RabbitMQ, Kafka and the prebooking store
+STAND_IN_ENV = {
+    "REDIS_BACKEND": "memory",
+    "QUEUE_BROKER": "memory",
+    "EVENT_BROKER": "local",
+    "PREBOOKING_STORE": "memory",
+}
+
+def customer_email(i):
+    return f"customer{i}@loadtest.local"
+
+def driver_email(i):
+    return f"driver{i}@loadtest.local"
+
+def driver_data_id(i):
+    """Gamification profile id of driver i, in the dataset's DRV0001 format."""
+    return f"DRV{i + 1:04d}"
+
+ADMIN_EMAIL = "admin@loadtest.local"
+# Users are inserted admin first, then drivers, so driver i is user FIRST_DRIVER_ID + i
+FIRST_DRIVER_ID = 2
+
+def driver_index(user_id):
+    """Driver account index for a driver's user id (e.g. the driver_id a booking returns)."""
+    return int(user_id) - FIRST_DRIVER_ID
+
+def seed_database(path, customers, drivers, history_rides, seed=11):
+    """Users, positioned customers and available drivers linked to driver_data profiles, plus
+    ride_data history so the leaderboards have something to rank."""
+    rng = random.Random(seed)
+    conn = sqlite_mysql.Connection(path)
+    cursor = conn.cursor()
+    try:
+        users = [("Load Admin", ADMIN_EMAIL, PASSWORD, "admin")]
+        users += [(f"Driver {i}", driver_email(i), PASSWORD, "driver") for i in range(drivers)]
+        users += [(f"Customer {i}", customer_email(i), PASSWORD, "customer") for i in range(customers)]
+        cursor.executemany("INSERT INTO users (name, email, password_hash, user_type) VALUES (%s, %s, %s, %s)", users)
+        # user_id is assigned in insert order: admin 1, then drivers, then customers
+        driver_ids = range(FIRST_DRIVER_ID, FIRST_DRIVER_ID + drivers)
+        customer_ids = range(FIRST_DRIVER_ID + drivers, FIRST_DRIVER_ID + drivers + customers)
+
+        def point():
+            return round(rng.uniform(MIN_LAT, MAX_LAT), 6), round(rng.uniform(MIN_LNG, MAX_LNG), 6)
+
+        cursor.executemany(
+            "INSERT INTO customer (customer_id, location, latitude, longitude) VALUES (%s, 'Bengaluru', %s, %s)",
+            [(customer_id, *point()) for customer_id in customer_ids]
+        )
+        # Accounts and gamification profiles use different ids, linked as in production
+        cursor.executemany(
+            "INSERT INTO driver (driver_id, location, latitude, longitude, is_available, driver_data_id) "
+            "VALUES (%s, 'Bengaluru', %s, %s, TRUE, %s)",
+            [(driver_id, *point(), driver_data_id(i)) for i, driver_id in enumerate(driver_ids)]
+        )
+        profiles = [driver_data_id(i) for i in range(drivers)]
+        cursor.executemany(
+            "INSERT INTO driver_data (driver_id, experience_months, primary_ward, base_acceptance_rate, "
+            "peak_acceptance_rate, avg_daily_hours) VALUES (%s, %s, %s, %s, %s, %s)",
+            [(profile, rng.randint(1, 60), rng.choice(WARDS), round(rng.uniform(0.5, 0.95), 4),
+              round(rng.uniform(0.4, 0.9), 4), round(rng.uniform(4, 12), 2)) for profile in profiles]
+        )
+        now = datetime.now()
+        history = []
+        for i in range(history_rides):
+            at = now - timedelta(minutes=rng.randint(0, 45 * 24 * 60))
+            distance = round(rng.uniform(1, 25), 2)
+            history.append((f"LT{i}", at, rng.choice(WARDS), rng.choice(WARDS), rng.choice(profiles), distance,
+                            round(50 + distance * 12, 2), 1.0, int(distance * 3), at.hour, at.weekday(), at.weekday() >= 5))
+        cursor.executemany(
+            "INSERT INTO ride_data (ride_id, timestamp, origin_ward, destination_ward, driver_id, distance_km, fare, "
+            "surge_multiplier, duration_minutes, hour, day_of_week, is_weekend) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            history
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def write_datasets(directory, seed=12):
+    """Small hourly demand and OD flow CSVs in the shape dynamic_routing reads at import."""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    demand = []
+    for ward in WARDS:
+        for day in range(7):
+            for hour in range(24):
+                searches = rng.randint(5, 200)
+                demand.append({"ward": ward, "hour": hour, "day_of_week": day, "is_weekend": int(day >= 5),
+                               "searches": searches, "searches_with_estimate": int(searches * 0.8),
+                               "searches_for_quotes": int(searches * 0.6), "searches_with_quotes": int(searches * 0.5)})
+    pd.DataFrame(demand).to_csv(os.path.join(directory, "hourly_demand_data.csv"), index=False)
+    flows = [{"origin_ward": a, "destination_ward": b, "ride_count": rng.randint(1, 500)}
+             for a in WARDS for b in rng.sample(WARDS, 5) if a != b]
+    pd.DataFrame(flows).to_csv(os.path.join(directory, "od_flows_data.csv"), index=False)
+
+def prepare(workdir, customers=200, drivers=500, history_rides=20000):
+    """Database and datasets for a load-test server in workdir; returns the database path."""
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, "namma_yatri.sqlite3")
+    sqlite_mysql.create_database(path)
+    seed_database(path, customers, drivers, history_rides)
+    write_datasets(os.path.join(workdir, "datasets"))
+    return path
+
+def serve(host, port, workdir, customers, drivers, history_rides):
+    path = prepare(workdir, customers, drivers, history_rides)
+    # Services read these at import, so they are set before the app is loaded
+    for key, value in STAND_IN_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault("DATASETS_DIR", os.path.join(workdir, "datasets"))
+    sqlite_mysql.install(path)
+
+    from backend.gamification.rollups import run_rollups
+    run_rollups()
+
+    import uvicorn
+    uvicorn.run("backend.api_gateway.app:app", host=host, port=port, log_level="warning", access_log=False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API gateway on SQLite and in-process stand-ins for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "namma_yatri_loadtest"))
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--drivers", type=int, default=500)
+    parser.add_argument("--history-rides", type=int, default=20000)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workdir, args.customers, args.drivers, args.history_rides)
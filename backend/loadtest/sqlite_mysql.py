@@ -0,0 +1,235 @@
+import functools
+import math
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+import mysql.connector
+from mysql.connector import errors
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database", "mysql_setup.sql")
+
+_database_path = None
+
+def _convert(parse):
+    def converter(value):
+        text = value.decode()
+        try:
+            return parse(text)
+        except ValueError:
+            return text
+    return converter
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter("DECIMAL", _convert(Decimal))
+sqlite3.register_converter("DATETIME", _convert(datetime.fromisoformat))
+sqlite3.register_converter("TIMESTAMP", _convert(datetime.fromisoformat))
+sqlite3.register_converter("DATE", _convert(date.fromisoformat))
+
+def _now():
+    return datetime.now().replace(microsecond=0).isoformat(" ")
+
+def _hour(value):
+    return None if value is None else datetime.fromisoformat(str(value)).hour
+
+def _unix_timestamp(value=None):
+    return datetime.now().timestamp() if value is None else datetime.fromisoformat(str(value)).timestamp()
+
+FUNCTIONS = {
+    ("NOW", 0): _now,
+    ("CURDATE", 0): lambda: date.today().isoformat(),
+    ("HOUR", 1): _hour,
+    ("UNIX_TIMESTAMP", 0): _unix_timestamp,
+    ("UNIX_TIMESTAMP", 1): _unix_timestamp,
+    ("GREATEST", -1): lambda *values: None if None in values else max(values),
+    ("LEAST", -1): lambda *values: None if None in values else min(values),
+    ("POW", 2): lambda x, y: None if x is None or y is None else math.pow(x, y),
+    ("SQRT", 1): lambda x: None if x is None else math.sqrt(x),
+    ("COS", 1): lambda x: None if x is None else math.cos(x),
+    ("SIN", 1): lambda x: None if x is None else math.sin(x),
+    ("RADIANS", 1): lambda x: None if x is None else math.radians(x),
+}
+
+_INTERVAL = re.compile(r"(\w+\(\)|\?|\w+)\s*([-+])\s*INTERVAL\s+(\?|\d+)\s+(SECOND|MINUTE|HOUR|DAY)", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=2048)
+def translate(operation):
+    """MySQL statement -> SQLite statement, for the dialect this codebase uses."""
+    sql = re.sub(r"%([%s])", lambda m: "%" if m.group(1) == "%" else "?", operation)
+    sql = re.sub(r"\bFOR UPDATE\b", "", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bLAST_INSERT_ID\(\)", "last_insert_rowid()", sql, flags=re.IGNORECASE)
+    sql = _INTERVAL.sub(lambda m: f"datetime({m.group(1)}, '{m.group(2)}' || {m.group(3)} || ' {m.group(4).lower()}s')", sql)
+    upsert = re.search(r"\bON DUPLICATE KEY UPDATE\b", sql, re.IGNORECASE)
+    if upsert:
+        assignments = re.sub(r"\bVALUES\((\w+)\)", r"excluded.\1", sql[upsert.end():], flags=re.IGNORECASE)
+        sql = sql[:upsert.start()] + "ON CONFLICT DO UPDATE SET" + assignments
+    return sql
+
+def schema_statements(script):
+    """CREATE statements from database/mysql_setup.sql rewritten for SQLite; indexes declared
+    inside CREATE TABLE or via ALTER TABLE become CREATE INDEX. Seed INSERTs are skipped."""
+    statements = []
+    script = "\n".join(line.split("--", 1)[0] for line in script.splitlines())
+    for statement in script.split(";"):
+        statement = statement.strip()
+        upper = statement.upper()
+        if upper.startswith("CREATE TABLE"):
+            table = re.match(r"CREATE TABLE (?:IF NOT EXISTS )?(\w+)", statement, re.IGNORECASE).group(1)
+            lines, indexes, touched = [], [], []
+            for line in statement.splitlines():
+                index = re.match(r"\s*(?:INDEX|KEY)\s*(\w*)\s*\(([^)]*)\),?\s*$", line, re.IGNORECASE)
+                if index:
+                    indexes.append(index.group(2))
+                    continue
+                if re.search(r"ON UPDATE CURRENT_TIMESTAMP", line, re.IGNORECASE):
+                    touched.append(line.split()[0])
+                line = re.sub(r"\bINT AUTO_INCREMENT PRIMARY KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT", line, flags=re.IGNORECASE)
+                line = re.sub(r"\bENUM\([^)]*\)", "TEXT", line, flags=re.IGNORECASE)
+                line = re.sub(r"\s+ON UPDATE CURRENT_TIMESTAMP", "", line, flags=re.IGNORECASE)
+                line = re.sub(r"DEFAULT CURRENT_TIMESTAMP", "DEFAULT (datetime('now', 'localtime'))", line, flags=re.IGNORECASE)
+                lines.append(line)
+            body = "\n".join(lines)
+            statements.append(re.sub(r",\s*\)\s*$", "\n)", body))
+            statements.extend(_create_index(table, columns) for columns in indexes)
+            # ON UPDATE CURRENT_TIMESTAMP as a trigger (recursive triggers are off, so it fires once)
+            statements.extend(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{column} AFTER UPDATE ON {table} FOR EACH ROW "
+                f"WHEN NEW.{column} IS OLD.{column} BEGIN "
+                f"UPDATE {table} SET {column} = datetime('now', 'localtime') WHERE rowid = NEW.rowid; END"
+                for column in touched
+            )
+        elif upper.startswith("ALTER TABLE") and "ADD INDEX" in upper:
+            match = re.match(r"ALTER TABLE (\w+) ADD INDEX\s*\w*\s*\(([^)]*)\)", statement, re.IGNORECASE)
+            statements.append(_create_index(match.group(1), match.group(2)))
+    return statements
+
+def _create_index(table, columns):
+    name = "idx_" + table + "_" + "_".join(column.strip() for column in columns.split(","))
+    return f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+
+def _error(e):
+    if isinstance(e, sqlite3.IntegrityError):
+        return errors.IntegrityError(msg=str(e), errno=1062)
+    if isinstance(e, sqlite3.OperationalError) and "locked" in str(e):
+        return errors.OperationalError(msg=str(e), errno=1205)  # lock wait timeout
+    return errors.DatabaseError(msg=str(e))
+
+class Cursor:
+    """The slice of the mysql.connector cursor API the services use."""
+
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.cursor()
+        self.dictionary = dictionary
+        self.lastrowid = None
+        self.rowcount = -1
+        self.description = None
+
+    def execute(self, operation, params=()):
+        try:
+            self._cursor.execute(translate(operation), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise _error(e) from e
+        self._after()
+
+    def executemany(self, operation, seq_params):
+        try:
+            self._cursor.executemany(translate(operation), [tuple(params) for params in seq_params])
+        except sqlite3.Error as e:
+            raise _error(e) from e
+        self._after()
+
+    def _after(self):
+        self.lastrowid = self._cursor.lastrowid
+        self.rowcount = self._cursor.rowcount
+        self.description = self._cursor.description
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Connection:
+    """mysql.connector-style connection over one SQLite file shared by every connection.
+
+    Writes open BEGIN IMMEDIATE transactions, so concurrent writers queue on the database
+    lock (up to `timeout` seconds) instead of failing at commit; WAL keeps readers going.
+    """
+
+    def __init__(self, path, timeout=10.0):
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level="IMMEDIATE",
+                                     detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for (name, narg), function in FUNCTIONS.items():
+            self._conn.create_function(name, narg, function)
+        self._open = True
+
+    def cursor(self, dictionary=False, **kwargs):
+        return Cursor(self._conn, dictionary)
+
+    def start_transaction(self, **kwargs):
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self):
+        return self._open
+
+    def close(self):
+        if self._open:
+            self._conn.close()
+            self._open = False
+
+def connect(*args, **kwargs):
+    """Drop-in for mysql.connector.connect; the MySQL connection settings are ignored."""
+    if _database_path is None:
+        raise errors.InterfaceError(msg="SQLite stand-in has no database; call install() first")
+    return Connection(_database_path)
+
+def create_database(path, schema_path=SCHEMA_PATH):
+    """A fresh SQLite database at path with the tables from mysql_setup.sql."""
+    if os.path.exists(path):
+        os.remove(path)
+    with open(schema_path) as f:
+        statements = schema_statements(f.read())
+    conn = Connection(path)
+    try:
+        conn._conn.execute("PRAGMA journal_mode=WAL")  # persistent for the file
+        for statement in statements:
+            conn._conn.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+
+def install(path):
+    """Route every mysql.connector.connect() in this process to the SQLite database at path."""
+    global _database_path
+    _database_path = path
+    mysql.connector.connect = connect
@@ -1,21 +1,35 @@
 from fastapi import APIRouter, HTTPException
 from .queue_manager import QueueManager
-from .timer_manager import TimerManager
-from .penalty_manager import PenaltyManager
+from .timer_manager import TimerManager, TimerStore
+from .penalty_manager import PenaltyManager, PenaltyStore
+from .prebooking_store import create_store, local_pickup_time, pickup_timestamp
+from .assignment import AssignmentEngine
+from backend.utils.geofence import ward_of
 import mysql.connector
+import threading
+import time
 from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel
 import os
 
 class PrebookRideRequest(BaseModel):
     customer_id: int
+    ward: Optional[str] = None  # derived from the pickup coordinates when they are given
+    pickup_time: datetime  # ISO 8601; without an offset it is taken as SERVICE_TIMEZONE
+    pickup_lat: Optional[float] = None
+    pickup_lng: Optional[float] = None
+
+class AvailabilitySlot(BaseModel):
     ward: str
-    pickup_time: str
+    start_time: datetime
+    end_time: datetime
+
+class DriverAvailabilityRequest(BaseModel):
+    driver_id: str
+    slots: List[AvailabilitySlot]
 
 router = APIRouter()
-queue_manager = QueueManager()
-timer_manager = TimerManager(queue_manager)  # Pass queue_manager to TimerManager
-penalty_manager = PenaltyManager()
 
 DB_CONFIG = {
     "host": os.getenv("DB_HOST", "localhost"),
@@ -32,16 +46,118 @@ def get_db_connection():
         database=DB_CONFIG["database"]
     )
 
+def offer_ride(ride, driver_id):
+    """Send a planned match to its driver and give them time to accept"""
+    ride_details = dict(ride, driver_id=driver_id)
+    queue_manager.publish_event(ride["ward"], "ride_offered", ride_details)
+    timer_manager.start_acceptance_timer(ride["ward"], ride_details)
+
+def offer_expired(ward, ride_details):
+    """Penalize the driver who let an offer lapse and let the engine pick someone else"""
+    driver_id = ride_details.get("driver_id")
+    if driver_id is None:
+        # Timer armed before the ride was offered to anyone
+        queue_manager.add_prebook_ride(ward, ride_details)
+    elif assignment_engine.offer_expired(ride_details["ride_id"], driver_id):
+        penalty_manager.add_penalty(driver_id)
+
+queue_manager = QueueManager()
+timer_manager = TimerManager(queue_manager, store=TimerStore(get_db_connection), on_expire=offer_expired)
+penalty_manager = PenaltyManager(store=PenaltyStore(get_db_connection))
+prebooking_store = create_store()
+assignment_engine = AssignmentEngine(prebooking_store, get_penalties=penalty_manager.get_penalties, on_offer=offer_ride)
+_store_lock = threading.Lock()
+_store_loaded = False
+
+def get_prebooking_store(grace_hours=24):
+    """Fill the store from prebooked_rides on first use; afterwards it is kept current in place."""
+    global _store_loaded
+    if not _store_loaded:
+        with _store_lock:
+            if not _store_loaded:
+                conn = get_db_connection()
+                cursor = conn.cursor(dictionary=True)
+                try:
+                    cursor.execute(
+                        "SELECT ride_id, customer_id, ward, pickup_time, status, driver_id FROM prebooked_rides "
+                        "WHERE pickup_time >= NOW() - INTERVAL %s HOUR",
+                        (grace_hours,)
+                    )
+                    rides = cursor.fetchall()
+                    prebooking_store.load(rides)
+                    for ride in rides:
+                        if ride["status"] == "pending":
+                            assignment_engine.ride_added(ride)
+                        elif ride["status"] == "accepted" and ride["driver_id"] is not None:
+                            # Keep accepted drivers committed so they are not matched twice
+                            assignment_engine.restore(ride, ride["driver_id"], accepted=True)
+                finally:
+                    cursor.close()
+                    conn.close()
+                _store_loaded = True
+    return prebooking_store
+
+def load_driver_availability():
+    """Feed current and future driver availability into the assignment engine"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT driver_id, ward, start_time, end_time FROM driver_availability WHERE end_time >= NOW()")
+        slots = {}
+        for row in cursor.fetchall():
+            slots.setdefault(row["driver_id"], []).append(
+                (row["ward"], pickup_timestamp(row["start_time"]), pickup_timestamp(row["end_time"]))
+            )
+    finally:
+        cursor.close()
+        conn.close()
+    for driver_id, driver_slots in slots.items():
+        assignment_engine.set_availability(driver_id, driver_slots)
+    return len(slots)
+
+def restore_offer(ward, ride_details):
+    """Re-register an offer whose acceptance timer survived a restart, so the driver can
+    still accept it and its expiry re-offers the ride"""
+    driver_id = ride_details.get("driver_id")
+    ride = prebooking_store.get(ride_details["ride_id"])
+    if driver_id is not None and ride is not None and ride["status"] == "pending":
+        assignment_engine.restore(ride, driver_id)
+
+@router.on_event("startup")
+def recover_prebookings():
+    """Rebuild the ride index and open offers, re-arm acceptance timers and start matching rides to drivers"""
+    try:
+        get_prebooking_store()
+        recovered = timer_manager.recover(on_recover=restore_offer)
+        print(f"Recovered {recovered} prebooking acceptance timers")
+        print(f"Loaded availability for {load_driver_availability()} drivers")
+    except mysql.connector.Error as e:
+        print(f"Could not recover prebookings: {e}")
+    assignment_engine.start()
+
+@router.on_event("shutdown")
+def close_managers():
+    """Stop matching, flush pending penalties and stop the publisher threads"""
+    assignment_engine.stop()
+    penalty_manager.close()
+    queue_manager.close()
+
 @router.post("/prebook/")
 async def prebook_ride(request: PrebookRideRequest):
     """Prebook a ride and add it to the queue"""
+    # Ward codes come from the boundary polygons whenever the pickup point is known
+    ward = ward_of(request.pickup_lat, request.pickup_lng) or request.ward
+    if not ward:
+        raise HTTPException(status_code=400, detail="Pickup is outside every ward; give a ward or pickup coordinates inside one")
+    pickup_time = local_pickup_time(request.pickup_time)
+
     # Add to database
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
         cursor.execute(
             "INSERT INTO prebooked_rides (customer_id, ward, pickup_time) VALUES (%s, %s, %s)",
-            (request.customer_id, request.ward, request.pickup_time)
+            (request.customer_id, ward, pickup_time)
         )
         conn.commit()
         ride_id = cursor.lastrowid  
@@ -56,19 +172,31 @@ async def prebook_ride(request: PrebookRideRequest):
     ride_details = {
         "ride_id": ride_id,
         "customer_id": request.customer_id,
-        "ward": request.ward,
-        "pickup_time": request.pickup_time
+        "ward": ward,
+        "pickup_time": pickup_time.isoformat()
     }
 
-    # Add to queue and start timer
-    queue_manager.add_prebook_ride(request.ward, ride_details)
-    timer_manager.start_acceptance_timer(request.ward, ride_details)
+    # Index the ride, announce it to dispatchers and queue it for driver matching
+    get_prebooking_store().add(ride_details)
+    queue_manager.add_prebook_ride(ward, ride_details)
+    assignment_engine.ride_added(ride_details)
     return {"message": f"Ride {ride_id} prebooked successfully"}
 
 @router.get("/prebooked_rides/{ward}")
-async def get_prebooked_rides(ward: str):
-    """Get all available prebooked rides for a ward"""
-    rides = queue_manager.get_prebooked_rides(ward)
+async def get_prebooked_rides(ward: str, within_minutes: Optional[int] = None, limit: Optional[int] = None):
+    """Get available prebooked rides for a ward, soonest pickup first"""
+    # Rides whose pickup has passed can no longer be taken
+    start = time.time()
+    end = None
+    if within_minutes is not None:
+        end = start + within_minutes * 60
+    rides = get_prebooking_store().rides_in_ward(ward, start, end, limit)
+    return {"prebooked_rides": rides}
+
+@router.get("/customer/{customer_id}/rides")
+async def get_customer_prebooked_rides(customer_id: int):
+    """Get a customer's prebooked rides"""
+    rides = get_prebooking_store().rides_for_customer(customer_id)
     return {"prebooked_rides": rides}
 
 @router.post("/cancel_prebook/")
@@ -92,6 +220,9 @@ async def cancel_prebook(customer_id: int, ride_id: str):
             (ride_id,)
         )
         conn.commit()
+        get_prebooking_store().set_status(ride_id, "cancelled")
+        timer_manager.cancel_acceptance_timer(ride_id)
+        assignment_engine.ride_removed(ride_id)
 
         # Add penalty to the customer
         penalty_manager.add_penalty(customer_id)
@@ -100,4 +231,55 @@ async def cancel_prebook(customer_id: int, ride_id: str):
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
     finally:
         cursor.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+@router.post("/accept_prebook/")
+async def accept_prebook(driver_id: str, ride_id: int):
+    """Accept a prebooked ride that was offered to this driver"""
+    if assignment_engine.offer_for(ride_id) != driver_id:
+        raise HTTPException(status_code=404, detail="Ride not offered to this driver")
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE prebooked_rides SET status = 'accepted', driver_id = %s WHERE ride_id = %s AND status = 'pending'",
+            (driver_id, ride_id)
+        )
+        conn.commit()
+        if cursor.rowcount == 0:
+            raise HTTPException(status_code=409, detail="Ride already accepted or cancelled")
+    except mysql.connector.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+    assignment_engine.accept(ride_id, driver_id)
+    timer_manager.cancel_acceptance_timer(ride_id)
+    get_prebooking_store().set_status(ride_id, "accepted", driver_id)
+    return {"message": f"Ride {ride_id} accepted by driver {driver_id}"}
+
+@router.post("/driver_availability/")
+async def set_driver_availability(request: DriverAvailabilityRequest):
+    """Replace a driver's upcoming availability windows used for prebooking assignment"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM driver_availability WHERE driver_id = %s", (request.driver_id,))
+        cursor.executemany(
+            "INSERT INTO driver_availability (driver_id, ward, start_time, end_time) VALUES (%s, %s, %s, %s)",
+            [(request.driver_id, slot.ward, local_pickup_time(slot.start_time), local_pickup_time(slot.end_time))
+             for slot in request.slots]
+        )
+        conn.commit()
+    except mysql.connector.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+    assignment_engine.set_availability(request.driver_id, [
+        (slot.ward, pickup_timestamp(slot.start_time), pickup_timestamp(slot.end_time)) for slot in request.slots
+    ])
+    return {"message": f"Availability updated for driver {request.driver_id}", "slots": len(request.slots)}
@@ -0,0 +1,310 @@
+import threading
+import time
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from backend.utils.sorted_set import SortedSet
+from .prebooking_store import pickup_timestamp
+
+WINDOW_SECONDS = 30 * 60  # Rides are matched in batches per ward and pickup window
+HORIZON_SECONDS = 24 * 3600  # How far ahead windows are planned
+OFFER_LEAD_SECONDS = 2 * 3600  # Planned matches are offered to drivers this long before pickup
+RIDE_GAP_SECONDS = 60 * 60  # A driver is not given two pickups closer together than this
+RETENTION_SECONDS = 24 * 3600  # Rides are kept in the store this long past pickup, as on reload
+PRUNE_INTERVAL = 10 * 60  # How often the matching loop drops rides past retention
+PENALTY_WEIGHT = 0.5  # Cost of one unit of driver penalty, in hours of idle time
+INFEASIBLE = 1e9
+
+class DriverAvailability:
+    """Slots during which drivers expect to be free in a ward, indexed by ward and start time."""
+
+    def __init__(self):
+        self._slots = {}  # slot_id -> (driver_id, ward, start, end)
+        self._by_ward = {}  # ward -> SortedSet of slot_id by start
+        self._by_driver = {}  # driver_id -> set of slot_id
+        self._next_id = 0
+
+    def add(self, driver_id, ward, start, end):
+        slot_id = self._next_id
+        self._next_id += 1
+        self._slots[slot_id] = (driver_id, ward, start, end)
+        self._by_ward.setdefault(ward, SortedSet()).add(slot_id, start)
+        self._by_driver.setdefault(driver_id, set()).add(slot_id)
+        return slot_id
+
+    def clear(self, driver_id):
+        """Remove all of a driver's slots; returns them so callers can mark their windows stale."""
+        removed = []
+        for slot_id in self._by_driver.pop(driver_id, ()):
+            slot = self._slots.pop(slot_id)
+            self._by_ward[slot[1]].remove(slot_id)
+            removed.append(slot)
+        return removed
+
+    def covering(self, ward, start, end):
+        """Slots in a ward overlapping [start, end]."""
+        ward_slots = self._by_ward.get(ward)
+        if ward_slots is None:
+            return []
+        slots = (self._slots[slot_id] for slot_id, _ in ward_slots.range_by_score(max_score=end))
+        return [slot for slot in slots if slot[3] >= start]
+
+    def prune(self, before):
+        """Drop slots that ended before the cutoff."""
+        stale = [slot_id for slot_id, slot in self._slots.items() if slot[3] < before]
+        for slot_id in stale:
+            driver_id, ward, _, _ = self._slots.pop(slot_id)
+            self._by_ward[ward].remove(slot_id)
+            self._by_driver[driver_id].discard(slot_id)
+        return len(stale)
+
+class AssignmentEngine:
+    """Matches pending prebookings to available drivers, one ward/pickup window at a time.
+
+    Each window is solved as a minimum-cost bipartite matching (Hungarian algorithm via
+    scipy) so rides compete for drivers as a batch instead of first-come-first-served.
+    New rides, cancellations, availability changes and expired offers only mark their
+    window dirty; run_once() re-solves just those windows. Matches stay tentative and
+    are re-optimized freely until the window is within OFFER_LEAD_SECONDS of pickup,
+    when they are offered to drivers. Offered and accepted matches are fixed.
+    """
+
+    def __init__(self, store, get_penalties=None, on_offer=None, window=WINDOW_SECONDS, horizon=HORIZON_SECONDS,
+                 offer_lead=OFFER_LEAD_SECONDS, ride_gap=RIDE_GAP_SECONDS, retention=RETENTION_SECONDS,
+                 prune_interval=PRUNE_INTERVAL):
+        self.store = store
+        self.get_penalties = get_penalties
+        self.on_offer = on_offer
+        self.window = window
+        self.horizon = horizon
+        self.offer_lead = offer_lead
+        self.ride_gap = ride_gap
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.availability = DriverAvailability()
+        self._plan = {}  # (ward, window_start) -> {ride_id: driver_id}, tentative
+        self._offers = {}  # ride_id -> (driver_id, ward, pickup)
+        self._accepted = {}  # ride_id -> (driver_id, ward, pickup)
+        self._commitments = {}  # driver_id -> SortedSet of ride_id by pickup, for planned, offered and accepted rides
+        self._declined = {}  # ride_id -> (pickup, {driver_id}) never to retry
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _window_start(self, ts):
+        return ts - ts % self.window
+
+    def _mark_dirty(self, ward, start, end):
+        window_start = self._window_start(start)
+        while window_start <= end:
+            self._dirty.add((ward, window_start))
+            window_start += self.window
+
+    def ride_added(self, ride):
+        pickup = pickup_timestamp(ride["pickup_time"])
+        with self._lock:
+            self._mark_dirty(ride["ward"], pickup, pickup)
+
+    def ride_removed(self, ride_id):
+        """Forget a cancelled ride and free its driver"""
+        ride_id = int(ride_id)
+        with self._lock:
+            for matches in (self._offers, self._accepted):
+                match = matches.pop(ride_id, None)
+                if match is not None:
+                    self._release(match[0], ride_id)
+                    self._mark_dirty(match[1], match[2], match[2])
+            for (ward, window_start), plan in self._plan.items():
+                driver_id = plan.pop(ride_id, None)
+                if driver_id is not None:
+                    self._release(driver_id, ride_id)
+                    self._dirty.add((ward, window_start))
+                    break
+            self._declined.pop(ride_id, None)
+
+    def set_availability(self, driver_id, slots):
+        """Replace a driver's availability with [(ward, start, end)] slots (epoch seconds)"""
+        with self._lock:
+            for _, ward, start, end in self.availability.clear(driver_id):
+                self._mark_dirty(ward, start, end)
+            for ward, start, end in slots:
+                self.availability.add(driver_id, ward, start, end)
+                self._mark_dirty(ward, start, end)
+
+    def restore(self, ride, driver_id, accepted=False):
+        """Re-register an offer or acceptance made before a restart; it stays fixed as before"""
+        ride_id = int(ride["ride_id"])
+        pickup = pickup_timestamp(ride["pickup_time"])
+        with self._lock:
+            matches = self._accepted if accepted else self._offers
+            matches[ride_id] = (driver_id, ride["ward"], pickup)
+            self._commit(driver_id, ride_id, pickup)
+
+    def offer_for(self, ride_id):
+        with self._lock:
+            match = self._offers.get(int(ride_id))
+            return match[0] if match else None
+
+    def accept(self, ride_id, driver_id):
+        """Confirm an offer; returns False if the ride is not currently offered to this driver"""
+        ride_id = int(ride_id)
+        with self._lock:
+            match = self._offers.get(ride_id)
+            if match is None or match[0] != driver_id:
+                return False
+            self._accepted[ride_id] = self._offers.pop(ride_id)
+            return True
+
+    def offer_expired(self, ride_id, driver_id):
+        """The driver let the offer lapse; never offer them this ride again and re-solve its window"""
+        ride_id = int(ride_id)
+        with self._lock:
+            match = self._offers.get(ride_id)
+            if match is not None:
+                pickup = match[2]
+            else:
+                ride = self.store.get(ride_id)
+                pickup = pickup_timestamp(ride["pickup_time"]) if ride else None
+            if pickup is not None:
+                self._declined.setdefault(ride_id, (pickup, set()))[1].add(driver_id)
+            if match is None or match[0] != driver_id:
+                return False
+            del self._offers[ride_id]
+            self._release(driver_id, ride_id)
+            self._mark_dirty(match[1], match[2], match[2])
+            return True
+
+    def run_once(self, now=None):
+        """Re-solve dirty windows in the planning horizon, then send offers that are due.
+
+        Returns (windows solved, offers made).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            due = sorted(key for key in self._dirty
+                         if key[1] + self.window > now and key[1] < now + self.horizon)
+            self._dirty.difference_update(due)
+            # Past windows and slots can't be served any more
+            self._dirty = {key for key in self._dirty if key[1] + self.window > now}
+            self.availability.prune(now)
+            for ward, window_start in due:
+                self._solve_window(ward, window_start)
+            offers = self._take_due_offers(now)
+
+        if self.on_offer:
+            for ride, driver_id in offers:
+                self.on_offer(ride, driver_id)
+        return len(due), len(offers)
+
+    def prune(self, now=None):
+        """Drop rides whose pickup is more than `retention` in the past, from the store and
+        from the engine's offers, acceptances, driver commitments and declines"""
+        now = time.time() if now is None else now
+        cutoff = now - self.retention
+        pruned = self.store.prune(cutoff)
+        with self._lock:
+            for matches in (self._offers, self._accepted):
+                for ride_id in [ride_id for ride_id, match in matches.items() if match[2] < cutoff]:
+                    del matches[ride_id]
+            for driver_id in list(self._commitments):
+                commitments = self._commitments[driver_id]
+                for ride_id, _ in commitments.range_by_score(max_score=cutoff, max_exclusive=True):
+                    commitments.remove(ride_id)
+                if not commitments:
+                    del self._commitments[driver_id]
+            for ride_id in [ride_id for ride_id, (pickup, _) in self._declined.items() if pickup < cutoff]:
+                del self._declined[ride_id]
+        return pruned
+
+    def start(self, interval=5.0):
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="prebooking-assignment", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, interval):
+        last_prune = 0.0
+        while not self._stop.wait(interval):
+            try:
+                self.run_once()
+                if time.time() - last_prune >= self.prune_interval:
+                    last_prune = time.time()
+                    self.prune(last_prune)
+            except Exception as e:
+                print(f"Prebooking assignment failed: {e}")
+
+    def _commit(self, driver_id, ride_id, pickup):
+        self._commitments.setdefault(driver_id, SortedSet()).add(ride_id, pickup)
+
+    def _release(self, driver_id, ride_id):
+        commitments = self._commitments.get(driver_id)
+        if commitments is not None:
+            commitments.remove(ride_id)
+            if not commitments:
+                del self._commitments[driver_id]
+
+    def _is_free(self, driver_id, pickup):
+        """No other pickup of the driver's within ride_gap either side, in O(log n)"""
+        commitments = self._commitments.get(driver_id)
+        return commitments is None or not commitments.range_by_score(
+            pickup - self.ride_gap, pickup + self.ride_gap, count=1, min_exclusive=True, max_exclusive=True)
+
+    def _has_declined(self, ride_id, driver_id):
+        declined = self._declined.get(ride_id)
+        return declined is not None and driver_id in declined[1]
+
+    def _solve_window(self, ward, window_start):
+        window_end = window_start + self.window
+        # Tentative matches in this window are re-solved from scratch
+        for ride_id, driver_id in self._plan.pop((ward, window_start), {}).items():
+            self._release(driver_id, ride_id)
+
+        rides = [ride for ride in self.store.rides_in_ward(ward, window_start, window_end - 1e-6)
+                 if ride["ride_id"] not in self._offers and ride["ride_id"] not in self._accepted]
+        slots = self.availability.covering(ward, window_start, window_end)
+        if not rides or not slots:
+            return
+
+        drivers = sorted({slot[0] for slot in slots})
+        column = {driver_id: j for j, driver_id in enumerate(drivers)}
+        penalties = self.get_penalties(drivers) if self.get_penalties else {}
+
+        cost = np.full((len(rides), len(drivers)), INFEASIBLE)
+        for i, ride in enumerate(rides):
+            pickup = pickup_timestamp(ride["pickup_time"])
+            for driver_id, _, start, end in slots:
+                if not start <= pickup <= end or self._has_declined(ride["ride_id"], driver_id):
+                    continue
+                if not self._is_free(driver_id, pickup):
+                    continue
+                # Prefer drivers who have waited least since their slot opened, and fewer penalties
+                idle_hours = (pickup - start) / 3600
+                j = column[driver_id]
+                cost[i, j] = min(cost[i, j], idle_hours + PENALTY_WEIGHT * penalties.get(str(driver_id), 0.0))
+
+        row_ind, col_ind = linear_sum_assignment(cost)
+        plan = {}
+        for i, j in zip(row_ind, col_ind):
+            if cost[i, j] >= INFEASIBLE:
+                continue
+            ride_id, driver_id = rides[i]["ride_id"], drivers[j]
+            plan[ride_id] = driver_id
+            self._commit(driver_id, ride_id, pickup_timestamp(rides[i]["pickup_time"]))
+        if plan:
+            self._plan[(ward, window_start)] = plan
+
+    def _take_due_offers(self, now):
+        offers = []
+        for key in [key for key in self._plan if key[1] < now + self.offer_lead]:
+            ward, _ = key
+            for ride_id, driver_id in self._plan.pop(key).items():
+                ride = self.store.get(ride_id)
+                if ride is None or ride["status"] != "pending":
+                    self._release(driver_id, ride_id)
+                    continue
+                self._offers[ride_id] = (driver_id, ward, pickup_timestamp(ride["pickup_time"]))
+                offers.append((ride, driver_id))
+        return offers
@@ -0,0 +1,51 @@
+import argparse
+import random
+import time
+from datetime import datetime
+from .assignment import AssignmentEngine
+from .prebooking_store import SERVICE_TIMEZONE, PrebookingStore
+
+def run(n_rides=30_000, n_drivers=3_000, n_wards=50, n_updates=200, seed=7):
+    """Plan a day of prebookings, then time incremental re-solves after a burst of new rides."""
+    rng = random.Random(seed)
+    day_start = time.time() + 3600
+    store = PrebookingStore()
+    engine = AssignmentEngine(store, offer_lead=0)
+
+    def add_ride(ride_id):
+        ride = {
+            "ride_id": ride_id, "customer_id": rng.randrange(100_000), "ward": f"ward_{rng.randrange(n_wards)}",
+            "pickup_time": datetime.fromtimestamp(day_start + rng.random() * 86400, SERVICE_TIMEZONE).isoformat()
+        }
+        store.add(ride)
+        engine.ride_added(ride)
+
+    for driver in range(n_drivers):
+        ward = f"ward_{rng.randrange(n_wards)}"
+        start = day_start + rng.random() * 80000
+        engine.set_availability(f"driver_{driver}", [(ward, start, start + rng.uniform(4, 10) * 3600)])
+    for ride_id in range(n_rides):
+        add_ride(ride_id)
+
+    start = time.perf_counter()
+    windows, _ = engine.run_once(now=day_start)
+    full_seconds = time.perf_counter() - start
+    planned = sum(len(plan) for plan in engine._plan.values())
+
+    for ride_id in range(n_rides, n_rides + n_updates):
+        add_ride(ride_id)
+    start = time.perf_counter()
+    dirty_windows, _ = engine.run_once(now=day_start)
+    incremental_seconds = time.perf_counter() - start
+
+    print(f"Planned {planned}/{n_rides} rides for {n_drivers} drivers across {windows} windows in {full_seconds:.3f}s")
+    print(f"Re-solved {dirty_windows} dirty windows after {n_updates} new rides in {incremental_seconds * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time batch assignment of a day of prebooked rides")
+    parser.add_argument("--rides", type=int, default=30_000)
+    parser.add_argument("--drivers", type=int, default=3_000)
+    parser.add_argument("--wards", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rides, args.drivers, args.wards, args.updates)
@@ -0,0 +1,50 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from .queue_manager import QueueManager, create_publisher
+
+def run(n_messages=50_000, n_wards=20, n_threads=8):
+    """Publish n_messages from n_threads producers and wait for every broker confirm."""
+    queue_manager = QueueManager(create_publisher())
+    if not queue_manager.publisher.wait_connected(timeout=10):
+        print("Publisher did not connect within 10s")
+        queue_manager.close()
+        return
+
+    latencies = []
+
+    def produce(worker):
+        futures = []
+        for i in range(worker, n_messages, n_threads):
+            sent = time.perf_counter()
+            future = queue_manager.add_prebook_ride(f"ward_{i % n_wards}", {
+                "ride_id": i, "customer_id": i % 1000, "ward": f"ward_{i % n_wards}",
+                "pickup_time": "2025-01-01T09:00:00"
+            })
+            future.add_done_callback(lambda f, sent=sent: latencies.append(time.perf_counter() - sent))
+            futures.append(future)
+        return futures
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(n_threads) as pool:
+        futures = [f for batch in pool.map(produce, range(n_threads)) for f in batch]
+    enqueue_seconds = time.perf_counter() - start
+    done, not_done = wait(futures, timeout=120)
+    confirm_seconds = time.perf_counter() - start
+    failed = sum(1 for f in done if f.exception() is not None)
+    queue_manager.close()
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float("nan")
+    print(f"Enqueued {n_messages} messages from {n_threads} threads in {enqueue_seconds:.3f}s")
+    print(f"Confirmed {len(done) - failed}/{n_messages} in {confirm_seconds:.3f}s "
+          f"({(len(done) - failed) / confirm_seconds:,.0f} msg/s); failed={failed} unconfirmed={len(not_done)}")
+    print(f"Confirm latency p50={pct(0.5):.2f}ms p99={pct(0.99):.2f}ms max={pct(1.0):.2f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure prebooking event publish throughput (set QUEUE_BROKER=memory for the stand-in)")
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--wards", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    run(args.messages, args.wards, args.threads)
@@ -0,0 +1,55 @@
+import argparse
+import random
+import threading
+import time
+from .timer_manager import TimerScheduler
+
+def run(n_timers=100_000, spread=2.0, cancel_fraction=0.1, seed=42):
+    """Schedule n_timers over the next `spread` seconds, cancel some, and wait for the rest to fire."""
+    rng = random.Random(seed)
+    scheduler = TimerScheduler(name="benchmark-timers")
+    threads_before = threading.active_count()
+
+    lateness = []
+    done = threading.Event()
+    cancelled = set(rng.sample(range(n_timers), int(n_timers * cancel_fraction)))
+    expected = n_timers - len(cancelled)
+
+    def make_callback(deadline):
+        def callback():
+            lateness.append(time.time() - deadline)
+            if len(lateness) == expected:
+                done.set()
+        return callback
+
+    start = time.perf_counter()
+    # Leave time to finish scheduling and cancelling before the first deadline
+    base = time.time() + 2.0
+    for i in range(n_timers):
+        deadline = base + rng.random() * spread
+        scheduler.schedule(i, deadline, make_callback(deadline))
+    schedule_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in cancelled:
+        scheduler.cancel(i)
+    cancel_seconds = time.perf_counter() - start
+
+    done.wait(timeout=spread + 32)
+    threads_during = threading.active_count()
+    scheduler.stop()
+
+    lateness.sort()
+    pct = lambda q: lateness[min(len(lateness) - 1, int(q * len(lateness)))] * 1000 if lateness else float("nan")
+    print(f"Scheduled {n_timers} timers in {schedule_seconds:.3f}s ({n_timers / schedule_seconds:,.0f}/s)")
+    print(f"Cancelled {len(cancelled)} timers in {cancel_seconds:.3f}s")
+    print(f"Fired {len(lateness)}/{expected} timers; lateness p50={pct(0.5):.2f}ms p99={pct(0.99):.2f}ms max={pct(1.0):.2f}ms")
+    print(f"Threads: {threads_before} before scheduling, {threads_during} while firing")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Schedule and fire many prebooking timers on one thread")
+    parser.add_argument("--timers", type=int, default=100_000)
+    parser.add_argument("--spread", type=float, default=2.0, help="Seconds over which deadlines are spread")
+    parser.add_argument("--cancel-fraction", type=float, default=0.1)
+    args = parser.parse_args()
+    run(args.timers, args.spread, args.cancel_fraction)
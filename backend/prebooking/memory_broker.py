@@ -0,0 +1,37 @@
+import collections
+import threading
+from concurrent.futures import Future
+
+class InMemoryBroker:
+    """In-process stand-in for PublisherPool: same publish()/close() API, queues kept in memory.
+
+    Messages are confirmed as soon as they are stored; get() lets tests and local runs
+    read back what was published.
+    """
+
+    def __init__(self):
+        self.queues = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+
+    def publish(self, queue_name, body):
+        with self._lock:
+            self.queues[queue_name].append(body)
+        future = Future()
+        future.set_result(True)
+        return future
+
+    def get(self, queue_name):
+        """Pop the oldest message on a queue, or None if it is empty."""
+        with self._lock:
+            messages = self.queues.get(queue_name)
+            return messages.popleft() if messages else None
+
+    def message_count(self, queue_name):
+        with self._lock:
+            return len(self.queues.get(queue_name, ()))
+
+    def wait_connected(self, timeout=None):
+        return True
+
+    def close(self):
+        pass
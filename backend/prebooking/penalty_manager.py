@@ -1,18 +1,205 @@
+import os
+import threading
+import time
+
+PENALTY_HALF_LIFE_DAYS = float(os.getenv("PENALTY_HALF_LIFE_DAYS", "30"))
+PENALTY_FLUSH_INTERVAL = float(os.getenv("PENALTY_FLUSH_INTERVAL", "2"))
+
+def decay(score, since, now, half_life):
+    """Score carried from `since` to `now`, halving every half_life seconds."""
+    if not score or now <= since:
+        return score
+    return score * 0.5 ** ((now - since) / half_life)
+
+class PenaltyStore:
+    """Penalty totals in MySQL, merged with batched upserts that apply the same decay."""
+
+    def __init__(self, get_connection, half_life_days=PENALTY_HALF_LIFE_DAYS):
+        self.get_connection = get_connection
+        self.half_life = half_life_days * 86400
+
+    def merge_many(self, deltas):
+        """Fold [(party_id, score, count, updated_at)] into the table in one statement batch."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            # Assignments run left to right, so score decays from the stored updated_at
+            # before updated_at itself moves forward
+            cursor.executemany(
+                "INSERT INTO prebooking_penalties (party_id, score, total_count, updated_at) VALUES (%s, %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE "
+                f"score = score * POW(0.5, GREATEST(VALUES(updated_at) - updated_at, 0) / {self.half_life!r}) + VALUES(score), "
+                "total_count = total_count + VALUES(total_count), "
+                "updated_at = GREATEST(updated_at, VALUES(updated_at))",
+                deltas
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def load_many(self, party_ids):
+        """{party_id: (score, total_count, updated_at)} for the ids that have a row."""
+        if not party_ids:
+            return {}
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            placeholders = ", ".join(["%s"] * len(party_ids))
+            cursor.execute(
+                f"SELECT party_id, score, total_count, updated_at FROM prebooking_penalties WHERE party_id IN ({placeholders})",
+                list(party_ids)
+            )
+            return {party_id: (float(score), int(count), float(updated_at))
+                    for party_id, score, count, updated_at in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
+    def delete(self, party_id):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM prebooking_penalties WHERE party_id = %s", (party_id,))
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
 class PenaltyManager:
-    def __init__(self):
-        self.penalties = {}  # Stores driver penalties
-
-    def add_penalty(self, driver_id):
-        """Increase penalty count for a driver"""
-        self.penalties[driver_id] = self.penalties.get(driver_id, 0) + 1
-        print(f"Penalty added to driver {driver_id}. Total penalties: {self.penalties[driver_id]}")
-
-    def get_penalty(self, driver_id):
-        """Retrieve the penalty count for a driver"""
-        return self.penalties.get(driver_id, 0)
-
-    def reset_penalty(self, driver_id):
-        """Reset a driver's penalties"""
-        if driver_id in self.penalties:
-            del self.penalties[driver_id]
-            print(f"Penalties reset for driver {driver_id}")
+    """Cancellation penalties with hot counters in memory and write-behind to MySQL.
+
+    add_penalty only touches a dict; a background thread flushes accumulated deltas every
+    flush_interval seconds in one batch. Scores decay exponentially, so old cancellations
+    weigh less. Without a store the ledger is purely in memory.
+    """
+
+    def __init__(self, store=None, half_life_days=PENALTY_HALF_LIFE_DAYS, flush_interval=PENALTY_FLUSH_INTERVAL,
+                 cache_ttl=60):
+        self.store = store
+        self.half_life = half_life_days * 86400
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        self._pending = {}  # party_id -> [score, count, updated_at] not yet flushed
+        self._cache = {}  # party_id -> (score, count, updated_at, loaded_at) as last seen in the store
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if store is not None:
+            self._thread = threading.Thread(target=self._flush_loop, name="penalty-flusher", daemon=True)
+            self._thread.start()
+
+    def add_penalty(self, party_id, weight=1.0):
+        """Record a cancellation penalty"""
+        party_id = str(party_id)
+        now = time.time()
+        with self._lock:
+            entry = self._pending.get(party_id)
+            if entry is None:
+                self._pending[party_id] = [weight, 1, now]
+            else:
+                entry[0] = decay(entry[0], entry[2], now, self.half_life) + weight
+                entry[1] += 1
+                entry[2] = now
+
+    def get_penalty(self, party_id):
+        """Current decayed penalty score for one driver or customer"""
+        return self.get_penalties([party_id])[str(party_id)]
+
+    def get_penalty_count(self, party_id):
+        """Undecayed number of penalties ever recorded"""
+        party_id = str(party_id)
+        self._refresh_cache([party_id])
+        with self._lock:
+            cached = self._cache.get(party_id)
+            pending = self._pending.get(party_id)
+            return (cached[1] if cached else 0) + (pending[1] if pending else 0)
+
+    def get_penalties(self, party_ids):
+        """Decayed penalty scores for many parties with at most one query, for ranking candidates"""
+        party_ids = [str(party_id) for party_id in party_ids]
+        self._refresh_cache(party_ids)
+        now = time.time()
+        scores = {}
+        with self._lock:
+            for party_id in party_ids:
+                score = 0.0
+                cached = self._cache.get(party_id)
+                if cached:
+                    score += decay(cached[0], cached[2], now, self.half_life)
+                pending = self._pending.get(party_id)
+                if pending:
+                    score += decay(pending[0], pending[2], now, self.half_life)
+                scores[party_id] = score
+        return scores
+
+    def reset_penalty(self, party_id):
+        """Reset a driver's or customer's penalties"""
+        party_id = str(party_id)
+        with self._flush_lock:
+            with self._lock:
+                self._pending.pop(party_id, None)
+                self._cache.pop(party_id, None)
+            if self.store is not None:
+                self.store.delete(party_id)
+
+    def flush(self):
+        """Write accumulated deltas to the store; they are kept for the next flush if it fails."""
+        if self.store is None:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            rows = [(party_id, score, count, updated_at) for party_id, (score, count, updated_at) in batch.items()]
+            try:
+                self.store.merge_many(rows)
+            except Exception as e:
+                print(f"Penalty flush failed, retrying later: {e}")
+                with self._lock:
+                    for party_id, entry in batch.items():
+                        self._pending[party_id] = self._combine(self._pending.get(party_id), entry)
+                return 0
+            with self._lock:
+                for party_id, entry in batch.items():
+                    cached = self._cache.get(party_id)
+                    if cached is not None:
+                        self._cache[party_id] = (*self._combine(cached[:3], entry), cached[3])
+            return len(rows)
+
+    def close(self):
+        """Stop the flusher after a final flush"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _combine(self, a, b):
+        """Sum two (score, count, updated_at) entries, decaying both to the later time."""
+        if a is None:
+            return list(b)
+        now = max(a[2], b[2])
+        return [decay(a[0], a[2], now, self.half_life) + decay(b[0], b[2], now, self.half_life), a[1] + b[1], now]
+
+    def _refresh_cache(self, party_ids):
+        if self.store is None:
+            return
+        now = time.time()
+        with self._lock:
+            missing = [party_id for party_id in party_ids
+                       if party_id not in self._cache or now - self._cache[party_id][3] > self.cache_ttl]
+        if not missing:
+            return
+        # Taken under the flush lock so a flush can't land between the read and the cache update
+        with self._flush_lock:
+            rows = self.store.load_many(missing)
+            with self._lock:
+                for party_id in missing:
+                    score, count, updated_at = rows.get(party_id, (0.0, 0, now))
+                    self._cache[party_id] = (score, count, updated_at, now)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from backend.utils.redis_client import get_redis_client
+from backend.utils.sorted_set import SortedSet
+
+PREBOOKING_STORE = os.getenv("PREBOOKING_STORE", "memory")
+# Pickup times without an offset, as stored in prebooked_rides, are wall-clock times here
+SERVICE_TIMEZONE = ZoneInfo(os.getenv("SERVICE_TIMEZONE", "Asia/Kolkata"))
+
+def local_pickup_time(pickup_time):
+    """A datetime or ISO string as a naive SERVICE_TIMEZONE datetime, the form prebooked_rides
+    stores; times with an offset are converted, naive ones are taken as already local."""
+    if isinstance(pickup_time, str):
+        pickup_time = datetime.fromisoformat(pickup_time)
+    if pickup_time.tzinfo is not None:
+        pickup_time = pickup_time.astimezone(SERVICE_TIMEZONE).replace(tzinfo=None)
+    return pickup_time
+
+def pickup_timestamp(pickup_time):
+    """Epoch seconds for a pickup_time given as a datetime or ISO string; naive times are in
+    SERVICE_TIMEZONE, not the server's local zone."""
+    if isinstance(pickup_time, str):
+        pickup_time = datetime.fromisoformat(pickup_time)
+    if pickup_time.tzinfo is None:
+        pickup_time = pickup_time.replace(tzinfo=SERVICE_TIMEZONE)
+    return pickup_time.timestamp()
+
+def _ride_record(ride):
+    pickup_time = ride["pickup_time"]
+    if isinstance(pickup_time, datetime):
+        pickup_time = pickup_time.isoformat()
+    return {
+        "ride_id": int(ride["ride_id"]),
+        "customer_id": int(ride["customer_id"]),
+        "ward": ride["ward"],
+        "pickup_time": pickup_time,
+        "status": ride.get("status", "pending"),
+        "driver_id": ride.get("driver_id"),
+    }
+
+class PrebookingStore:
+    """Prebooked rides indexed by ward (ordered by pickup time) and by customer, in process memory.
+
+    Only pending rides are in the ward index; the customer index keeps every known ride so
+    customers still see accepted and cancelled bookings.
+    """
+
+    def __init__(self):
+        self._rides = {}
+        self._by_ward = {}
+        self._by_customer = {}
+        self._lock = threading.Lock()
+
+    def add(self, ride):
+        ride = _ride_record(ride)
+        with self._lock:
+            self._remove_from_indexes(ride["ride_id"])
+            self._rides[ride["ride_id"]] = ride
+            self._by_customer.setdefault(ride["customer_id"], set()).add(ride["ride_id"])
+            if ride["status"] == "pending":
+                self._by_ward.setdefault(ride["ward"], SortedSet()).add(ride["ride_id"], pickup_timestamp(ride["pickup_time"]))
+        return ride
+
+    def load(self, rides):
+        for ride in rides:
+            self.add(ride)
+
+    def get(self, ride_id):
+        ride = self._rides.get(int(ride_id))
+        return dict(ride) if ride else None
+
+    def set_status(self, ride_id, status, driver_id=None):
+        """Mark a ride accepted/cancelled; it leaves the ward listing but stays visible to its customer."""
+        with self._lock:
+            ride = self._rides.get(int(ride_id))
+            if ride is None:
+                return None
+            ride["status"] = status
+            if driver_id is not None:
+                ride["driver_id"] = driver_id
+            ward_index = self._by_ward.get(ride["ward"])
+            if status != "pending" and ward_index is not None:
+                ward_index.remove(ride["ride_id"])
+            elif status == "pending":
+                self._by_ward.setdefault(ride["ward"], SortedSet()).add(ride["ride_id"], pickup_timestamp(ride["pickup_time"]))
+            return dict(ride)
+
+    def remove(self, ride_id):
+        with self._lock:
+            return self._remove_from_indexes(int(ride_id))
+
+    def rides_in_ward(self, ward, start=None, end=None, limit=None):
+        """Pending rides in a ward with start <= pickup <= end (epoch seconds), soonest first."""
+        with self._lock:
+            ward_index = self._by_ward.get(ward)
+            if ward_index is None:
+                return []
+            entries = ward_index.range_by_score(
+                float("-inf") if start is None else start,
+                float("inf") if end is None else end,
+                count=limit
+            )
+            return [dict(self._rides[ride_id]) for ride_id, _ in entries]
+
+    def rides_for_customer(self, customer_id):
+        with self._lock:
+            rides = [dict(self._rides[ride_id]) for ride_id in self._by_customer.get(int(customer_id), ())]
+        rides.sort(key=lambda ride: ride["pickup_time"])
+        return rides
+
+    def prune(self, before):
+        """Drop rides whose pickup time (epoch seconds) is before the cutoff."""
+        with self._lock:
+            stale = [ride_id for ride_id, ride in self._rides.items() if pickup_timestamp(ride["pickup_time"]) < before]
+            for ride_id in stale:
+                self._remove_from_indexes(ride_id)
+        return len(stale)
+
+    def _remove_from_indexes(self, ride_id):
+        ride = self._rides.pop(ride_id, None)
+        if ride is None:
+            return None
+        ward_index = self._by_ward.get(ride["ward"])
+        if ward_index is not None:
+            ward_index.remove(ride_id)
+        customer_rides = self._by_customer.get(ride["customer_id"])
+        if customer_rides is not None:
+            customer_rides.discard(ride_id)
+        return ride
+
+class RedisPrebookingStore:
+    """Same interface as PrebookingStore, shared between workers through Redis sorted sets."""
+
+    def __init__(self, redis_client, prefix="prebook"):
+        self.redis = redis_client
+        self.prefix = prefix
+
+    def _ride_key(self, ride_id):
+        return f"{self.prefix}:ride:{int(ride_id)}"
+
+    def _ward_key(self, ward):
+        return f"{self.prefix}:ward:{ward}"
+
+    def _customer_key(self, customer_id):
+        return f"{self.prefix}:customer:{int(customer_id)}"
+
+    def add(self, ride):
+        ride = _ride_record(ride)
+        pipe = self.redis.pipeline()
+        pipe.set(self._ride_key(ride["ride_id"]), json.dumps(ride))
+        pipe.sadd(self._customer_key(ride["customer_id"]), ride["ride_id"])
+        if ride["status"] == "pending":
+            pipe.zadd(self._ward_key(ride["ward"]), {ride["ride_id"]: pickup_timestamp(ride["pickup_time"])})
+        else:
+            pipe.zrem(self._ward_key(ride["ward"]), ride["ride_id"])
+        pipe.execute()
+        return ride
+
+    def load(self, rides):
+        for ride in rides:
+            self.add(ride)
+
+    def get(self, ride_id):
+        data = self.redis.get(self._ride_key(ride_id))
+        return json.loads(data) if data else None
+
+    def set_status(self, ride_id, status, driver_id=None):
+        ride = self.get(ride_id)
+        if ride is None:
+            return None
+        ride["status"] = status
+        if driver_id is not None:
+            ride["driver_id"] = driver_id
+        return self.add(ride)
+
+    def remove(self, ride_id):
+        ride = self.get(ride_id)
+        if ride is None:
+            return None
+        pipe = self.redis.pipeline()
+        pipe.delete(self._ride_key(ride_id))
+        pipe.zrem(self._ward_key(ride["ward"]), ride["ride_id"])
+        pipe.srem(self._customer_key(ride["customer_id"]), ride["ride_id"])
+        pipe.execute()
+        return ride
+
+    def _get_many(self, ride_ids):
+        if not ride_ids:
+            return []
+        pipe = self.redis.pipeline()
+        for ride_id in ride_ids:
+            pipe.get(self._ride_key(ride_id))
+        return [json.loads(data) for data in pipe.execute() if data]
+
+    def rides_in_ward(self, ward, start=None, end=None, limit=None):
+        ride_ids = self.redis.zrangebyscore(
+            self._ward_key(ward),
+            "-inf" if start is None else start,
+            "+inf" if end is None else end,
+            start=0 if limit is not None else None,
+            num=limit
+        )
+        return self._get_many(ride_ids)
+
+    def rides_for_customer(self, customer_id):
+        rides = self._get_many(list(self.redis.smembers(self._customer_key(customer_id))))
+        rides.sort(key=lambda ride: ride["pickup_time"])
+        return rides
+
+    def prune(self, before):
+        """Drop pending rides whose pickup time (epoch seconds) is before the cutoff."""
+        removed = 0
+        for key in self.redis.scan_iter(f"{self.prefix}:ward:*"):
+            for ride_id in self.redis.zrangebyscore(key, "-inf", f"({before}"):
+                removed += self.remove(ride_id) is not None
+        return removed
+
+def create_store(redis_client=None):
+    """Store selected by the PREBOOKING_STORE environment variable ('memory' or 'redis')."""
+    if PREBOOKING_STORE == "redis":
+        if redis_client is None:
+            redis_client = get_redis_client()
+        return RedisPrebookingStore(redis_client)
+    return PrebookingStore()
@@ -0,0 +1,276 @@
+import collections
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import pika
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
+MAX_OUTBOX = 100_000  # Unconfirmed messages accepted before publish() fails fast
+
+class PublishNacked(Exception):
+    """The broker refused a message published in confirm mode."""
+
+class OutboxFull(Exception):
+    """Too many messages are waiting for the broker (e.g. while it is down)."""
+
+class PublisherClosed(Exception):
+    """The pool was closed before the message was confirmed."""
+
+class _Message:
+    __slots__ = ("queue", "body", "future", "attempts")
+
+    def __init__(self, queue_name, body):
+        self.queue = queue_name
+        self.body = body
+        self.future = Future()
+        self.attempts = 0
+
+class ConfirmPublisher(threading.Thread):
+    """Owns one SelectConnection with a confirm-mode channel, driven by its own ioloop.
+
+    A feeder thread blocks on the pool's outbox while connected and hands messages to
+    the ioloop in batches, so an idle publisher does no work. Messages are published
+    without waiting; the broker's (possibly multiple) acks resolve each message's future.
+    Unconfirmed messages are put back on the outbox when the connection drops, and the
+    connection is re-opened with exponential backoff.
+    """
+
+    def __init__(self, outbox, parameters, batch_size=100, max_inflight=1000, max_backoff=30.0,
+                 max_attempts=5, on_done=None, name="rabbitmq-publisher"):
+        super().__init__(name=name, daemon=True)
+        self.outbox = outbox
+        self.parameters = parameters
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.on_done = on_done  # called once per message whose future is resolved
+        self.connected = threading.Event()
+        self._connection = None
+        self._channel = None
+        self._declared = set()
+        self._pending = collections.OrderedDict()  # delivery_tag -> _Message, in publish order
+        self._handoff = collections.deque()  # taken by the feeder, not yet published by the ioloop
+        self._inflight = threading.Semaphore(max_inflight)
+        self._next_tag = 1
+        self._backoff = 1.0
+        self._stopping = False
+        self._feeder = threading.Thread(target=self._feed, name=f"{name}-feeder", daemon=True)
+
+    def start(self):
+        super().start()
+        self._feeder.start()
+
+    def join(self, timeout=None):
+        super().join(timeout)
+        self._feeder.join(timeout)
+
+    def take_unsent(self):
+        """Messages this publisher still holds; only meaningful once it has stopped."""
+        messages = list(self._handoff) + list(self._pending.values())
+        self._handoff.clear()
+        self._pending.clear()
+        return messages
+
+    def run(self):
+        while not self._stopping:
+            self._connection = pika.SelectConnection(
+                self.parameters,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_error,
+                on_close_callback=self._on_connection_closed
+            )
+            self._connection.ioloop.start()
+            if not self._stopping:
+                print(f"{self.name}: reconnecting to RabbitMQ in {self._backoff:.0f}s")
+                time.sleep(self._backoff)
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    def stop(self):
+        """Close the connection once the ioloop is idle; unconfirmed messages stay on the outbox."""
+        self._stopping = True
+        if self._connection is not None:
+            self._connection.ioloop.add_callback_threadsafe(self._close)
+
+    def _close(self):
+        if self._connection.is_open:
+            self._connection.close()
+        else:
+            self._connection.ioloop.stop()
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection, error):
+        print(f"{self.name}: could not connect to RabbitMQ: {error}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        self.connected.clear()
+        self._channel = None
+        self._requeue_pending()
+        if not self._stopping:
+            print(f"{self.name}: connection closed: {reason}")
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        self._declared.clear()
+        self._next_tag = 1
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(self._on_delivery_confirmation, callback=self._on_confirm_mode)
+
+    def _on_channel_closed(self, channel, reason):
+        # A closed channel (e.g. a failed declare) takes the connection with it; run() reconnects
+        if self._connection.is_open:
+            self._connection.close()
+
+    def _on_confirm_mode(self, frame):
+        self._backoff = 1.0
+        self.connected.set()
+        self._publish_handoff()
+
+    def _feed(self):
+        """Block on the outbox and pass batches to the ioloop, at most max_inflight unconfirmed."""
+        while not self._stopping:
+            if not self.connected.wait(timeout=1.0):
+                continue
+            try:
+                batch = [self.outbox.get(timeout=1.0)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.outbox.get_nowait())
+                except queue.Empty:
+                    break
+            acquired = 0
+            while acquired < len(batch) and not self._stopping:
+                acquired += self._inflight.acquire(timeout=1.0)
+            if self._stopping:
+                for message in batch:
+                    self.outbox.put(message)  # close() fails them
+                break
+            self._handoff.extend(batch)
+            try:
+                self._connection.ioloop.add_callback_threadsafe(self._publish_handoff)
+            except Exception:
+                pass  # the ioloop has stopped; the handoff is requeued on close or published on reconnect
+
+    def _publish_handoff(self):
+        """Publish what the feeder handed over (runs on the ioloop)."""
+        if self._channel is None or not self._channel.is_open:
+            return
+        while self._handoff:
+            message = self._handoff.popleft()
+            if message.queue not in self._declared:
+                # Channel commands are processed in order, so publishing right behind
+                # the declare is safe without waiting for Declare-Ok
+                self._channel.queue_declare(queue=message.queue, durable=True)
+                self._declared.add(message.queue)
+            self._channel.basic_publish(
+                exchange="",
+                routing_key=message.queue,
+                body=message.body,
+                properties=pika.BasicProperties(delivery_mode=2)  # Make message persistent
+            )
+            message.attempts += 1
+            self._pending[self._next_tag] = message
+            self._next_tag += 1
+
+    def _on_delivery_confirmation(self, frame):
+        method = frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+        tags = [method.delivery_tag]
+        if method.multiple:
+            tags = []
+            for tag in self._pending:
+                if tag > method.delivery_tag:
+                    break
+                tags.append(tag)
+        for tag in tags:
+            message = self._pending.pop(tag, None)
+            if message is None:
+                continue
+            self._inflight.release()
+            if acked:
+                self._resolve(message, None)
+            elif message.attempts < self.max_attempts:
+                self.outbox.put(message)
+            else:
+                self._resolve(message, PublishNacked(f"Broker nacked message for {message.queue}"))
+
+    def _resolve(self, message, error):
+        if error is None:
+            message.future.set_result(True)
+        else:
+            message.future.set_exception(error)
+        if self.on_done:
+            self.on_done()
+
+    def _requeue_pending(self):
+        if self._stopping:
+            return  # kept for take_unsent(), which fails them
+        while self._pending:
+            _, message = self._pending.popitem(last=False)
+            self._inflight.release()
+            self.outbox.put(message)
+        while self._handoff:
+            self._inflight.release()
+            self.outbox.put(self._handoff.popleft())
+
+class PublisherPool:
+    """Thread-safe publishing front end over a few ConfirmPublisher connections.
+
+    publish() only enqueues and returns a Future, so request handlers and timer threads
+    never touch a pika connection directly. At most max_outbox messages may be waiting
+    for a confirm; beyond that (e.g. while the broker is down) publish() fails the future
+    with OutboxFull instead of growing without bound. close() fails whatever is left
+    with PublisherClosed.
+    """
+
+    def __init__(self, host=RABBITMQ_HOST, size=2, batch_size=100, max_inflight=1000, max_outbox=MAX_OUTBOX):
+        self.outbox = queue.Queue()
+        self._capacity = threading.BoundedSemaphore(max_outbox)
+        self._closed = False
+        parameters = pika.ConnectionParameters(host, heartbeat=30)
+        self.publishers = [
+            ConfirmPublisher(self.outbox, parameters, batch_size, max_inflight, on_done=self._capacity.release,
+                             name=f"rabbitmq-publisher-{i}")
+            for i in range(size)
+        ]
+        for publisher in self.publishers:
+            publisher.start()
+
+    def publish(self, queue_name, body):
+        message = _Message(queue_name, body)
+        if self._closed:
+            message.future.set_exception(PublisherClosed("Publisher pool is closed"))
+        elif not self._capacity.acquire(blocking=False):
+            message.future.set_exception(OutboxFull(f"{self.outbox.qsize()} messages waiting for RabbitMQ"))
+        else:
+            self.outbox.put(message)
+        return message.future
+
+    def wait_connected(self, timeout=None):
+        return all(publisher.connected.wait(timeout) for publisher in self.publishers)
+
+    def close(self):
+        """Stop the connections and fail every message not yet confirmed."""
+        self._closed = True
+        for publisher in self.publishers:
+            publisher.stop()
+        for publisher in self.publishers:
+            publisher.join(timeout=5)
+        unsent = [message for publisher in self.publishers for message in publisher.take_unsent()]
+        while True:
+            try:
+                unsent.append(self.outbox.get_nowait())
+            except queue.Empty:
+                break
+        for message in unsent:
+            if not message.future.done():
+                message.future.set_exception(PublisherClosed("Publisher pool closed before the broker confirmed"))
+        if unsent:
+            print(f"Publisher pool closed with {len(unsent)} unconfirmed messages")
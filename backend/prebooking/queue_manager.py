@@ -1,40 +1,57 @@
-import pika
 import json
+import os
+import threading
 import time
 
-RABBITMQ_HOST = "localhost"
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
+QUEUE_BROKER = os.getenv("QUEUE_BROKER", "rabbitmq")
+
+def create_publisher():
+    """Publisher selected by the QUEUE_BROKER environment variable ('rabbitmq' or 'memory')."""
+    if QUEUE_BROKER == "memory":
+        from .memory_broker import InMemoryBroker
+        return InMemoryBroker()
+    from .publisher import PublisherPool
+    return PublisherPool(
+        host=RABBITMQ_HOST,
+        size=int(os.getenv("RABBITMQ_PUBLISHERS", "2")),
+        batch_size=int(os.getenv("RABBITMQ_BATCH_SIZE", "100")),
+        max_outbox=int(os.getenv("RABBITMQ_MAX_OUTBOX", "100000"))
+    )
 
 class QueueManager:
-    def __init__(self):
-        self.connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
-        self.channel = self.connection.channel()
+    """Publishes prebooking dispatch events to per-ward RabbitMQ queues.
 
-    def create_queue(self, ward):
-        """Declare a queue for the given ward"""
-        self.channel.queue_declare(queue=f"prebook_{ward}", durable=True)
+    Listings are served from the prebooking store; the queues are only consumed by dispatchers.
+    The broker connection is opened on first publish, not at import.
+    """
 
-    def add_prebook_ride(self, ward, ride_details):
-        """Publish a prebooked ride to the ward-specific queue"""
-        self.create_queue(ward)  # Ensure the queue exists
-        self.channel.basic_publish(
-            exchange="",
-            routing_key=f"prebook_{ward}",
-            body=json.dumps(ride_details),
-            properties=pika.BasicProperties(delivery_mode=2)  # Make message persistent
+    def __init__(self, publisher=None):
+        self._publisher = publisher
+        self._lock = threading.Lock()
+
+    @property
+    def publisher(self):
+        if self._publisher is None:
+            with self._lock:
+                if self._publisher is None:
+                    self._publisher = create_publisher()
+        return self._publisher
+
+    def publish_event(self, ward, event, ride_details):
+        """Publish a dispatch event for a prebooked ride to the ward-specific queue.
+
+        Returns a Future that resolves once the broker confirms the message.
+        """
+        return self.publisher.publish(
+            f"prebook_{ward}",
+            json.dumps({"event": event, "ride": ride_details, "sent_at": time.time()})
         )
-        print(f"Ride added to queue: prebook_{ward}")
-
-    def get_prebooked_rides(self, ward):
-        """Retrieve all prebooked rides for a ward"""
-        rides = []
-        while True:
-            method_frame, header_frame, body = self.channel.basic_get(queue=f"prebook_{ward}", auto_ack=False)
-            if method_frame:
-                rides.append(json.loads(body))
-                self.channel.basic_nack(method_frame.delivery_tag, requeue=True)  # Requeue the message
-            else:
-                break
-        return rides
+
+    def add_prebook_ride(self, ward, ride_details):
+        """Announce a new (or re-offered) prebooked ride to the ward's dispatchers"""
+        return self.publish_event(ward, "ride_prebooked", ride_details)
 
     def close(self):
-        self.connection.close()
\ No newline at end of file
+        if self._publisher is not None:
+            self._publisher.close()
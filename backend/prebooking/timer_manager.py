@@ -1,16 +1,167 @@
-import time
+import heapq
+import itertools
+import json
 import threading
+import time
+
+class TimerScheduler:
+    """Runs any number of timers from one thread using a heap of deadlines.
+
+    Timers are keyed, so rescheduling a key replaces its timer and cancel is O(1);
+    cancelled entries are skipped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self, name="timer-scheduler"):
+        self._heap = []  # (deadline, seq, key)
+        self._timers = {}  # key -> (deadline, seq, callback)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._timers)
+
+    def schedule(self, key, deadline, callback):
+        """Run callback() at the given epoch time, replacing any pending timer for key."""
+        with self._cond:
+            seq = next(self._seq)
+            self._timers[key] = (deadline, seq, callback)
+            heapq.heappush(self._heap, (deadline, seq, key))
+            # Drop cancelled entries once they outnumber live timers
+            if len(self._heap) > 2 * len(self._timers) + 1024:
+                self._heap = [entry for entry in self._heap if self._is_live(entry)]
+                heapq.heapify(self._heap)
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def cancel(self, key):
+        with self._cond:
+            return self._timers.pop(key, None) is not None
+
+    def deadline(self, key):
+        timer = self._timers.get(key)
+        return timer[0] if timer else None
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+
+    def _is_live(self, entry):
+        timer = self._timers.get(entry[2])
+        return timer is not None and timer[1] == entry[1]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    while self._heap and not self._is_live(self._heap[0]):
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if not self._running:
+                    return
+                _, _, key = heapq.heappop(self._heap)
+                _, _, callback = self._timers.pop(key)
+            try:
+                callback()
+            except Exception as e:
+                print(f"Timer {key} failed: {e}")
+
+class TimerStore:
+    """Persists acceptance deadlines in MySQL so they survive a restart."""
+
+    def __init__(self, get_connection):
+        self.get_connection = get_connection
+
+    def save(self, ride_id, ward, deadline, ride_details):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO prebooking_timers (ride_id, ward, deadline, ride_details) VALUES (%s, %s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE ward = VALUES(ward), deadline = VALUES(deadline), ride_details = VALUES(ride_details)",
+                (ride_id, ward, deadline, json.dumps(ride_details))
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def delete(self, ride_id):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM prebooking_timers WHERE ride_id = %s", (ride_id,))
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def load_all(self):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT ride_id, ward, deadline, ride_details FROM prebooking_timers")
+            return [(ride_id, ward, float(deadline), json.loads(details)) for ride_id, ward, deadline, details in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
 
 class TimerManager:
-    def __init__(self, queue_manager):
+    def __init__(self, queue_manager, store=None, scheduler=None, on_expire=None):
         self.queue_manager = queue_manager
+        self.store = store
+        self.on_expire = on_expire  # on_expire(ward, ride_details) replaces the default re-queue
+        self.scheduler = scheduler or TimerScheduler(name="prebooking-timers")
 
     def start_acceptance_timer(self, ward, ride_details, timeout=120):
         """Start a timer for driver acceptance"""
-        print(f"Timer started for ride {ride_details['ride_id']} in {ward}. Timeout: {timeout}s")
+        deadline = time.time() + timeout
+        if self.store:
+            self.store.save(ride_details["ride_id"], ward, deadline, ride_details)
+        self._schedule(ward, ride_details, deadline)
+
+    def cancel_acceptance_timer(self, ride_id):
+        """Stop the timer once the ride is accepted or cancelled"""
+        cancelled = self.scheduler.cancel(int(ride_id))
+        if self.store:
+            self.store.delete(int(ride_id))
+        return cancelled
+
+    def recover(self, on_recover=None):
+        """Re-arm timers persisted before a restart; overdue ones fire immediately.
+
+        on_recover(ward, ride_details) runs for each timer before it is armed, so callers
+        can rebuild the state its expiry relies on.
+        """
+        if not self.store:
+            return 0
+        timers = self.store.load_all()
+        for ride_id, ward, deadline, ride_details in timers:
+            if on_recover:
+                on_recover(ward, ride_details)
+            self._schedule(ward, ride_details, deadline)
+        return len(timers)
+
+    def _schedule(self, ward, ride_details, deadline):
+        ride_id = int(ride_details["ride_id"])
 
         def timer_action():
-            print(f"Time expired! Reassigning ride {ride_details['ride_id']} in {ward}")
-            self.queue_manager.add_prebook_ride(ward, ride_details)  # Re-add to queue
+            print(f"Time expired! Reassigning ride {ride_id} in {ward}")
+            if self.store:
+                self.store.delete(ride_id)
+            if self.on_expire:
+                self.on_expire(ward, ride_details)
+            else:
+                self.queue_manager.add_prebook_ride(ward, ride_details)  # Re-add to queue
 
-        threading.Timer(timeout, timer_action).start()
\ No newline at end of file
+        self.scheduler.schedule(ride_id, deadline, timer_action)
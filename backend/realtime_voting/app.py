@@ -1,8 +1,55 @@
-from fastapi import FastAPI, WebSocket
+import asyncio
+import json
+from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect
+from backend.dynamic_routing.votes import VoteAggregator
+from backend.utils.redis_client import get_redis_client
+from .hub import VotingHub, ALL_WARDS
 
-app = FastAPI()
+router = APIRouter()
 
-@app.websocket("/vote")
-async def vote(websocket: WebSocket):
+redis_client = get_redis_client()
+hub = VotingHub(VoteAggregator(redis_client))
+
+async def serve_votes(websocket: WebSocket, ward: str):
+    """Stream tally snapshots/diffs for a ward while accepting {"driver_id", "vote"} messages"""
     await websocket.accept()
-    await websocket.send_text("Vote received")
\ No newline at end of file
+    subscriber = hub.connect(ward, websocket.send_text)
+    # Stop reading as soon as the hub drops the socket (failed send or shutdown)
+    closed = asyncio.ensure_future(subscriber.closed.wait())
+    try:
+        while True:
+            receive = asyncio.ensure_future(websocket.receive_text())
+            await asyncio.wait((receive, closed), return_when=asyncio.FIRST_COMPLETED)
+            if not receive.done():
+                receive.cancel()
+                break
+            try:
+                message = json.loads(receive.result())
+            except ValueError:
+                message = None
+            if (not isinstance(message, dict) or "driver_id" not in message or "vote" not in message
+                    or not isinstance(message.get("ward") or "", str)):
+                hub.send_error(subscriber, 'expected a JSON object with "driver_id" and "vote"')
+                continue
+            vote = 1 if message["vote"] in (1, "1", "Increase (+1)") else -1
+            hub.record_vote(str(message["driver_id"]), vote, message.get("ward") or (None if ward == ALL_WARDS else ward))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        hub.disconnect(subscriber)
+
+@router.websocket("/vote")
+async def vote(websocket: WebSocket):
+    await serve_votes(websocket, ALL_WARDS)
+
+@router.websocket("/vote/{ward}")
+async def vote_ward(websocket: WebSocket, ward: str):
+    await serve_votes(websocket, ward)
+
+@router.on_event("shutdown")
+async def stop_hub():
+    await hub.stop()
+
+app = FastAPI()
+app.include_router(router)
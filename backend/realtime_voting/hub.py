@@ -0,0 +1,161 @@
+import asyncio
+import json
+import time
+
+TICK_SECONDS = 0.5
+REFRESH_TICKS = 10  # Re-read tallies for watched wards this often, to pick up votes from other workers
+MAX_QUEUE = 8
+ALL_WARDS = "all"
+
+class Subscriber:
+    """One socket's outbound queue, drained by its own task so a slow client only delays itself."""
+
+    def __init__(self, ward, send, max_queue=MAX_QUEUE):
+        self.ward = ward
+        self.send = send
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.task = None
+        self.resyncs = 0
+        self.closed = asyncio.Event()  # set once the hub drops the subscriber
+
+    async def run(self, hub):
+        try:
+            while True:
+                message = await self.queue.get()
+                await self.send(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            hub.disconnect(self)
+
+class VotingHub:
+    """Fans live vote tallies out to WebSocket subscribers grouped by ward.
+
+    Incoming votes are buffered and written to the VoteAggregator once per tick in one
+    pipelined batch; only wards that changed are re-tallied. Each tick a ward's new
+    tally is diffed against the last broadcast and the changed fields are encoded once
+    and queued to every subscriber of that ward. A subscriber whose queue is full has
+    it replaced by a single full snapshot, so slow clients skip ahead instead of
+    buffering without bound.
+    """
+
+    def __init__(self, aggregator, tick=TICK_SECONDS, max_queue=MAX_QUEUE, window=None):
+        self.aggregator = aggregator
+        self.tick = tick
+        self.max_queue = max_queue
+        self.window = window
+        self.subscribers = {}  # ward -> set of Subscriber
+        self.snapshots = {}  # ward -> last broadcast tally
+        self.seq = 0
+        self._votes = []  # (driver_id, vote, ward) since the last tick
+        self._dirty = set()
+        self._task = None
+
+    def __len__(self):
+        return sum(len(subscribers) for subscribers in self.subscribers.values())
+
+    def connect(self, ward, send):
+        """Register a socket's send coroutine for a ward; it gets the current snapshot first"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        subscriber = Subscriber(ward, send, self.max_queue)
+        self.subscribers.setdefault(ward, set()).add(subscriber)
+        subscriber.task = asyncio.get_running_loop().create_task(subscriber.run(self))
+        if ward in self.snapshots:
+            subscriber.queue.put_nowait(self._encode("snapshot", ward, self.snapshots[ward]))
+        else:
+            self._dirty.add(ward)
+        return subscriber
+
+    def disconnect(self, subscriber):
+        subscriber.closed.set()
+        subscribers = self.subscribers.get(subscriber.ward)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.ward]
+                self.snapshots.pop(subscriber.ward, None)
+        if subscriber.task is not None and subscriber.task is not asyncio.current_task():
+            subscriber.task.cancel()
+
+    def send_error(self, subscriber, message):
+        """Queue an error frame to one subscriber; dropped if its queue is full"""
+        try:
+            subscriber.queue.put_nowait(self._encode("error", subscriber.ward, {"m": message}))
+        except asyncio.QueueFull:
+            pass
+
+    def record_vote(self, driver_id, vote, ward=None):
+        """Buffer a vote (> 0 for increase); it is written and broadcast on the next tick"""
+        ward = ward or ALL_WARDS
+        self._votes.append((driver_id, vote, ward))
+        self._dirty.update((ward, ALL_WARDS))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for subscribers in list(self.subscribers.values()):
+            for subscriber in list(subscribers):
+                self.disconnect(subscriber)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        ticks = 0
+        while True:
+            await asyncio.sleep(self.tick)
+            ticks += 1
+            try:
+                await self._flush(loop, refresh=ticks % REFRESH_TICKS == 0)
+            except Exception as e:
+                print(f"Voting hub tick failed: {e}")
+
+    async def _flush(self, loop, refresh=False):
+        votes, self._votes = self._votes, []
+        wards = set(self.subscribers) if refresh else self._dirty & set(self.subscribers)
+        self._dirty.clear()
+        if not votes and not wards:
+            return
+        # Redis calls block, so the batch write and the tallies run off the event loop
+        tallies = await loop.run_in_executor(None, self._write_and_tally, votes, sorted(wards))
+        self.seq += 1
+        for ward, tally in tallies.items():
+            self._broadcast(ward, tally)
+
+    def _write_and_tally(self, votes, wards):
+        if votes:
+            self.aggregator.submit_many(votes)
+        kwargs = {"window": self.window} if self.window else {}
+        return {ward: self.aggregator.tally(ward, **kwargs) for ward in wards}
+
+    def _broadcast(self, ward, tally):
+        subscribers = self.subscribers.get(ward)
+        if not subscribers:
+            return
+        state = {"u": tally["up_voters"], "d": tally["down_voters"], "a": round(tally["adjustment_factor"], 4)}
+        previous = self.snapshots.get(ward)
+        self.snapshots[ward] = state
+        if previous is None:
+            message = self._encode("snapshot", ward, state)
+        else:
+            changed = {key: value for key, value in state.items() if previous.get(key) != value}
+            if not changed:
+                return
+            message = self._encode("diff", ward, changed)
+
+        snapshot = None
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Drop the backlog; one snapshot brings the client fully up to date
+                if snapshot is None:
+                    snapshot = self._encode("snapshot", ward, state)
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(snapshot)
+                subscriber.resyncs += 1
+
+    def _encode(self, kind, ward, fields):
+        return json.dumps({"k": kind, "w": ward, "s": self.seq, "t": round(time.time(), 3), **fields},
+                          separators=(",", ":"))
@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import websockets
+
+async def run(url, n_clients=10_000, n_wards=50, voter_fraction=0.05, duration=30.0, connect_rate=1000):
+    """Hold n_clients sockets open across wards while a fraction of them vote, then report delivery stats."""
+    received = 0
+    latencies = []
+    failures = 0
+    connected = 0
+    stop = asyncio.Event()
+
+    async def client(i):
+        nonlocal received, failures, connected
+        ward = f"ward_{i % n_wards}"
+        try:
+            async with websockets.connect(f"{url}/{ward}", open_timeout=30, ping_interval=None) as ws:
+                connected += 1
+                voter = random.random() < voter_fraction
+
+                async def vote_loop():
+                    while not stop.is_set():
+                        await ws.send(json.dumps({"driver_id": f"driver_{i}", "vote": random.choice((1, -1))}))
+                        await asyncio.sleep(random.uniform(0.5, 2.0))
+
+                voting = asyncio.create_task(vote_loop()) if voter else None
+                while not stop.is_set():
+                    try:
+                        message = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        continue
+                    received += 1
+                    latencies.append(time.time() - json.loads(message)["t"])
+                if voting:
+                    voting.cancel()
+        except Exception:
+            failures += 1
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(n_clients):
+        tasks.append(asyncio.create_task(client(i)))
+        if (i + 1) % connect_rate == 0:
+            await asyncio.sleep(1.0)
+    connect_seconds = time.perf_counter() - start
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float("nan")
+    print(f"Connected {connected}/{n_clients} sockets in {connect_seconds:.1f}s ({failures} failed)")
+    print(f"Received {received} messages in {duration:.0f}s ({received / duration:,.0f} msg/s)")
+    print(f"Broadcast latency p50={pct(0.5):.1f}ms p99={pct(0.99):.1f}ms max={pct(1.0):.1f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket load test for the realtime voting hub (raise ulimit -n first)")
+    parser.add_argument("--url", default="ws://localhost:8000/api/realtime-voting/vote")
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--wards", type=int, default=50)
+    parser.add_argument("--voter-fraction", type=float, default=0.05)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--connect-rate", type=int, default=1000, help="New connections per second")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.clients, args.wards, args.voter_fraction, args.duration, args.connect_rate))
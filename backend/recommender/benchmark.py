@@ -0,0 +1,186 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+import joblib
+import numpy as np
+import pandas as pd
+import mysql.connector
+from ranking import rank_drivers, rank_drivers_batched
+from compiled_ranker import CompiledRanker, MODEL_PATH, ENCODER_PATH, COMPILED_PATH, PEAK_HOURS
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", ""),
+    "database": os.getenv("DB_NAME", "namma_yatri_db")
+}
+
+RIDE_COLUMNS = ["ride_id", "timestamp", "origin_ward", "driver_id", "distance_km", "fare", "surge_multiplier", "duration_minutes", "hour", "day_of_week", "is_weekend"]
+DRIVER_COLUMNS = ["driver_id", "experience_months", "primary_ward", "base_acceptance_rate", "peak_acceptance_rate", "avg_daily_hours"]
+
+def load_from_db(n_rides):
+    """Most recent rides from ride_data and every driver from driver_data."""
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT {', '.join(RIDE_COLUMNS)} FROM ride_data ORDER BY timestamp DESC LIMIT %s", (n_rides,))
+        rides = cursor.fetchall()
+        cursor.execute(f"SELECT {', '.join(DRIVER_COLUMNS)} FROM driver_data")
+        drivers = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    return rides, drivers
+
+def load_from_csv(rides_path, drivers_path, n_rides):
+    rides = pd.read_csv(rides_path, usecols=RIDE_COLUMNS, nrows=n_rides).to_dict(orient="records")
+    drivers = pd.read_csv(drivers_path, usecols=DRIVER_COLUMNS).to_dict(orient="records")
+    return rides, drivers
+
+def _ride_features(row):
+    hour = int(row["hour"])
+    return {
+        "distance_km": float(row["distance_km"]),
+        "fare": float(row["fare"]),
+        "surge_multiplier": float(row["surge_multiplier"]),
+        "duration_minutes": int(row["duration_minutes"]),
+        "hour": hour,
+        "is_weekend": int(row["is_weekend"]),
+        "peak_hour": 1 if hour in PEAK_HOURS else 0,
+        "origin_ward": row["origin_ward"],
+        "day_of_week": row["day_of_week"],
+    }
+
+def _driver_features(row):
+    return {
+        "driver_id": row["driver_id"],
+        "experience_months": int(row["experience_months"]),
+        "base_acceptance_rate": float(row["base_acceptance_rate"]),
+        "peak_acceptance_rate": float(row["peak_acceptance_rate"]),
+        "avg_daily_hours": float(row["avg_daily_hours"]),
+        "primary_ward": row["primary_ward"],
+    }
+
+def build_cases(rides, drivers, known_driver_ids, candidates=5, seed=42):
+    """Pair each historical ride with its accepting driver plus sampled drivers from the same ward."""
+    rng = random.Random(seed)
+    drivers = {row["driver_id"]: _driver_features(row) for row in drivers if row["driver_id"] in known_driver_ids}
+    by_ward = {}
+    for driver in drivers.values():
+        by_ward.setdefault(driver["primary_ward"], []).append(driver)
+    all_drivers = list(drivers.values())
+
+    cases = []
+    for row in rides:
+        accepted = drivers.get(row["driver_id"])
+        if accepted is None or float(row["distance_km"]) <= 0:
+            continue
+        ride = _ride_features(row)
+        pool = by_ward.get(ride["origin_ward"], [])
+        if len(pool) < candidates:
+            pool = all_drivers
+        others = [d for d in rng.sample(pool, min(len(pool), candidates)) if d["driver_id"] != accepted["driver_id"]]
+        nearby_drivers = others[:candidates - 1] + [accepted]
+        rng.shuffle(nearby_drivers)
+        cases.append((ride, nearby_drivers, accepted["driver_id"]))
+    return cases
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+def run_backend(name, score, cases):
+    latencies = []
+    ndcgs = []
+    top1 = 0
+    n_drivers = 0
+    for ride, nearby_drivers, accepted_id in cases:
+        start = time.perf_counter()
+        ranked = score(ride, nearby_drivers)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        position = [d["driver_id"] for d in ranked].index(accepted_id) + 1
+        # Single relevant driver, so NDCG reduces to the discount at its position
+        ndcgs.append(1 / math.log2(position + 1))
+        top1 += position == 1
+        n_drivers += len(nearby_drivers)
+
+    total_seconds = sum(latencies) / 1000
+    return {
+        "backend": name,
+        "rides": len(cases),
+        "ndcg": float(np.mean(ndcgs)) if ndcgs else None,
+        "top1_acceptance": top1 / len(cases) if cases else None,
+        "latency_ms": {
+            "mean": float(np.mean(latencies)) if latencies else None,
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+        },
+        "throughput_rides_per_s": len(cases) / total_seconds if total_seconds else None,
+        "throughput_drivers_per_s": n_drivers / total_seconds if total_seconds else None,
+    }
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay historical rides through the driver ranker")
+    parser.add_argument("--rides", type=int, default=2000, help="Number of rides to replay")
+    parser.add_argument("--candidates", type=int, default=5, help="Drivers per candidate set")
+    parser.add_argument("--per-driver-limit", type=int, default=200, help="Rides replayed through the slow per-driver path")
+    parser.add_argument("--rides-csv", help="Read rides from a CSV instead of the ride_data table")
+    parser.add_argument("--drivers-csv", help="Read drivers from a CSV instead of the driver_data table")
+    parser.add_argument("--backends", default="per_driver,batched,compiled")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.rides_csv and args.drivers_csv:
+        rides, drivers = load_from_csv(args.rides_csv, args.drivers_csv, args.rides)
+    else:
+        rides, drivers = load_from_db(args.rides)
+
+    model = joblib.load(MODEL_PATH)
+    driver_encoder = joblib.load(ENCODER_PATH)
+    compiled = CompiledRanker(COMPILED_PATH)
+    cases = build_cases(rides, drivers, set(driver_encoder.classes_), candidates=args.candidates, seed=args.seed)
+
+    scorers = {
+        "per_driver": lambda ride, nearby: rank_drivers(ride, nearby, MODEL_PATH, ENCODER_PATH),
+        "batched": lambda ride, nearby: rank_drivers_batched(ride, nearby, model, driver_encoder),
+        "compiled": compiled.rank_drivers,
+    }
+    results = []
+    for name in args.backends.split(","):
+        backend_cases = cases[:args.per_driver_limit] if name == "per_driver" else cases
+        results.append(run_backend(name, scorers[name], backend_cases))
+
+    report = {
+        "benchmark": "driver_ranking_replay",
+        "created_at": datetime.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "source": "csv" if args.rides_csv else "mysql",
+        "candidates": args.candidates,
+        "seed": args.seed,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import json
+import os
+import tempfile
+import numpy as np
+
+PEAK_HOURS = (8, 9, 17, 18, 19, 20, 21)
+
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODEL_PATH = os.path.join(base_dir, "trained_models", "driver_ranker_model.pkl")
+ENCODER_PATH = os.path.join(base_dir, "trained_models", "driver_encoder.pkl")
+COMPILED_PATH = os.path.join(base_dir, "trained_models", "driver_ranker_compiled.npz")
+
+
+def softmax(x):
+    e_x = np.exp(x - np.max(x))
+    return e_x / e_x.sum()
+
+
+def compile_model(model_path=MODEL_PATH, encoder_path=ENCODER_PATH, output_path=COMPILED_PATH):
+    """Flatten the trained XGBRanker into NumPy node arrays and save them as an .npz file.
+
+    Only needed offline: xgboost and joblib are imported here and never on the serving path.
+    """
+    import joblib
+
+    model = joblib.load(model_path)
+    driver_encoder = joblib.load(encoder_path)
+    booster = model.get_booster()
+
+    # The JSON model format stores every tree as flat arrays with exact float values
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "model.json")
+        booster.save_model(json_path)
+        with open(json_path) as f:
+            learner = json.load(f)["learner"]
+
+    gradient_booster = learner["gradient_booster"]
+    if gradient_booster["name"] != "gbtree":
+        raise ValueError(f"Unsupported booster type: {gradient_booster['name']}")
+
+    trees = gradient_booster["model"]["trees"]
+    best_iteration = getattr(model, "best_iteration", None)
+    if best_iteration is not None:
+        trees = trees[:best_iteration + 1]
+
+    features, thresholds, lefts, rights, default_left, values, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        left = np.asarray(tree["left_children"], dtype=np.int32)
+        right = np.asarray(tree["right_children"], dtype=np.int32)
+        is_leaf = left == -1
+        split = np.asarray(tree["split_conditions"], dtype=np.float32)
+
+        features.append(np.where(is_leaf, -1, tree["split_indices"]).astype(np.int32))
+        thresholds.append(np.where(is_leaf, 0.0, split).astype(np.float32))
+        # Leaves keep their value in split_conditions
+        values.append(np.where(is_leaf, split, 0.0).astype(np.float32))
+        lefts.append(np.where(is_leaf, -1, left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, -1, right + offset).astype(np.int32))
+        default_left.append(np.asarray(tree["default_left"], dtype=bool))
+        roots.append(offset)
+
+        max_depth = max(max_depth, _tree_depth(left, right))
+        offset += len(left)
+
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+
+    np.savez(
+        output_path,
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        default_left=np.concatenate(default_left),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=np.int32(max_depth),
+        base_score=np.float32(base_score),
+        feature_names=np.asarray(booster.feature_names),
+        driver_classes=np.asarray(driver_encoder.classes_).astype(str),
+    )
+    return output_path
+
+
+def _tree_depth(left, right):
+    depth = 0
+    level = [0]
+    while level:
+        level = [child for node in level if left[node] != -1 for child in (left[node], right[node])]
+        if level:
+            depth += 1
+    return depth
+
+
+class CompiledRanker:
+    """Evaluates a compiled tree ensemble on NumPy arrays without pandas or xgboost."""
+
+    def __init__(self, compiled_path=COMPILED_PATH):
+        with np.load(compiled_path) as data:
+            self.feature = data["feature"]
+            self.threshold = data["threshold"]
+            self.left = data["left"]
+            self.right = data["right"]
+            self.default_left = data["default_left"]
+            self.value = data["value"]
+            self.roots = data["roots"]
+            self.max_depth = int(data["max_depth"])
+            self.base_score = np.float32(data["base_score"])
+            self.feature_names = [str(name) for name in data["feature_names"]]
+            driver_classes = data["driver_classes"]
+
+        # LabelEncoder.transform equivalent without sklearn
+        self.driver_index = {driver_id: i for i, driver_id in enumerate(driver_classes.tolist())}
+        self.feature_index = {name: i for i, name in enumerate(self.feature_names)}
+
+    def predict(self, X):
+        """Return raw ranking scores for a (n_rows, n_features) array, like model.predict."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+
+        # Every row walks every tree one level per step; finished trees stay on their leaf
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            is_leaf = feature < 0
+            x = X[rows, np.where(is_leaf, 0, feature)]
+            go_left = np.where(np.isnan(x), self.default_left[nodes], x < self.threshold[nodes])
+            next_nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            nodes = np.where(is_leaf, nodes, next_nodes)
+
+        return (self.value[nodes].sum(axis=1, dtype=np.float64) + self.base_score).astype(np.float32)
+
+    def build_features(self, ride, nearby_drivers):
+        """Build the feature matrix for one ride and its candidate drivers."""
+        X = np.zeros((len(nearby_drivers), len(self.feature_names)), dtype=np.float32)
+        ride_values = {
+            "distance_km": ride["distance_km"],
+            "fare": ride["fare"],
+            "surge_multiplier": ride["surge_multiplier"],
+            "duration_minutes": ride["duration_minutes"],
+            "hour": ride["hour"],
+            "is_weekend": ride["is_weekend"],
+            "fare_per_km": ride["fare"] / ride["distance_km"],
+            "is_peak_hour": ride["peak_hour"],
+        }
+        for name, value in ride_values.items():
+            if name in self.feature_index:
+                X[:, self.feature_index[name]] = value
+
+        for row, driver in enumerate(nearby_drivers):
+            driver_values = {
+                "experience_months": driver["experience_months"],
+                "base_acceptance_rate": driver["base_acceptance_rate"],
+                "peak_acceptance_rate": driver["peak_acceptance_rate"],
+                "avg_daily_hours": driver["avg_daily_hours"],
+                "ward_match": 1 if driver["primary_ward"] == ride["origin_ward"] else 0,
+                "driver_id_encoded": self.driver_index[driver["driver_id"]],
+            }
+            for name, value in driver_values.items():
+                if name in self.feature_index:
+                    X[row, self.feature_index[name]] = value
+        return X
+
+    def rank_drivers(self, ride, nearby_drivers):
+        """Same output as ranking.rank_drivers, scored in a single vectorized call."""
+        if not nearby_drivers:
+            return []
+        scores = self.predict(self.build_features(ride, nearby_drivers))
+        probabilities = softmax(scores)
+        ranked_drivers = [
+            {"driver_id": driver["driver_id"], "probability": probabilities[i]}
+            for i, driver in enumerate(nearby_drivers)
+        ]
+        ranked_drivers.sort(key=lambda x: x["probability"], reverse=True)
+        return ranked_drivers
+
+
+def verify(model_path=MODEL_PATH, compiled_path=COMPILED_PATH, n_rows=2000, atol=1e-4, seed=42):
+    """Compare the compiled scorer against model.predict on random inputs."""
+    import joblib
+    import pandas as pd
+
+    model = joblib.load(model_path)
+    ranker = CompiledRanker(compiled_path)
+
+    rng = np.random.default_rng(seed)
+    # Draw inputs around the split thresholds actually used by the model
+    X = np.empty((n_rows, len(ranker.feature_names)), dtype=np.float32)
+    for i in range(len(ranker.feature_names)):
+        used = ranker.threshold[ranker.feature == i]
+        if len(used):
+            X[:, i] = rng.choice(used, n_rows) + rng.normal(0, 1e-3 + used.std() * 0.05, n_rows)
+        else:
+            X[:, i] = rng.normal(0, 1, n_rows)
+    X[rng.random(X.shape) < 0.01] = np.nan
+
+    expected = model.predict(pd.DataFrame(X, columns=ranker.feature_names))
+    actual = ranker.predict(X)
+    max_error = float(np.max(np.abs(expected - actual)))
+    print(f"Max absolute difference over {n_rows} rows: {max_error:.2e}")
+    if max_error > atol:
+        raise AssertionError(f"Compiled scorer differs from model.predict by {max_error}")
+    return max_error
+
+
+if __name__ == "__main__":
+    path = compile_model()
+    print(f"Compiled model saved to {path}")
+    verify()
@@ -1,6 +1,34 @@
+import json
+import os
+import joblib
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import LabelEncoder
 
+FEATURES = ["distance_km", "fare", "surge_multiplier", "duration_minutes", "hour", "is_weekend", "fare_per_km", "is_peak_hour", "experience_months", "base_acceptance_rate", "peak_acceptance_rate", "avg_daily_hours", "ward_match", "driver_id_encoded"]
+PEAK_HOURS = [8, 9, 17, 18, 19, 20, 21]
+
+RIDE_DTYPES = {
+    "timestamp": str,
+    "origin_ward": "category",
+    "driver_id": "category",
+    "distance_km": "float32",
+    "fare": "float32",
+    "surge_multiplier": "float32",
+    "duration_minutes": "int16",
+    "hour": "int8",
+    "is_weekend": "int8",
+}
+DRIVER_DTYPES = {
+    "driver_id": str,
+    "experience_months": "int16",
+    "primary_ward": "category",
+    "base_acceptance_rate": "float32",
+    "peak_acceptance_rate": "float32",
+    "avg_daily_hours": "float32",
+}
+CACHE_VERSION = 1
+
 def preprocess_data(rides_path, drivers_path):
     # Load data
     rides = pd.read_csv(rides_path)
@@ -10,7 +38,7 @@ def preprocess_data(rides_path, drivers_path):
     data = pd.merge(rides, drivers, on="driver_id")
 
     data["fare_per_km"] = data["fare"] / data["distance_km"]
-    data["is_peak_hour"] = data["hour"].apply(lambda x: 1 if x in [8, 9, 17, 18, 19, 20, 21] else 0)
+    data["is_peak_hour"] = data["hour"].isin(PEAK_HOURS).astype(int)
     data["ward_match"] = (data["primary_ward"] == data["origin_ward"]).astype(int)
 
     data = pd.get_dummies(data, columns=["day_of_week", "primary_ward"])
@@ -18,8 +46,126 @@ def preprocess_data(rides_path, drivers_path):
     driver_encoder = LabelEncoder()
     data["driver_id_encoded"] = driver_encoder.fit_transform(data["driver_id"])
 
-    features = ["distance_km", "fare", "surge_multiplier", "duration_minutes", "hour", "is_weekend", "fare_per_km", "is_peak_hour", "experience_months", "base_acceptance_rate", "peak_acceptance_rate", "avg_daily_hours", "ward_match", "driver_id_encoded"]
-    X = data[features]
-    y = data["driver_id_encoded"]  
+    X = data[FEATURES]
+    y = data["driver_id_encoded"]
+
+    return X, y, driver_encoder
+
+def _source_signature(*paths):
+    return [{"path": os.path.abspath(p), "size": os.path.getsize(p), "mtime": os.path.getmtime(p)} for p in paths]
+
+def _cache_files(cache_dir):
+    return {
+        "meta": os.path.join(cache_dir, "meta.json"),
+        "X": os.path.join(cache_dir, "features.f32"),
+        "y": os.path.join(cache_dir, "labels.i32"),
+        "timestamps": os.path.join(cache_dir, "timestamps.i64"),
+        "encoder": os.path.join(cache_dir, "driver_encoder.pkl"),
+    }
+
+def build_feature_cache(rides_path, drivers_path, cache_dir, chunksize=250_000):
+    """Stream the rides CSV in chunks and write a memory-mappable feature matrix to cache_dir.
+
+    Produces the same features and labels as preprocess_data, but peak memory is bounded by
+    the chunk size and the drivers table. Rows are written grouped by driver_id_encoded so
+    ranking groups are contiguous, in original file order within each group.
+    """
+    files = _cache_files(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    drivers = pd.read_csv(drivers_path, usecols=list(DRIVER_DTYPES), dtype=DRIVER_DTYPES).set_index("driver_id")
+    ride_columns = list(RIDE_DTYPES)
+
+    # Pass 1: count rides per driver that survive the join with the drivers table
+    ride_counts = pd.Series(dtype="int64")
+    for chunk in pd.read_csv(rides_path, usecols=["driver_id"], dtype={"driver_id": "category"}, chunksize=chunksize):
+        counts = chunk["driver_id"].value_counts()
+        counts = counts[counts > 0]
+        counts.index = counts.index.astype(str)
+        ride_counts = ride_counts.add(counts, fill_value=0)
+    ride_counts = ride_counts[ride_counts.index.isin(drivers.index)]
+
+    # Same classes a LabelEncoder fitted on the merged frame would have
+    driver_encoder = LabelEncoder()
+    driver_encoder.fit(ride_counts.index.astype(str))
+    codes = pd.Series(np.arange(len(driver_encoder.classes_), dtype=np.int32), index=driver_encoder.classes_)
+    group_sizes = ride_counts.reindex(driver_encoder.classes_).to_numpy(dtype=np.int64)
+    n_rows = int(group_sizes.sum())
+
+    # Next free row for each driver in the grouped output
+    next_row = np.concatenate([[0], np.cumsum(group_sizes)[:-1]])
+
+    X = np.memmap(files["X"] + ".tmp", dtype=np.float32, mode="w+", shape=(max(n_rows, 1), len(FEATURES)))
+    y = np.memmap(files["y"] + ".tmp", dtype=np.int32, mode="w+", shape=(max(n_rows, 1),))
+    timestamps = np.memmap(files["timestamps"] + ".tmp", dtype=np.int64, mode="w+", shape=(max(n_rows, 1),))
+
+    # Pass 2: compute features vectorized per chunk and scatter rows into their group slots
+    for chunk in pd.read_csv(rides_path, usecols=ride_columns, dtype=RIDE_DTYPES, chunksize=chunksize):
+        chunk["driver_id"] = chunk["driver_id"].astype(str)
+        data = chunk.join(drivers, on="driver_id", how="inner")
+        if data.empty:
+            continue
+
+        data["fare_per_km"] = data["fare"] / data["distance_km"]
+        data["is_peak_hour"] = data["hour"].isin(PEAK_HOURS).astype(np.int8)
+        data["ward_match"] = (data["primary_ward"].astype(str) == data["origin_ward"].astype(str)).astype(np.int8)
+        data["driver_id_encoded"] = data["driver_id"].map(codes).to_numpy(dtype=np.int32)
+
+        labels = data["driver_id_encoded"].to_numpy()
+        order = np.argsort(labels, kind="stable")
+        labels = labels[order]
+        unique, starts, counts = np.unique(labels, return_index=True, return_counts=True)
+        rank_in_group = np.arange(len(labels)) - np.repeat(starts, counts)
+        rows = next_row[labels] + rank_in_group
+        next_row[unique] += counts
+
+        X[rows] = data[FEATURES].to_numpy(dtype=np.float32)[order]
+        y[rows] = labels
+        timestamps[rows] = pd.to_datetime(data["timestamp"]).to_numpy(dtype="datetime64[s]").astype(np.int64)[order]
+
+    for array in (X, y, timestamps):
+        array.flush()
+    del X, y, timestamps
+    for key in ("X", "y", "timestamps"):
+        os.replace(files[key] + ".tmp", files[key])
+    joblib.dump(driver_encoder, files["encoder"])
+
+    meta = {
+        "version": CACHE_VERSION,
+        "n_rows": n_rows,
+        "features": FEATURES,
+        "group_sizes": group_sizes.tolist(),
+        "sources": _source_signature(rides_path, drivers_path),
+    }
+    # Meta is written last so a half-built cache is never considered valid
+    with open(files["meta"], "w") as f:
+        json.dump(meta, f)
+    return meta
+
+def load_feature_cache(cache_dir):
+    """Memory-map a cache written by build_feature_cache. Returns X, y, timestamps, encoder, meta."""
+    files = _cache_files(cache_dir)
+    with open(files["meta"]) as f:
+        meta = json.load(f)
+    n_rows = max(meta["n_rows"], 1)
+    X = np.memmap(files["X"], dtype=np.float32, mode="r", shape=(n_rows, len(meta["features"])))[:meta["n_rows"]]
+    y = np.memmap(files["y"], dtype=np.int32, mode="r", shape=(n_rows,))[:meta["n_rows"]]
+    timestamps = np.memmap(files["timestamps"], dtype=np.int64, mode="r", shape=(n_rows,))[:meta["n_rows"]]
+    driver_encoder = joblib.load(files["encoder"])
+    return X, y, timestamps, driver_encoder, meta
+
+def is_cache_valid(rides_path, drivers_path, cache_dir):
+    meta_path = _cache_files(cache_dir)["meta"]
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return (meta.get("version") == CACHE_VERSION
+            and meta.get("features") == FEATURES
+            and meta.get("sources") == _source_signature(rides_path, drivers_path))
 
-    return X, y, driver_encoder
\ No newline at end of file
+def preprocess_data_cached(rides_path, drivers_path, cache_dir, chunksize=250_000):
+    """Like preprocess_data, but returns memory-mapped arrays, rebuilding the cache only when the CSVs change."""
+    if not is_cache_valid(rides_path, drivers_path, cache_dir):
+        build_feature_cache(rides_path, drivers_path, cache_dir, chunksize=chunksize)
+    return load_feature_cache(cache_dir)
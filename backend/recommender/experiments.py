@@ -0,0 +1,153 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import ndcg_score
+from data_preprocessing import preprocess_data_cached, load_feature_cache
+from training import get_group_sizes
+
+DEFAULT_GRID = {
+    "max_depth": [4, 6, 8],
+    "eta": [0.05, 0.1, 0.3],
+    "subsample": [0.8, 1.0],
+    "num_boost_round": [100, 200],
+}
+
+# Per-process state, filled once by _init_worker and reused by every run in that process
+_worker = {}
+
+def time_based_splits(timestamps, n_folds=3, test_fraction=0.2):
+    """Expanding-window splits: each fold trains on everything before a cutoff and tests on the next slice.
+
+    Returns a list of (train_idx, test_idx) pairs of sorted row indices.
+    """
+    if test_fraction * n_folds >= 1:
+        raise ValueError("n_folds * test_fraction must leave some data for the first training window")
+    timestamps = np.asarray(timestamps)
+    # Cutoffs are time quantiles, so folds stay ordered in time whatever the row order is
+    quantiles = np.linspace(1 - test_fraction * n_folds, 1, n_folds + 1)
+    cutoffs = np.quantile(timestamps, quantiles)
+    splits = []
+    for fold, (start, end) in enumerate(zip(cutoffs[:-1], cutoffs[1:])):
+        train_idx = np.flatnonzero(timestamps < start)
+        before_end = timestamps <= end if fold == n_folds - 1 else timestamps < end
+        test_idx = np.flatnonzero((timestamps >= start) & before_end)
+        if len(train_idx) and len(test_idx):
+            splits.append((train_idx, test_idx))
+    return splits
+
+def _build_dmatrix(X, y, indices, nthread):
+    labels = np.asarray(y[indices])
+    dmatrix = xgb.DMatrix(np.asarray(X[indices]), label=labels, nthread=nthread)
+    dmatrix.set_group(get_group_sizes(labels))
+    return dmatrix, labels
+
+def _init_worker(cache_dir, splits, nthread):
+    """Memory-map the shared cache and build each fold's DMatrix once per worker process."""
+    X, y, _, _, _ = load_feature_cache(cache_dir)
+    folds = []
+    for train_idx, test_idx in splits:
+        dtrain, _ = _build_dmatrix(X, y, train_idx, nthread)
+        dtest, y_test = _build_dmatrix(X, y, test_idx, nthread)
+        folds.append((dtrain, dtest, y_test))
+    _worker["folds"] = folds
+    _worker["nthread"] = nthread
+
+def _run_one(run_id, params):
+    params = dict(params)
+    num_boost_round = params.pop("num_boost_round", 100)
+    params.update({"objective": "rank:pairwise", "tree_method": "hist", "nthread": _worker["nthread"]})
+
+    fold_results = []
+    for fold, (dtrain, dtest, y_test) in enumerate(_worker["folds"]):
+        start = time.perf_counter()
+        booster = xgb.train(params, dtrain, num_boost_round=num_boost_round)
+        fit_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        y_pred = booster.predict(dtest)
+        predict_seconds = time.perf_counter() - start
+
+        fold_results.append({
+            "fold": fold,
+            "train_rows": dtrain.num_row(),
+            "test_rows": dtest.num_row(),
+            "ndcg": float(ndcg_score([y_test], [y_pred])),
+            "fit_seconds": round(fit_seconds, 3),
+            "predict_seconds": round(predict_seconds, 3),
+        })
+
+    return {
+        "run_id": run_id,
+        "params": dict(params, num_boost_round=num_boost_round),
+        "mean_ndcg": float(np.mean([r["ndcg"] for r in fold_results])),
+        "total_seconds": round(sum(r["fit_seconds"] + r["predict_seconds"] for r in fold_results), 3),
+        "folds": fold_results,
+    }
+
+def expand_grid(param_grid):
+    keys = list(param_grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(param_grid[k] for k in keys))]
+
+def run_sweep(rides_path, drivers_path, cache_dir, param_grid=None, n_folds=3, test_fraction=0.2, workers=None, report_path=None):
+    """Run a parameter sweep over time-based folds in a process pool and write a JSON lines report."""
+    sweep_start = time.perf_counter()
+
+    # Build (or reuse) the memory-mapped feature cache once; workers only map it
+    _, _, timestamps, _, meta = preprocess_data_cached(rides_path, drivers_path, cache_dir)
+    splits = time_based_splits(timestamps, n_folds=n_folds, test_fraction=test_fraction)
+    runs = expand_grid(param_grid or DEFAULT_GRID)
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(runs))
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    print(f"{len(runs)} runs x {len(splits)} folds on {meta['n_rows']} rows, {workers} workers x {nthread} threads")
+
+    results = []
+    report = open(report_path, "w") if report_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_dir, splits, nthread)) as executor:
+            futures = [executor.submit(_run_one, run_id, params) for run_id, params in enumerate(runs)]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"run {result['run_id']:>3}  ndcg={result['mean_ndcg']:.4f}  {result['total_seconds']:>7.2f}s  {result['params']}")
+                if report:
+                    report.write(json.dumps(result) + "\n")
+                    report.flush()
+    finally:
+        if report:
+            report.close()
+
+    results.sort(key=lambda r: r["mean_ndcg"], reverse=True)
+    print(f"Sweep finished in {time.perf_counter() - sweep_start:.1f}s")
+    if results:
+        print(f"Best run {results[0]['run_id']}: ndcg={results[0]['mean_ndcg']:.4f} {results[0]['params']}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep for the driver ranker")
+    parser.add_argument("--rides", default=os.path.join("..", "datasets", "rides_data.csv"))
+    parser.add_argument("--drivers", default=os.path.join("..", "datasets", "drivers_data.csv"))
+    parser.add_argument("--cache-dir", default=os.path.join("..", "datasets", "feature_cache"))
+    parser.add_argument("--grid", help="JSON file with a {param: [values]} grid")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--report", default="sweep_results.jsonl")
+    args = parser.parse_args()
+
+    param_grid = None
+    if args.grid:
+        with open(args.grid) as f:
+            param_grid = json.load(f)
+
+    run_sweep(args.rides, args.drivers, args.cache_dir, param_grid=param_grid, n_folds=args.folds,
+              test_fraction=args.test_fraction, workers=args.workers, report_path=args.report)
+
+if __name__ == "__main__":
+    main()
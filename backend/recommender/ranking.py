@@ -66,6 +66,37 @@ def rank_drivers(ride, nearby_drivers, model_path, encoder_path):
     ranked_drivers.sort(key=lambda x: x["probability"], reverse=True)
     return ranked_drivers
 
+def rank_drivers_batched(ride, nearby_drivers, model, driver_encoder):
+    """Rank drivers with one DataFrame and one model.predict call for all candidates."""
+    if not nearby_drivers:
+        return []
+
+    features_df = pd.DataFrame({
+        "distance_km": ride["distance_km"],
+        "fare": ride["fare"],
+        "surge_multiplier": ride["surge_multiplier"],
+        "duration_minutes": ride["duration_minutes"],
+        "hour": ride["hour"],
+        "is_weekend": ride["is_weekend"],
+        "fare_per_km": ride["fare"] / ride["distance_km"],
+        "is_peak_hour": ride["peak_hour"],
+        "experience_months": [driver["experience_months"] for driver in nearby_drivers],
+        "base_acceptance_rate": [driver["base_acceptance_rate"] for driver in nearby_drivers],
+        "peak_acceptance_rate": [driver["peak_acceptance_rate"] for driver in nearby_drivers],
+        "avg_daily_hours": [driver["avg_daily_hours"] for driver in nearby_drivers],
+        "ward_match": [1 if driver["primary_ward"] == ride["origin_ward"] else 0 for driver in nearby_drivers],
+        "driver_id_encoded": driver_encoder.transform([driver["driver_id"] for driver in nearby_drivers]),
+    })
+    features_df = features_df.reindex(columns=model.get_booster().feature_names, fill_value=0)
+
+    softmax_probabilities = softmax(model.predict(features_df))
+    ranked_drivers = [
+        {"driver_id": driver["driver_id"], "probability": softmax_probabilities[i]}
+        for i, driver in enumerate(nearby_drivers)
+    ]
+    ranked_drivers.sort(key=lambda x: x["probability"], reverse=True)
+    return ranked_drivers
+
 def main():
     ride = {
         "distance_km": 10.5,
@@ -2,32 +2,85 @@ import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import ndcg_score
 import joblib
-from data_preprocessing import preprocess_data
+from data_preprocessing import preprocess_data, preprocess_data_cached
 import os
 import numpy as np
 
 def get_group_sizes(y):
     """Computes group sizes for XGBoost Ranker."""
     unique, counts = np.unique(y, return_counts=True)
-    return list(counts)  
+    return list(counts)
 
-def train_model(rides_path, drivers_path, model_save_path, encoder_save_path):
-    # Preprocess data
-    X, y, driver_encoder = preprocess_data(rides_path, drivers_path)
+class FeatureCacheIter(xgb.DataIter):
+    """Feeds rows of a memory-mapped feature cache to XGBoost in batches (external memory)."""
 
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    def __init__(self, X, y, indices, cache_prefix, batch_rows=100_000):
+        self.X = X
+        self.y = y
+        # Sorted so each driver's rows stay contiguous, as qid requires
+        self.indices = np.sort(indices)
+        self.batch_rows = batch_rows
+        self.position = 0
+        super().__init__(cache_prefix=cache_prefix)
 
-    # Compute groups
-    group_train = get_group_sizes(y_train)
-    group_test = get_group_sizes(y_test)
+    def next(self, input_data):
+        if self.position >= len(self.indices):
+            return False
+        rows = self.indices[self.position:self.position + self.batch_rows]
+        labels = np.asarray(self.y[rows])
+        input_data(data=np.asarray(self.X[rows]), label=labels, qid=labels)
+        self.position += self.batch_rows
+        return True
 
-    # Train XGBoost model
-    model = xgb.XGBRanker(objective="rank:pairwise", eval_metric="ndcg")
-    model.fit(X_train, y_train, group=group_train)
+    def reset(self):
+        self.position = 0
+
+def predict_in_batches(booster, X, indices, batch_rows=100_000):
+    return np.concatenate([
+        booster.predict(xgb.DMatrix(np.asarray(X[indices[i:i + batch_rows]])))
+        for i in range(0, len(indices), batch_rows)
+    ])
+
+def train_model(rides_path, drivers_path, model_save_path, encoder_save_path, cache_dir=None, external_memory=False):
+    if cache_dir is None:
+        # Preprocess data
+        X, y, driver_encoder = preprocess_data(rides_path, drivers_path)
+
+        # Split data
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+        # Compute groups
+        group_train = get_group_sizes(y_train)
+        group_test = get_group_sizes(y_test)
+
+        # Train XGBoost model
+        model = xgb.XGBRanker(objective="rank:pairwise", eval_metric="ndcg")
+        model.fit(X_train, y_train, group=group_train)
+
+        # Evaluate
+        y_pred = model.predict(X_test)
+    else:
+        # Memory-mapped features, rebuilt from the CSVs only when they change
+        X, y, _, driver_encoder, _ = preprocess_data_cached(rides_path, drivers_path, cache_dir)
+
+        # Split row indices; sorting keeps each driver's rows contiguous for the group sizes
+        train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42)
+        train_idx, test_idx = np.sort(train_idx), np.sort(test_idx)
+        y_test = np.asarray(y[test_idx])
+
+        if external_memory:
+            it = FeatureCacheIter(X, y, train_idx, cache_prefix=os.path.join(cache_dir, "xgb_train"))
+            dtrain = xgb.DMatrix(it)
+            booster = xgb.train({"objective": "rank:pairwise", "eval_metric": "ndcg", "tree_method": "hist"}, dtrain, num_boost_round=100)
+            model = xgb.XGBRanker()
+            model.load_model(bytearray(booster.save_raw()))
+            y_pred = predict_in_batches(booster, X, test_idx)
+        else:
+            y_train = np.asarray(y[train_idx])
+            model = xgb.XGBRanker(objective="rank:pairwise", eval_metric="ndcg")
+            model.fit(X[train_idx], y_train, group=get_group_sizes(y_train))
+            y_pred = model.predict(X[test_idx])
 
-    # Evaluate
-    y_pred = model.predict(X_test)
     print("NDCG Score:", ndcg_score([y_test], [y_pred]))
 
     # Save model and encoder
@@ -41,5 +94,6 @@ if __name__ == "__main__":
         os.path.join("..", "datasets", "rides_data.csv"),
         os.path.join("..", "datasets", "drivers_data.csv"),
         os.path.join("trained_models", "driver_ranker_model.pkl"),
-        os.path.join("trained_models", "driver_encoder.pkl")
+        os.path.join("trained_models", "driver_encoder.pkl"),
+        cache_dir=os.path.join("..", "datasets", "feature_cache")
     )
@@ -1,7 +1,7 @@
 from typing import Optional
 from fastapi import Header, HTTPException, status
 from .db_utils import verify_jwt_token
-import redis
+from .redis_client import get_redis_client
 
 # Dependency for token verification
 async def verify_token(authorization: Optional[str] = Header(None)):
@@ -24,29 +24,8 @@ async def verify_token(authorization: Optional[str] = Header(None)):
         
     return user_data
 
-# Initialize Redis client
-try:
-    redis_client = redis.StrictRedis(host='localhost', port=6379, decode_responses=True)
-except:
-    # Mock redis client for development
-    class MockRedis:
-        def __init__(self):
-            self.data = {}
-        
-        def hincrby(self, name, key, amount=1):
-            if name not in self.data:
-                self.data[name] = {}
-            if key not in self.data[name]:
-                self.data[name][key] = 0
-            self.data[name][key] += amount
-            return self.data[name][key]
-        
-        def hget(self, name, key):
-            if name in self.data and key in self.data[name]:
-                return str(self.data[name][key])
-            return '0'
-    
-    redis_client = MockRedis()
+# Initialize Redis client (a LocalRedis stand-in when the configured backend is "memory")
+redis_client = get_redis_client()
 
 # Define and export demand_model
 demand_model = "Your model initialization code here"
@@ -56,6 +35,3 @@ demand_data = "Your data initialization code here"
 
 # Define and export G (graph)
 G = "Your graph initialization code here"
-
-# Define and export redis_client
-redis_client = redis.StrictRedis(host='localhost', port=6379, decode_responses=True) if not isinstance(redis_client, MockRedis) else redis_client
@@ -0,0 +1,151 @@
+import collections
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from backend.prebooking.timer_manager import TimerScheduler
+
+DISPATCH_MODE = os.getenv("DISPATCH_MODE", "greedy")  # 'greedy' or 'batch'
+DISPATCH_WINDOW_SECONDS = float(os.getenv("DISPATCH_WINDOW_SECONDS", "2.0"))
+DISPATCH_CELL_DEG = float(os.getenv("DISPATCH_CELL_DEG", "0.05"))  # ~5.5 km cells
+DISPATCH_MAX_PICKUP_KM = float(os.getenv("DISPATCH_MAX_PICKUP_KM", "5.0"))
+
+EARTH_RADIUS_KM = 6371.0
+INFEASIBLE = 1e9
+CLAIM_ROUNDS = 3
+
+def pairwise_km(lat1, lng1, lat2, lng2):
+    """Haversine distances between every point of set 1 (rows) and set 2 (columns)."""
+    lat1, lng1 = np.radians(np.asarray(lat1, dtype=float))[:, None], np.radians(np.asarray(lng1, dtype=float))[:, None]
+    lat2, lng2 = np.radians(np.asarray(lat2, dtype=float))[None, :], np.radians(np.asarray(lng2, dtype=float))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def match_batch(request_coords, driver_coords, max_pickup_km=DISPATCH_MAX_PICKUP_KM, scores=None, score_weight_km=1.0):
+    """Optimal request -> driver assignment for one batch.
+
+    Cost is pickup distance in km minus score_weight_km * score (scores in [0, 1] per
+    request x driver, e.g. ranker acceptance probabilities). Pairs beyond max_pickup_km are
+    infeasible. Returns (driver index or -1 per request, pickup km or None per request).
+    """
+    n_requests = len(request_coords)
+    if n_requests == 0 or len(driver_coords) == 0:
+        return [-1] * n_requests, [None] * n_requests
+    requests = np.asarray(request_coords, dtype=float)
+    drivers = np.asarray(driver_coords, dtype=float)
+    distance = pairwise_km(requests[:, 0], requests[:, 1], drivers[:, 0], drivers[:, 1])
+    cost = distance if scores is None else distance - score_weight_km * np.asarray(scores, dtype=float)
+    cost = np.where(distance <= max_pickup_km, cost, INFEASIBLE)
+    rows, cols = linear_sum_assignment(cost)
+    assigned, pickup_km = [-1] * n_requests, [None] * n_requests
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        if cost[row, col] < INFEASIBLE:
+            assigned[row] = col
+            pickup_km[row] = float(distance[row, col])
+    return assigned, pickup_km
+
+def cell_of(lat, lng, cell_deg=DISPATCH_CELL_DEG):
+    return (math.floor(lat / cell_deg), math.floor(lng / cell_deg))
+
+class BatchDispatcher:
+    """Buffers ride requests per geo cell for a short window, then matches the whole batch.
+
+    The first request in an empty cell opens its window; when it closes, available drivers
+    around the batch are fetched with one query, the assignment is solved optimally, and
+    each winner is claimed through the driver reservations. Requests whose driver was
+    taken meanwhile (e.g. by a neighbouring cell) are re-solved against the rest.
+
+    get_drivers(min_lat, max_lat, min_lng, max_lng) returns dicts with driver_id, latitude
+    and longitude; score_drivers(requests, drivers), if given, returns a requests x drivers
+    array of scores in [0, 1].
+    """
+
+    def __init__(self, get_drivers, reservations, window=DISPATCH_WINDOW_SECONDS, cell_deg=DISPATCH_CELL_DEG,
+                 max_pickup_km=DISPATCH_MAX_PICKUP_KM, score_drivers=None, score_weight_km=1.0, workers=4):
+        self.get_drivers = get_drivers
+        self.reservations = reservations
+        self.window = window
+        self.cell_deg = cell_deg
+        self.max_pickup_km = max_pickup_km
+        self.score_drivers = score_drivers
+        self.score_weight_km = score_weight_km
+        self._pending = collections.defaultdict(list)  # cell -> [(request, future)]
+        self._lock = threading.Lock()
+        self._timers = TimerScheduler(name="dispatch-windows")
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="dispatch")
+        self.stats = collections.Counter()
+
+    def submit(self, customer_id, latitude, longitude):
+        """Queue a request; the Future resolves to {driver_id, token, pickup_km} or None."""
+        future = Future()
+        request = {"customer_id": customer_id, "latitude": float(latitude), "longitude": float(longitude)}
+        cell = cell_of(request["latitude"], request["longitude"], self.cell_deg)
+        with self._lock:
+            batch = self._pending[cell]
+            batch.append((request, future))
+            if len(batch) == 1:
+                self._timers.schedule(cell, time.time() + self.window,
+                                      lambda: self._pool.submit(self._flush, cell))
+        return future
+
+    def stop(self):
+        self._timers.stop()
+        self._pool.shutdown(wait=True)
+
+    def _flush(self, cell):
+        with self._lock:
+            batch = self._pending.pop(cell, [])
+        if not batch:
+            return
+        try:
+            results = self.dispatch([request for request, _ in batch])
+        except Exception as e:
+            print(f"Dispatch for cell {cell} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def dispatch(self, requests):
+        """Match and claim drivers for a batch; one result (or None) per request."""
+        margin_lat = self.max_pickup_km / 111.0
+        margin_lng = margin_lat / max(math.cos(math.radians(requests[0]["latitude"])), 0.1)
+        lats = [request["latitude"] for request in requests]
+        lngs = [request["longitude"] for request in requests]
+        drivers = self.get_drivers(min(lats) - margin_lat, max(lats) + margin_lat,
+                                   min(lngs) - margin_lng, max(lngs) + margin_lng)
+        self.stats["batches"] += 1
+        self.stats["requests"] += len(requests)
+
+        results = [None] * len(requests)
+        open_requests = list(range(len(requests)))
+        for _ in range(CLAIM_ROUNDS):
+            if not open_requests or not drivers:
+                break
+            batch = [requests[i] for i in open_requests]
+            scores = self.score_drivers(batch, drivers) if self.score_drivers else None
+            assigned, pickup_km = match_batch(
+                [(r["latitude"], r["longitude"]) for r in batch],
+                [(d["latitude"], d["longitude"]) for d in drivers],
+                self.max_pickup_km, scores, self.score_weight_km
+            )
+            taken, still_open = set(), []
+            for i, col, km in zip(open_requests, assigned, pickup_km):
+                if col < 0:
+                    continue  # nobody within reach; a retry round would not change that
+                driver_id = drivers[col]["driver_id"]
+                token = self.reservations.new_token()
+                taken.add(col)
+                if self.reservations.claim(driver_id, token):
+                    results[i] = {"driver_id": driver_id, "token": token, "pickup_km": km}
+                else:
+                    self.stats["claim_conflicts"] += 1
+                    still_open.append(i)
+            drivers = [driver for col, driver in enumerate(drivers) if col not in taken]
+            open_requests = still_open
+        self.stats["matched"] += sum(result is not None for result in results)
+        return results
@@ -0,0 +1,115 @@
+import argparse
+import collections
+import time
+import numpy as np
+from .batch_dispatch import BatchDispatcher, cell_of, pairwise_km
+from .driver_reservations import DriverReservations
+from .local_redis import LocalRedis
+
+# Bengaluru bounding box, as in db_utils.generate_random_bengaluru_location
+MIN_LAT, MAX_LAT = 12.8340, 13.0827
+MIN_LNG, MAX_LNG = 77.4799, 77.7145
+
+def synthetic_workload(n_drivers, rate, duration, hotspots=6, seed=3):
+    """Uniform drivers; requests arriving as a Poisson stream around a few demand hotspots.
+    Each request carries a trip length and a drop-off where its driver frees up again."""
+    rng = np.random.default_rng(seed)
+    drivers = np.column_stack([rng.uniform(MIN_LAT, MAX_LAT, n_drivers), rng.uniform(MIN_LNG, MAX_LNG, n_drivers)])
+    n_requests = rng.poisson(rate * duration)
+    arrivals = np.sort(rng.uniform(0, duration, n_requests))
+    centres = np.column_stack([rng.uniform(MIN_LAT, MAX_LAT, hotspots), rng.uniform(MIN_LNG, MAX_LNG, hotspots)])
+    spots = rng.integers(0, hotspots, n_requests)
+    requests = centres[spots] + rng.normal(0, 0.015, (n_requests, 2))
+    dropoffs = np.column_stack([rng.uniform(MIN_LAT, MAX_LAT, n_requests), rng.uniform(MIN_LNG, MAX_LNG, n_requests)])
+    trip_seconds = rng.uniform(0.1, 0.4, n_requests) * duration
+    return drivers, arrivals, requests, dropoffs, trip_seconds
+
+class Fleet:
+    """Driver positions plus busy-until times; drivers reappear at their drop-off."""
+
+    def __init__(self, drivers):
+        self.position = drivers.copy()
+        self.busy_until = np.zeros(len(drivers))
+
+    def free_at(self, t):
+        return self.busy_until <= t
+
+    def assign(self, driver, t, dropoff, trip_seconds):
+        self.busy_until[driver] = t + trip_seconds
+        self.position[driver] = dropoff
+
+def run_greedy(drivers, arrivals, requests, dropoffs, trip_seconds, max_pickup_km):
+    """Each request takes its own nearest free driver the moment it arrives."""
+    fleet = Fleet(drivers)
+    pickups = []
+    start = time.perf_counter()
+    for i, (t, (lat, lng)) in enumerate(zip(arrivals, requests)):
+        # Same per-request work as the current path: one query over every available driver
+        free = np.flatnonzero(fleet.free_at(t))
+        distance = pairwise_km([lat], [lng], fleet.position[free, 0], fleet.position[free, 1])[0]
+        if len(distance) == 0 or distance.min() > max_pickup_km:
+            continue
+        fleet.assign(free[distance.argmin()], t, dropoffs[i], trip_seconds[i])
+        pickups.append(distance.min())
+    return pickups, time.perf_counter() - start, len(requests)
+
+def run_batched(drivers, arrivals, requests, dropoffs, trip_seconds, window, cell_deg, max_pickup_km):
+    """Requests buffered per (window, cell) and matched together when the window closes."""
+    fleet = Fleet(drivers)
+    now = [0.0]
+
+    def get_drivers(min_lat, max_lat, min_lng, max_lng):
+        position = fleet.position
+        inside = fleet.free_at(now[0]) & (position[:, 0] >= min_lat) & (position[:, 0] <= max_lat) \
+            & (position[:, 1] >= min_lng) & (position[:, 1] <= max_lng)
+        return [{"driver_id": int(i), "latitude": position[i, 0], "longitude": position[i, 1]}
+                for i in np.flatnonzero(inside)]
+
+    # Claims last the whole run here, so release them as drivers finish trips
+    reservations = DriverReservations(LocalRedis(), ttl_ms=3_600_000)
+    dispatcher = BatchDispatcher(get_drivers, reservations, window=window, cell_deg=cell_deg,
+                                 max_pickup_km=max_pickup_km, workers=1)
+    batches = collections.defaultdict(list)  # (window index, cell) -> request indexes
+    for i, (t, (lat, lng)) in enumerate(zip(arrivals, requests)):
+        batches[(int(t // window), cell_of(lat, lng, cell_deg))].append(i)
+
+    pickups = []
+    start = time.perf_counter()
+    for key in sorted(batches):
+        now[0] = (key[0] + 1) * window
+        indexes = batches[key]
+        batch = [{"customer_id": i, "latitude": requests[i, 0], "longitude": requests[i, 1]} for i in indexes]
+        for i, result in zip(indexes, dispatcher.dispatch(batch)):
+            if result is not None:
+                fleet.assign(result["driver_id"], now[0], dropoffs[i], trip_seconds[i])
+                reservations.release(result["driver_id"], result["token"])
+                pickups.append(result["pickup_km"])
+    elapsed = time.perf_counter() - start
+    dispatcher.stop()
+    return pickups, elapsed, len(batches), dispatcher.stats
+
+def run(n_drivers=3000, rate=150.0, duration=20.0, window=2.0, cell_deg=0.05, max_pickup_km=5.0):
+    drivers, arrivals, requests, dropoffs, trip_seconds = synthetic_workload(n_drivers, rate, duration)
+    n = len(requests)
+    print(f"{n} requests over {duration:.0f}s against {n_drivers} drivers, window {window}s, cells {cell_deg} deg")
+
+    pickups, elapsed, queries = run_greedy(drivers, arrivals, requests, dropoffs, trip_seconds, max_pickup_km)
+    print(f"greedy:  matched {len(pickups)}/{n}, avg pickup {np.mean(pickups):.3f} km, "
+          f"{n / elapsed:.0f} req/s, {queries} driver queries")
+
+    pickups, elapsed, queries, stats = run_batched(drivers, arrivals, requests, dropoffs, trip_seconds, window, cell_deg,
+                                                   max_pickup_km)
+    print(f"batched: matched {len(pickups)}/{n}, avg pickup {np.mean(pickups):.3f} km, "
+          f"{n / elapsed:.0f} req/s, {queries} driver queries, {stats['claim_conflicts']} claim conflicts, "
+          f"avg added wait {window / 2:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare greedy and batched dispatch on a synthetic workload")
+    parser.add_argument("--drivers", type=int, default=3000)
+    parser.add_argument("--rate", type=float, default=150.0, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--window", type=float, default=2.0)
+    parser.add_argument("--cell-deg", type=float, default=0.05)
+    parser.add_argument("--max-pickup-km", type=float, default=5.0)
+    args = parser.parse_args()
+    run(args.drivers, args.rate, args.duration, args.window, args.cell_deg, args.max_pickup_km)
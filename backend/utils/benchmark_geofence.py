@@ -0,0 +1,82 @@
+import argparse
+import time
+import numpy as np
+from .geofence import WardIndex, points_in_polygon
+
+# Bengaluru bounding box, as in db_utils.generate_random_bengaluru_location
+MIN_LAT, MAX_LAT = 12.8340, 13.0827
+MIN_LNG, MAX_LNG = 77.4799, 77.7145
+
+def synthetic_wards(n=14, points_per_side=25, seed=6):
+    """n x n wards tiling the city: a jittered quad mesh whose shared sides are wiggly
+    polylines, so neighbouring wards meet exactly like real boundaries."""
+    rng = np.random.default_rng(seed)
+    step_lat, step_lng = (MAX_LAT - MIN_LAT) / n, (MAX_LNG - MIN_LNG) / n
+    corners = np.stack(np.meshgrid(np.linspace(MIN_LAT, MAX_LAT, n + 1), np.linspace(MIN_LNG, MAX_LNG, n + 1), indexing="ij"), -1)
+    corners[1:-1, 1:-1] += rng.uniform(-0.2, 0.2, (n - 1, n - 1, 2)) * [step_lat, step_lng]
+
+    sides = {}
+    def side(a, b):
+        # Polyline from corner a to corner b, shared by the wards on either side
+        if (b, a) in sides:
+            return sides[(b, a)][::-1]
+        if (a, b) not in sides:
+            start, end = corners[a], corners[b]
+            t = np.linspace(0, 1, points_per_side)[:, None]
+            line = start + t * (end - start)
+            on_edge = a[0] == b[0] in (0, n) or a[1] == b[1] in (0, n)
+            if not on_edge:
+                normal = np.array([-(end - start)[1], (end - start)[0]])
+                line[1:-1] += normal * rng.normal(0, 0.03, (points_per_side - 2, 1))
+            sides[(a, b)] = line
+        return sides[(a, b)]
+
+    wards, edges = [], []
+    for i in range(n):
+        for j in range(n):
+            ring = np.vstack([side((i, j), (i, j + 1))[:-1], side((i, j + 1), (i + 1, j + 1))[:-1],
+                              side((i + 1, j + 1), (i + 1, j))[:-1], side((i + 1, j), (i, j))])
+            xy = ring[:, ::-1]  # GeoJSON order: lng, lat
+            wards.append(f"ward-{i * n + j + 1}")
+            edges.append(np.hstack([xy[:-1], xy[1:]]))
+    return wards, edges
+
+def run(n=14, points=200_000, cell_deg=0.002, seed=7):
+    wards, edges = synthetic_wards(n)
+    start = time.perf_counter()
+    index = WardIndex(wards, edges, cell_deg)
+    print(f"{len(wards)} wards, {sum(len(e) for e in edges)} edges: indexed in {(time.perf_counter() - start) * 1000:.0f}ms, {index.stats()}")
+
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(MIN_LAT - 0.01, MAX_LAT + 0.01, points)
+    lngs = rng.uniform(MIN_LNG - 0.01, MAX_LNG + 0.01, points)
+
+    start = time.perf_counter()
+    expected = np.full(points, -1)
+    for k, polygon in enumerate(edges):
+        x1, x2 = polygon[:, [0, 2]].min(), polygon[:, [0, 2]].max()
+        y1, y2 = polygon[:, [1, 3]].min(), polygon[:, [1, 3]].max()
+        box = np.flatnonzero((lngs >= x1) & (lngs <= x2) & (lats >= y1) & (lats <= y2) & (expected < 0))
+        inside = points_in_polygon(lngs[box], lats[box], polygon)
+        expected[box[inside]] = k
+    brute = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scalar = [index.ward_index_of(lat, lng) for lat, lng in zip(lats.tolist(), lngs.tolist())]
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = index.ward_indices(lats, lngs)
+    batched = time.perf_counter() - start
+
+    print(f"{points} points: one at a time {single / points * 1e6:.2f}us each, batch {batched * 1000:.0f}ms "
+          f"({points / batched:,.0f}/s), brute-force polygon scan {brute * 1000:.0f}ms")
+    print(f"mismatches vs brute force: scalar {int(np.count_nonzero(np.array(scalar) != expected))}, "
+          f"batch {int(np.count_nonzero(batch != expected))}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time point-to-ward lookups on synthetic ward boundaries")
+    parser.add_argument("--wards-per-side", type=int, default=14)
+    parser.add_argument("--points", type=int, default=200_000)
+    parser.add_argument("--cell-deg", type=float, default=0.002)
+    args = parser.parse_args()
+    run(args.wards_per_side, args.points, args.cell_deg)
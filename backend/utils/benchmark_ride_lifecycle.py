@@ -0,0 +1,121 @@
+import argparse
+import collections
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .db_utils import get_db_connection
+from .ride_lifecycle import TransitionError, transition_ride
+
+def _create_users(cursor, prefix, count, user_type):
+    ids = []
+    for i in range(count):
+        cursor.execute(
+            "INSERT INTO users (name, email, password_hash, user_type) VALUES (%s, %s, 'x', %s)",
+            (f"{prefix} {i}", f"{prefix}{i}@bench.local", user_type)
+        )
+        ids.append(cursor.lastrowid)
+    return ids
+
+def setup(n_rides, n_drivers):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        customers = _create_users(cursor, "bench_customer", n_rides, "customer")
+        drivers = _create_users(cursor, "bench_driver", n_drivers, "driver")
+        cursor.executemany("INSERT INTO driver (driver_id, is_available) VALUES (%s, TRUE)", [(d,) for d in drivers])
+        rides = []
+        for customer_id in customers:
+            cursor.execute("INSERT INTO rides (customer_id, status) VALUES (%s, 'pending')", (customer_id,))
+            rides.append(cursor.lastrowid)
+        conn.commit()
+        return customers, drivers, rides
+    finally:
+        cursor.close()
+        conn.close()
+
+def teardown(customers, drivers, rides):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("DELETE FROM rides WHERE ride_id = %s", [(r,) for r in rides])
+        cursor.executemany("DELETE FROM driver WHERE driver_id = %s", [(d,) for d in drivers])
+        cursor.executemany("DELETE FROM users WHERE user_id = %s", [(u,) for u in customers + drivers])
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def run(n_rides=500, n_drivers=500, contenders=8, workers=64, seed=11):
+    """Have `contenders` random drivers race to accept every ride, then check that no ride was
+    accepted twice, no driver holds two rides, and the table agrees with the winners."""
+    rng = random.Random(seed)
+    customers, drivers, rides = setup(n_rides, n_drivers)
+    try:
+        attempts = [(ride_id, driver_id) for ride_id in rides for driver_id in rng.sample(drivers, contenders)]
+        rng.shuffle(attempts)
+        outcomes = collections.Counter()
+
+        def accept(attempt):
+            ride_id, driver_id = attempt
+            try:
+                transition_ride(ride_id, "accept", driver_id)
+                return ride_id, driver_id, "accepted"
+            except TransitionError as e:
+                return ride_id, driver_id, e.reason
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(workers) as pool:
+            results = list(pool.map(accept, attempts))
+        elapsed = time.perf_counter() - start
+
+        winners = {}
+        rides_per_driver = collections.Counter()
+        double_accepts = 0
+        for ride_id, driver_id, outcome in results:
+            outcomes[outcome] += 1
+            if outcome == "accepted":
+                double_accepts += ride_id in winners
+                winners[ride_id] = driver_id
+                rides_per_driver[driver_id] += 1
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT ride_id, driver_id, status, version FROM rides WHERE ride_id BETWEEN %s AND %s",
+                (min(rides), max(rides))
+            )
+            mismatches = 0
+            for ride_id, driver_id, ride_status, version in cursor.fetchall():
+                if ride_id not in winners:
+                    mismatches += ride_status != "pending" or version != 0
+                else:
+                    mismatches += ride_status != "accepted" or driver_id != winners[ride_id] or version != 1
+            cursor.execute(
+                "SELECT COUNT(*) FROM driver WHERE driver_id BETWEEN %s AND %s AND is_available = FALSE",
+                (min(drivers), max(drivers))
+            )
+            busy_drivers = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+            conn.close()
+
+        print(f"{len(attempts)} accept attempts on {n_rides} rides by {workers} threads in {elapsed:.2f}s "
+              f"({len(attempts) / elapsed:.0f}/s)")
+        print(f"Outcomes: {dict(outcomes)}")
+        print(f"Double accepts: {double_accepts}, drivers with >1 ride: "
+              f"{sum(1 for n in rides_per_driver.values() if n > 1)}, "
+              f"rows disagreeing with winners: {mismatches}, busy drivers: {busy_drivers}/{len(rides_per_driver)}")
+        return double_accepts == 0 and mismatches == 0 and busy_drivers == len(rides_per_driver)
+    finally:
+        teardown(customers, drivers, rides)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Race concurrent accepts against the ride lifecycle CAS")
+    parser.add_argument("--rides", type=int, default=500)
+    parser.add_argument("--drivers", type=int, default=500)
+    parser.add_argument("--contenders", type=int, default=8, help="Drivers racing for each ride")
+    parser.add_argument("--workers", type=int, default=64)
+    args = parser.parse_args()
+    ok = run(args.rides, args.drivers, args.contenders, args.workers)
+    print("PASS" if ok else "FAIL")
@@ -0,0 +1,75 @@
+import argparse
+import threading
+import time
+import numpy as np
+from .surge_engine import SurgeEngine
+
+# Bengaluru bounding box, as in db_utils.generate_random_bengaluru_location
+MIN_LAT, MAX_LAT = 12.8340, 13.0827
+MIN_LNG, MAX_LNG = 77.4799, 77.7145
+
+def run(drivers=5000, requests_per_tick=2000, ticks=30, lookups=1_000_000, threads=8, seed=4):
+    rng = np.random.default_rng(seed)
+    supply = list(zip(rng.uniform(MIN_LAT, MAX_LAT, drivers).tolist(), rng.uniform(MIN_LNG, MAX_LNG, drivers).tolist()))
+    # Demand concentrated around a hotspot in the centre
+    demand = rng.normal([12.97, 77.59], 0.03, (requests_per_tick, 2)).tolist()
+    engine = SurgeEngine(get_supply=lambda: supply, tick_seconds=3600)
+
+    tick_ms = []
+    for tick in range(ticks):
+        for lat, lng in demand:
+            engine.record_request(lat, lng)
+        start = time.perf_counter()
+        engine.tick(now=tick * 10.0)
+        tick_ms.append((time.perf_counter() - start) * 1000)
+    snapshot = engine.snapshot()
+    print(f"{ticks} ticks, {drivers} drivers, {requests_per_tick} requests/tick: median tick {np.median(tick_ms):.1f}ms, "
+          f"{snapshot['surging_zones']} surging zones, max multiplier {snapshot['zones'][0]['multiplier']}")
+
+    points = rng.uniform([MIN_LAT, MIN_LNG], [MAX_LAT, MAX_LNG], (10000, 2)).tolist()
+    start = time.perf_counter()
+    for i in range(lookups):
+        lat, lng = points[i % 10000]
+        engine.multiplier(lat, lng)
+    elapsed = time.perf_counter() - start
+    print(f"single thread: {lookups / elapsed:,.0f} lookups/s ({elapsed / lookups * 1e6:.2f}us each)")
+
+    # Lookups from several threads while requests are recorded and the engine keeps ticking
+    stop = threading.Event()
+    def churn():
+        tick = ticks
+        while not stop.is_set():
+            for lat, lng in demand[:200]:
+                engine.record_request(lat, lng)
+            engine.tick(now=tick * 10.0)
+            tick += 1
+
+    counts = [0] * threads
+    def look_up(slot):
+        for i in range(lookups // threads):
+            lat, lng = points[i % 10000]
+            engine.multiplier(lat, lng)
+        counts[slot] = lookups // threads
+
+    churner = threading.Thread(target=churn)
+    churner.start()
+    workers = [threading.Thread(target=look_up, args=(slot,)) for slot in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    churner.join()
+    print(f"{threads} threads with concurrent ticks: {sum(counts) / elapsed:,.0f} lookups/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time surge ticks and multiplier lookups on a synthetic city")
+    parser.add_argument("--drivers", type=int, default=5000)
+    parser.add_argument("--requests-per-tick", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=30)
+    parser.add_argument("--lookups", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    run(args.drivers, args.requests_per_tick, args.ticks, args.lookups, args.threads)
@@ -8,6 +8,9 @@ import uuid
 import pathlib
 import random
 import jwt
+from data_processing.kafka_producer import emit_event
+from external_integrations.maps.main import get_route
+from backend.utils.surge_engine import surge_engine
 
 # Load environment variables if using .env file
 load_dotenv()
@@ -214,6 +217,7 @@ def update_driver_location(driver_id, location_name, latitude, longitude):
             (location_name, latitude, longitude, driver_id)
         )
         conn.commit()
+        emit_event("driver_location", driver_id=driver_id, latitude=latitude, longitude=longitude)
         return True
     except Exception as e:
         print(f"Error updating driver location: {e}")
@@ -233,6 +237,7 @@ def update_driver_availability(driver_id, is_available):
             (is_available, driver_id)
         )
         conn.commit()
+        emit_event("driver_status", driver_id=driver_id, is_available=bool(is_available))
         return True
     except Exception as e:
         print(f"Error updating driver availability: {e}")
@@ -272,6 +277,74 @@ def get_nearest_driver(customer_id):
         cursor.close()
         conn.close()
 
+def get_nearest_available_drivers(latitude, longitude, limit=5):
+    """Available drivers closest to a point, nearest first"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        cursor.execute(
+            "SELECT driver_id, latitude, longitude, "
+            "SQRT(POW(69.1 * (latitude - %s), 2) + POW(69.1 * (%s - longitude) * COS(latitude / 57.3), 2)) AS distance "
+            "FROM driver WHERE is_available = TRUE "
+            "ORDER BY distance ASC LIMIT %s",
+            (latitude, longitude, limit)
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_ride_pickup(ride_id):
+    """(pickup_lat, pickup_lon) of a ride, or None if it has no pickup coordinates"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT pickup_lat, pickup_lon FROM rides WHERE ride_id = %s", (ride_id,))
+        row = cursor.fetchone()
+        if not row or None in row:
+            return None
+        return float(row[0]), float(row[1])
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_pending_offers():
+    """(ride_id, driver_id, offered_at epoch seconds) for rides still waiting on their offered driver"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # The offer is the ride's last update: booking inserts it, the 'offer' transition re-assigns it
+        cursor.execute(
+            "SELECT ride_id, driver_id, UNIX_TIMESTAMP(updated_at) FROM rides "
+            "WHERE status = 'pending' AND driver_id IS NOT NULL"
+        )
+        return [(ride_id, driver_id, float(offered_at)) for ride_id, driver_id, offered_at in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_available_drivers_in_box(min_lat, max_lat, min_lng, max_lng):
+    """Available drivers inside a lat/lng bounding box (one query for a whole dispatch batch)"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    try:
+        cursor.execute(
+            "SELECT driver_id, latitude, longitude FROM driver WHERE is_available = TRUE "
+            "AND latitude BETWEEN %s AND %s AND longitude BETWEEN %s AND %s",
+            (min_lat, max_lat, min_lng, max_lng)
+        )
+        return [
+            {"driver_id": row["driver_id"], "latitude": float(row["latitude"]), "longitude": float(row["longitude"])}
+            for row in cursor.fetchall()
+        ]
+    finally:
+        cursor.close()
+        conn.close()
+
 def book_ride(customer_id, driver_id):
     """Book a ride with a driver"""
     conn = get_db_connection()
@@ -283,9 +356,9 @@ def book_ride(customer_id, driver_id):
             return None
         
         cursor.execute("INSERT INTO rides (customer_id, driver_id) VALUES (%s, %s)", (customer_id, driver_id))
+        ride_id = cursor.lastrowid
         conn.commit()
-        cursor.execute("SELECT ride_id FROM rides WHERE customer_id = %s ORDER BY created_at DESC LIMIT 1", (customer_id,))
-        ride_id = cursor.fetchone()[0]
+        emit_event("ride_booked", ride_id=ride_id, customer_id=customer_id, driver_id=driver_id)
         return ride_id
     except Exception as e:
         print(f"Error booking ride: {e}")
@@ -321,7 +394,9 @@ def book_ride_with_coords(customer_id, driver_id, destination, pickup_lat=None,
         else:
             pickup_location = "Custom Pickup"
         
-        # Insert ride with coordinates
+        # Insert ride with coordinates, priced with the pickup zone's current surge
+        surge_multiplier = surge_engine.multiplier(pickup_lat, pickup_lng) if pickup_lat is not None and pickup_lng is not None else 1.0
+        fare = calculate_fare(pickup_lat, pickup_lng, dest_lat, dest_lng, surge_multiplier)
         cursor.execute(
             """
             INSERT INTO rides (
@@ -334,8 +409,9 @@ def book_ride_with_coords(customer_id, driver_id, destination, pickup_lat=None,
                 dropoff_lat,
                 dropoff_lon,
                 fare,
+                surge_multiplier,
                 status
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'pending')
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'pending')
             """, 
             (
                 customer_id, 
@@ -346,17 +422,16 @@ def book_ride_with_coords(customer_id, driver_id, destination, pickup_lat=None,
                 pickup_lng,
                 dest_lat,
                 dest_lng,
-                calculate_fare(pickup_lat, pickup_lng, dest_lat, dest_lng)
+                fare,
+                surge_multiplier
             )
         )
+        # The ID of this insert; a created_at lookup can return an earlier ride booked in the same second
+        ride_id = cursor.lastrowid
         conn.commit()
-        
-        # Get the ID of the newly created ride
-        cursor.execute(
-            "SELECT ride_id FROM rides WHERE customer_id = %s ORDER BY created_at DESC LIMIT 1", 
-            (customer_id,)
-        )
-        ride_id = cursor.fetchone()[0]
+        emit_event("ride_booked", ride_id=ride_id, customer_id=customer_id, driver_id=driver_id,
+                   pickup_lat=pickup_lat, pickup_lng=pickup_lng, dest_lat=dest_lat, dest_lng=dest_lng, fare=fare,
+                   surge_multiplier=surge_multiplier)
         return ride_id
     except Exception as e:
         print(f"Error booking ride: {e}")
@@ -366,35 +441,42 @@ def book_ride_with_coords(customer_id, driver_id, destination, pickup_lat=None,
         cursor.close()
         conn.close()
 
-def calculate_fare(pickup_lat, pickup_lng, dest_lat, dest_lng):
-    """Calculate the fare based on distance between coordinates"""
+def calculate_fare(pickup_lat, pickup_lng, dest_lat, dest_lng, surge_multiplier=None):
+    """Calculate the fare based on distance between coordinates and the pickup zone's surge"""
     # If we don't have coordinates, return a default fare
     if None in (pickup_lat, pickup_lng, dest_lat, dest_lng):
         return 150.00  # Default fare
     
-    # Simple distance-based calculation (you can make this more sophisticated)
-    from math import radians, sin, cos, sqrt, atan2
-    
-    # Convert to radians
-    lat1, lon1 = radians(float(pickup_lat)), radians(float(pickup_lng))
-    lat2, lon2 = radians(float(dest_lat)), radians(float(dest_lng))
-    
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    
-    # Earth's radius in km
-    radius = 6371
-    distance = radius * c
+    # Road distance from the offline routing graph when it has been built
+    route = get_route((pickup_lat, pickup_lng), (dest_lat, dest_lng))
+    if route["source"] == "road_graph":
+        distance = route["distance_km"]
+    else:
+        # Simple distance-based calculation (you can make this more sophisticated)
+        from math import radians, sin, cos, sqrt, atan2
+        
+        # Convert to radians
+        lat1, lon1 = radians(float(pickup_lat)), radians(float(pickup_lng))
+        lat2, lon2 = radians(float(dest_lat)), radians(float(dest_lng))
+        
+        # Haversine formula
+        dlon = lon2 - lon1
+        dlat = lat2 - lat1
+        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+        c = 2 * atan2(sqrt(a), sqrt(1-a))
+        
+        # Earth's radius in km
+        radius = 6371
+        distance = radius * c
     
     # Base fare + distance-based component
     base_fare = 50.0
     per_km_rate = 12.0
     fare = base_fare + (distance * per_km_rate)
     
-    return round(fare, 2)
+    if surge_multiplier is None:
+        surge_multiplier = surge_engine.multiplier(pickup_lat, pickup_lng)
+    return round(fare * surge_multiplier, 2)
 
 # JWT Authentication functions for React
 def generate_jwt_token(user_data):
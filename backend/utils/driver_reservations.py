@@ -0,0 +1,255 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from backend.prebooking.timer_manager import TimerScheduler
+from backend.utils.db_utils import get_db_connection, get_nearest_available_drivers, get_pending_offers, get_ride_pickup
+from backend.utils.redis_client import get_redis_client
+from backend.utils.ride_lifecycle import ACTIVE_STATUSES, TransitionError, transition_ride
+from data_processing.kafka_producer import emit_event
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:
+    from backend.utils.local_redis import WatchError
+
+RESERVATION_TTL_MS = int(os.getenv("DRIVER_RESERVATION_TTL_MS", "30000"))
+# Drivers a ride is offered to before it is cancelled as unassigned
+RIDE_MAX_OFFERS = int(os.getenv("RIDE_MAX_OFFERS", "3"))
+
+class DriverReservations:
+    """Short-lived driver claims held in Redis (or the in-process stand-in).
+
+    A claim is SET NX PX on driver:reservation:{driver_id}, so of two dispatchers racing for
+    the same driver exactly one wins, without touching MySQL. Claims lapse on their own after
+    the TTL; release only deletes a claim still owned by the caller's token.
+    """
+
+    def __init__(self, redis_client=None, ttl_ms=RESERVATION_TTL_MS, prefix="driver:reservation"):
+        self._redis = redis_client
+        self.ttl_ms = ttl_ms
+        self.prefix = prefix
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_client()
+        return self._redis
+
+    def _key(self, driver_id):
+        return f"{self.prefix}:{driver_id}"
+
+    @staticmethod
+    def new_token():
+        return uuid.uuid4().hex
+
+    def claim(self, driver_id, token, ttl_ms=None):
+        return bool(self.redis.set(self._key(driver_id), token, nx=True, px=ttl_ms or self.ttl_ms))
+
+    def claim_first(self, driver_ids, token, ttl_ms=None):
+        """Claim the first free driver in preference order; None if all are taken."""
+        for driver_id in driver_ids:
+            if self.claim(driver_id, token, ttl_ms):
+                return driver_id
+        return None
+
+    def holder(self, driver_id):
+        token = self.redis.get(self._key(driver_id))
+        return token.decode() if isinstance(token, bytes) else token
+
+    def extend(self, driver_id, token, ttl_ms=None):
+        """Push the claim's expiry out, if the caller still holds it."""
+        return self._if_held(driver_id, token, lambda pipe, key: pipe.pexpire(key, ttl_ms or self.ttl_ms))
+
+    def hand_over(self, driver_id, token, new_token, ttl_ms=None):
+        """Re-key a held claim (e.g. to its ride) and restart its TTL."""
+        return self._if_held(driver_id, token,
+                             lambda pipe, key: pipe.set(key, new_token, px=ttl_ms or self.ttl_ms))
+
+    def release(self, driver_id, token):
+        return self._if_held(driver_id, token, lambda pipe, key: pipe.delete(key))
+
+    def _if_held(self, driver_id, token, command):
+        key = self._key(driver_id)
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                current = pipe.get(key)
+                if (current.decode() if isinstance(current, bytes) else current) != token:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                command(pipe, key)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+class AvailabilityWriter:
+    """Commits driver availability changes off the request path.
+
+    Updates are queued and written by one background thread in batches; when the same
+    driver appears twice in a batch only the last value is written. Because a write can land
+    after the synchronous flips in transition_ride, each one is conditional on the driver's
+    rides: unavailable only while they hold a pending offer or an active ride, available only
+    while they have no active ride.
+    """
+
+    def __init__(self, get_connection=get_db_connection, batch_size=200):
+        self.get_connection = get_connection
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def set_available(self, driver_id, is_available):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="availability-writer", daemon=True)
+                    self._thread.start()
+        self._queue.put((driver_id, bool(is_available)))
+
+    def flush(self):
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            updates = [self._queue.get()]
+            while len(updates) < self.batch_size:
+                try:
+                    updates.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(dict(updates))
+            except Exception as e:
+                print(f"Failed to commit availability for {len(updates)} drivers: {e}")
+            finally:
+                for _ in updates:
+                    self._queue.task_done()
+
+    def _write(self, latest):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        holding = ", ".join(f"'{status}'" for status in ("pending",) + ACTIVE_STATUSES)
+        active = ", ".join(f"'{status}'" for status in ACTIVE_STATUSES)
+        try:
+            busy = [(driver_id,) for driver_id, is_available in latest.items() if not is_available]
+            free = [(driver_id,) for driver_id, is_available in latest.items() if is_available]
+            if busy:
+                cursor.executemany(
+                    "UPDATE driver SET is_available = FALSE WHERE driver_id = %s AND EXISTS "
+                    f"(SELECT 1 FROM rides WHERE rides.driver_id = driver.driver_id AND rides.status IN ({holding}))",
+                    busy
+                )
+            if free:
+                cursor.executemany(
+                    "UPDATE driver SET is_available = TRUE WHERE driver_id = %s AND NOT EXISTS "
+                    f"(SELECT 1 FROM rides WHERE rides.driver_id = driver.driver_id AND rides.status IN ({active}))",
+                    free
+                )
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        for driver_id, is_available in latest.items():
+            emit_event("driver_status", driver_id=driver_id, is_available=is_available)
+
+driver_reservations = DriverReservations()
+availability_writer = AvailabilityWriter()
+offer_timers = TimerScheduler(name="ride-offer-timers")
+
+def _ride_token(ride_id):
+    return f"ride:{ride_id}"
+
+def _offered_key(ride_id):
+    return f"ride:offered:{ride_id}"
+
+def offer_ride(ride_id, driver_id, token):
+    """Bind a dispatch claim to its booked ride and start the offer timeout.
+
+    If the driver neither accepts nor declines within the reservation TTL, the ride is
+    treated exactly as if they had declined and goes to the next driver.
+    """
+    driver_reservations.hand_over(driver_id, token, _ride_token(ride_id))
+    _record_offer(ride_id, driver_id)
+    offer_timers.schedule(ride_id, time.time() + driver_reservations.ttl_ms / 1000,
+                          lambda: _offer_expired(ride_id, driver_id))
+
+def _record_offer(ride_id, driver_id):
+    """Remember the drivers who already had this ride, so a re-offer skips them"""
+    redis = driver_reservations.redis
+    redis.sadd(_offered_key(ride_id), driver_id)
+    redis.pexpire(_offered_key(ride_id), driver_reservations.ttl_ms * (RIDE_MAX_OFFERS + 1))
+
+def close_offer(ride_id):
+    """The ride left dispatch (accepted or cancelled); stop its timeout and offer history."""
+    offer_timers.cancel(ride_id)
+    driver_reservations.redis.delete(_offered_key(ride_id))
+
+def release_driver(ride_id, driver_id):
+    """Drop the ride's claim on a driver (decline, timeout or cancel before acceptance)."""
+    offer_timers.cancel(ride_id)
+    driver_reservations.release(driver_id, _ride_token(ride_id))
+    availability_writer.set_available(driver_id, True)
+
+def end_ride(ride_id, driver_id):
+    """The ride is over (completed, or cancelled after acceptance); drop its claim so the
+    driver can be dispatched again without waiting out the TTL."""
+    driver_reservations.release(driver_id, _ride_token(ride_id))
+
+def redispatch_ride(ride_id):
+    """Offer a declined or timed-out ride to the nearest free driver who has not had it.
+
+    After RIDE_MAX_OFFERS offers, or when nobody is free, the ride is cancelled so the
+    customer is told (through its ride_status event) and can book again. Returns the new
+    driver's id, or None.
+    """
+    redis = driver_reservations.redis
+    offered = {int(member) for member in redis.smembers(_offered_key(ride_id))}
+    pickup = get_ride_pickup(ride_id)
+    candidates = []
+    if pickup is not None and len(offered) < RIDE_MAX_OFFERS:
+        candidates = [driver["driver_id"] for driver in get_nearest_available_drivers(*pickup)
+                      if driver["driver_id"] not in offered]
+
+    token = driver_reservations.new_token()
+    driver_id = driver_reservations.claim_first(candidates, token)
+    if driver_id is not None:
+        try:
+            transition_ride(ride_id, "offer", driver_id)
+        except TransitionError:
+            driver_reservations.release(driver_id, token)
+            return None  # cancelled or re-offered in the meantime
+        offer_ride(ride_id, driver_id, token)
+        availability_writer.set_available(driver_id, False)
+        return driver_id
+
+    try:
+        transition_ride(ride_id, "expire", None)
+        print(f"Ride {ride_id} cancelled: no driver took it after {len(offered)} offers")
+    except TransitionError:
+        pass  # accepted, cancelled or re-offered in the meantime
+    close_offer(ride_id)
+    return None
+
+def recover_offers():
+    """Re-arm offer timeouts lost in a restart from the rides still pending with a driver;
+    overdue ones fire immediately and re-dispatch the ride. Returns how many were armed."""
+    offers = get_pending_offers()
+    for ride_id, driver_id, offered_at in offers:
+        _record_offer(ride_id, driver_id)
+        offer_timers.schedule(ride_id, offered_at + driver_reservations.ttl_ms / 1000,
+                              lambda ride_id=ride_id, driver_id=driver_id: _offer_expired(ride_id, driver_id))
+    return len(offers)
+
+def _offer_expired(ride_id, driver_id):
+    try:
+        transition_ride(ride_id, "decline", driver_id)
+    except TransitionError:
+        return  # accepted or cancelled in the meantime
+    print(f"Offer for ride {ride_id} to driver {driver_id} timed out")
+    release_driver(ride_id, driver_id)
+    redispatch_ride(ride_id)
@@ -0,0 +1,244 @@
+import argparse
+import json
+import math
+import os
+import numpy as np
+
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+WARD_BOUNDARIES_PATH = os.getenv("WARD_BOUNDARIES_PATH", os.path.join(base_dir, "datasets", "ward_boundaries.geojson"))
+WARD_CELL_DEG = float(os.getenv("WARD_CELL_DEG", "0.002"))  # ~220 m
+# Feature properties tried in order for the ward code
+WARD_PROPERTIES = ("ward", "ward_name", "WARD_NAME", "KGISWardName", "name", "ward_no", "WARD_NO")
+
+OUTSIDE = -1
+BOUNDARY = -2
+
+def _orient(ax, ay, bx, by, cx, cy):
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+def _rings(geometry):
+    if geometry["type"] == "Polygon":
+        return geometry["coordinates"]
+    if geometry["type"] == "MultiPolygon":
+        return [ring for polygon in geometry["coordinates"] for ring in polygon]
+    raise ValueError(f"Unsupported geometry type {geometry['type']}")
+
+def _edges(rings):
+    """(E, 4) array of x1, y1, x2, y2 (lng, lat) over every ring, holes included."""
+    parts = []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=float)[:, :2]
+        if len(ring) < 3:
+            continue
+        if not np.array_equal(ring[0], ring[-1]):
+            ring = np.vstack([ring, ring[:1]])
+        parts.append(np.hstack([ring[:-1], ring[1:]]))
+    return np.vstack(parts) if parts else np.empty((0, 4))
+
+def points_in_polygon(xs, ys, edges):
+    """Even-odd ray casting for arrays of points against one polygon's edges."""
+    xs, ys = np.asarray(xs, dtype=float)[:, None], np.asarray(ys, dtype=float)[:, None]
+    x1, y1, x2, y2 = (edges[:, i][None, :] for i in range(4))
+    straddles = (y1 > ys) != (y2 > ys)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cross_x = x1 + (ys - y1) * (x2 - x1) / (y2 - y1)
+    return (np.count_nonzero(straddles & (xs < cross_x), axis=1) % 2) == 1
+
+class WardIndex:
+    """Point -> ward lookups over ward boundary polygons.
+
+    The polygons' extent is cut into a cell_deg grid. A cell that no ward boundary passes
+    through lies wholly inside one ward (or outside all of them), so its answer is stored
+    directly. Cells a boundary crosses keep, per candidate ward, whether the cell centre is
+    inside and the few edges that touch the cell; a point there is inside a ward when the
+    segment from the centre to the point crosses an odd number of them (flipped from the
+    centre's status). Either way a lookup touches one cell and a handful of edges.
+    """
+
+    def __init__(self, wards, edges, cell_deg=WARD_CELL_DEG):
+        self.wards = list(wards)
+        self.cell_deg = cell_deg
+        all_edges = np.vstack(edges)
+        self.min_lng = float(min(all_edges[:, 0].min(), all_edges[:, 2].min()))
+        self.min_lat = float(min(all_edges[:, 1].min(), all_edges[:, 3].min()))
+        max_lng = float(max(all_edges[:, 0].max(), all_edges[:, 2].max()))
+        max_lat = float(max(all_edges[:, 1].max(), all_edges[:, 3].max()))
+        self.rows = int(math.floor((max_lat - self.min_lat) / cell_deg)) + 1
+        self.cols = int(math.floor((max_lng - self.min_lng) / cell_deg)) + 1
+
+        owner = np.full((self.rows, self.cols), OUTSIDE, dtype=np.int32)
+        partial = {}  # (row, col) -> [(ward index, centre inside, edges)]
+        for k, polygon in enumerate(edges):
+            touched = {}
+            polygon_edges = polygon.tolist()
+            for e, (x1, y1, x2, y2) in enumerate(polygon_edges):
+                r1, r2 = sorted((self._row(y1), self._row(y2)))
+                c1, c2 = sorted((self._col(x1), self._col(x2)))
+                for r in range(r1, r2 + 1):
+                    for c in range(c1, c2 + 1):
+                        touched.setdefault((r, c), []).append(e)
+
+            r1, r2 = self._row(polygon[:, [1, 3]].min()), self._row(polygon[:, [1, 3]].max())
+            c1, c2 = self._col(polygon[:, [0, 2]].min()), self._col(polygon[:, [0, 2]].max())
+            rr, cc = np.meshgrid(np.arange(r1, r2 + 1), np.arange(c1, c2 + 1), indexing="ij")
+            rr, cc = rr.ravel(), cc.ravel()
+            inside = points_in_polygon(self.min_lng + (cc + 0.5) * cell_deg, self.min_lat + (rr + 0.5) * cell_deg, polygon)
+            for r, c, centre_inside in zip(rr.tolist(), cc.tolist(), inside.tolist()):
+                cell_edges = touched.get((r, c))
+                if cell_edges is not None:
+                    partial.setdefault((r, c), []).append((k, centre_inside, [polygon_edges[e] for e in cell_edges]))
+                elif centre_inside and owner[r, c] == OUTSIDE:
+                    owner[r, c] = k
+
+        self._partial = {}
+        for cell, candidates in partial.items():
+            if owner[cell] == OUTSIDE:  # a cell wholly inside a ward needs no edge tests
+                owner[cell] = BOUNDARY
+                self._partial[cell] = candidates
+        self._owner = owner
+        self._owner_rows = owner.tolist()
+
+        # The same boundary cells flattened for ward_indices: cell -> candidate range,
+        # candidate -> ward, centre status and edge range
+        self._cell_slot = {cell: i for i, cell in enumerate(self._partial)}
+        candidates = [candidate for cell_candidates in self._partial.values() for candidate in cell_candidates]
+        self._cell_start = np.cumsum([0] + [len(c) for c in self._partial.values()])
+        self._candidate_ward = np.array([k for k, _, _ in candidates], dtype=np.int32)
+        self._candidate_inside = np.array([inside for _, inside, _ in candidates], dtype=bool)
+        self._edge_start = np.cumsum([0] + [len(e) for _, _, e in candidates])
+        self._cell_edges = np.array([edge for _, _, e in candidates for edge in e], dtype=float).reshape(-1, 4)
+
+    @classmethod
+    def from_geojson(cls, path, ward_property=None, cell_deg=WARD_CELL_DEG):
+        with open(path) as f:
+            collection = json.load(f)
+        wards, edges = [], []
+        for feature in collection["features"]:
+            properties = feature.get("properties") or {}
+            names = [ward_property] if ward_property else WARD_PROPERTIES
+            ward = next((properties[name] for name in names if properties.get(name) not in (None, "")), None)
+            if ward is None or feature.get("geometry") is None:
+                continue
+            polygon = _edges(_rings(feature["geometry"]))
+            if len(polygon):
+                wards.append(str(ward))
+                edges.append(polygon)
+        if not wards:
+            raise ValueError(f"No ward polygons found in {path}")
+        return cls(wards, edges, cell_deg)
+
+    def _row(self, lat):
+        return int(math.floor((lat - self.min_lat) / self.cell_deg))
+
+    def _col(self, lng):
+        return int(math.floor((lng - self.min_lng) / self.cell_deg))
+
+    def __len__(self):
+        return len(self.wards)
+
+    def ward_index_of(self, lat, lng):
+        """Index into self.wards of the ward containing (lat, lng), or -1."""
+        r = int((lat - self.min_lat) // self.cell_deg)
+        c = int((lng - self.min_lng) // self.cell_deg)
+        if r < 0 or c < 0 or r >= self.rows or c >= self.cols:
+            return OUTSIDE
+        owner = self._owner_rows[r][c]
+        if owner != BOUNDARY:
+            return owner
+        cx = self.min_lng + (c + 0.5) * self.cell_deg
+        cy = self.min_lat + (r + 0.5) * self.cell_deg
+        for k, inside, cell_edges in self._partial[(r, c)]:
+            for x1, y1, x2, y2 in cell_edges:
+                # Half-open on the centre->point line so a shared vertex counts once
+                if (_orient(cx, cy, lng, lat, x1, y1) > 0) != (_orient(cx, cy, lng, lat, x2, y2) > 0) \
+                        and (_orient(x1, y1, x2, y2, cx, cy) > 0) != (_orient(x1, y1, x2, y2, lng, lat) > 0):
+                    inside = not inside
+            if inside:
+                return k
+        return OUTSIDE
+
+    def ward_of(self, lat, lng):
+        """Ward code containing (lat, lng), or None outside every ward."""
+        k = self.ward_index_of(float(lat), float(lng))
+        return self.wards[k] if k >= 0 else None
+
+    def ward_indices(self, lats, lngs):
+        """Vectorized ward_index_of over arrays of points."""
+        lats, lngs = np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float)
+        rows = np.floor((lats - self.min_lat) / self.cell_deg).astype(np.int64)
+        cols = np.floor((lngs - self.min_lng) / self.cell_deg).astype(np.int64)
+        valid = (rows >= 0) & (cols >= 0) & (rows < self.rows) & (cols < self.cols)
+        result = np.full(len(lats), OUTSIDE, dtype=np.int32)
+        result[valid] = self._owner[rows[valid], cols[valid]]
+        points = np.flatnonzero(result == BOUNDARY)
+        if len(points) == 0:
+            return result
+
+        # Expand boundary points to (point, candidate) and then (point, candidate, edge) rows
+        slots = np.array([self._cell_slot[cell] for cell in zip(rows[points].tolist(), cols[points].tolist())])
+        n_candidates = self._cell_start[slots + 1] - self._cell_start[slots]
+        pair_point = np.repeat(np.arange(len(points)), n_candidates)
+        pair_candidate = np.repeat(self._cell_start[slots] - np.cumsum(n_candidates) + n_candidates, n_candidates) \
+            + np.arange(len(pair_point))
+        n_edges = self._edge_start[pair_candidate + 1] - self._edge_start[pair_candidate]
+        edge_pair = np.repeat(np.arange(len(pair_point)), n_edges)
+        edge = np.repeat(self._edge_start[pair_candidate] - np.cumsum(n_edges) + n_edges, n_edges) + np.arange(len(edge_pair))
+
+        px, py = lngs[points][pair_point][edge_pair], lats[points][pair_point][edge_pair]
+        cx = self.min_lng + (cols[points][pair_point][edge_pair] + 0.5) * self.cell_deg
+        cy = self.min_lat + (rows[points][pair_point][edge_pair] + 0.5) * self.cell_deg
+        x1, y1, x2, y2 = self._cell_edges[edge].T
+        crossed = ((_orient(cx, cy, px, py, x1, y1) > 0) != (_orient(cx, cy, px, py, x2, y2) > 0)) \
+            & ((_orient(x1, y1, x2, y2, cx, cy) > 0) != (_orient(x1, y1, x2, y2, px, py) > 0))
+        parity = np.add.reduceat(crossed.astype(np.int32), np.cumsum(n_edges) - n_edges) % 2 == 1
+        inside = self._candidate_inside[pair_candidate] ^ parity
+
+        # First inside candidate per point, in ward order as in ward_index_of
+        hit_points, first = np.unique(pair_point[inside], return_index=True)
+        result[points] = OUTSIDE
+        result[points[hit_points]] = self._candidate_ward[pair_candidate[inside][first]]
+        return result
+
+    def wards_of(self, lats, lngs):
+        """Ward code (or None) for each point."""
+        return [self.wards[k] if k >= 0 else None for k in self.ward_indices(lats, lngs).tolist()]
+
+    def stats(self):
+        return {
+            "wards": len(self.wards),
+            "grid": [self.rows, self.cols],
+            "cell_deg": self.cell_deg,
+            "boundary_cells": len(self._partial),
+            "max_edges_per_cell": max((sum(len(e) for _, _, e in c) for c in self._partial.values()), default=0),
+        }
+
+_ward_index = None
+_ward_index_missing = False
+
+def get_ward_index(path=WARD_BOUNDARIES_PATH):
+    """The ward index, built once; None when no boundary file is present."""
+    global _ward_index, _ward_index_missing
+    if _ward_index is None and not _ward_index_missing:
+        if os.path.exists(path):
+            _ward_index = WardIndex.from_geojson(path)
+        else:
+            print(f"No ward boundaries at {path}; coordinates cannot be mapped to wards")
+            _ward_index_missing = True
+    return _ward_index
+
+def ward_of(lat, lng):
+    """Ward code for a point, or None when it is outside every ward or no boundaries are loaded."""
+    index = get_ward_index()
+    if index is None or lat is None or lng is None:
+        return None
+    return index.ward_of(lat, lng)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up the ward containing a point")
+    parser.add_argument("coords", nargs=2, type=float, metavar=("LAT", "LNG"))
+    parser.add_argument("--boundaries", default=WARD_BOUNDARIES_PATH)
+    parser.add_argument("--ward-property")
+    args = parser.parse_args()
+    index = WardIndex.from_geojson(args.boundaries, args.ward_property)
+    print(index.stats())
+    print(index.ward_of(*args.coords))
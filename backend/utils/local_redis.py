@@ -0,0 +1,820 @@
+import collections
+import fnmatch
+import functools
+import heapq
+import itertools
+import math
+import threading
+import time
+from datetime import datetime
+from .sorted_set import SortedSet
+
+try:
+    from redis.exceptions import ResponseError, WatchError
+except ImportError:
+    class ResponseError(Exception):
+        pass
+
+    class WatchError(Exception):
+        pass
+
+EXPIRY_INTERVAL = 0.1  # Seconds between active expiry sweeps
+
+GEO_LAT_LIMIT = 85.05112878
+GEO_STEP = 26  # Bits per coordinate in a geohash score, as in Redis
+EARTH_RADIUS_M = 6372797.560856
+GEO_UNITS = {"m": 1.0, "km": 1000.0, "mi": 1609.34, "ft": 0.3048}
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+def _score_bound(bound):
+    """Parse a ZRANGEBYSCORE bound ('-inf', '(5', 3.2) into (score, exclusive)."""
+    if isinstance(bound, (int, float)):
+        return float(bound), False
+    bound = _encode(bound)
+    if bound.startswith("("):
+        return float(bound[1:]), True
+    return float(bound), False
+
+def _interleave(lon_bits, lat_bits, step):
+    code = 0
+    for i in range(step - 1, -1, -1):
+        code = (code << 2) | (((lon_bits >> i) & 1) << 1) | ((lat_bits >> i) & 1)
+    return code
+
+def _deinterleave(code, step):
+    lon_bits = lat_bits = 0
+    for i in range(step - 1, -1, -1):
+        pair = (code >> (2 * i)) & 3
+        lon_bits = (lon_bits << 1) | (pair >> 1)
+        lat_bits = (lat_bits << 1) | (pair & 1)
+    return lon_bits, lat_bits
+
+def geohash_score(lon, lat):
+    """52-bit interleaved geohash used as the sorted-set score of a GEO member."""
+    cells = 1 << GEO_STEP
+    lon_bits = min(int((lon + 180) / 360 * cells), cells - 1)
+    lat_bits = min(int((lat + GEO_LAT_LIMIT) / (2 * GEO_LAT_LIMIT) * cells), cells - 1)
+    return float(_interleave(lon_bits, lat_bits, GEO_STEP))
+
+def geohash_decode(score):
+    """Centre (lon, lat) of the cell a geohash score points to."""
+    cells = 1 << GEO_STEP
+    lon_bits, lat_bits = _deinterleave(int(score), GEO_STEP)
+    return (
+        (lon_bits + 0.5) / cells * 360 - 180,
+        (lat_bits + 0.5) / cells * 2 * GEO_LAT_LIMIT - GEO_LAT_LIMIT,
+    )
+
+def haversine_m(lon1, lat1, lon2, lat2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+def _command(method):
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+class LocalRedis:
+    """In-process substitute for a redis-py client created with decode_responses=True.
+
+    Covers the strings/counters, hashes, sets, lists, sorted sets, GEO, HyperLogLog, TTL
+    and pipeline (including WATCH/MULTI) commands used in this codebase, with the same
+    argument and return conventions. Every command runs under one lock, so each is
+    atomic and a pipeline executes as a single atomic batch. Keys with a TTL are removed
+    lazily on access and actively by a background sweep.
+    """
+
+    def __init__(self):
+        self._data = {}  # key -> (type, value)
+        self._expires = {}  # key -> epoch deadline
+        self._expiry_heap = []  # (deadline, key), may hold stale entries; compacted as they pile up
+        self._versions = {}  # watched key -> last write stamp, for WATCH
+        self._watchers = collections.Counter()  # key -> pipelines watching it
+        self._stamps = itertools.count(1)
+        self._lock = threading.RLock()
+        self._sweeper = None
+
+    # Keyspace
+
+    def _alive(self, key):
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= time.time():
+            self._delete(key)
+            return False
+        return key in self._data
+
+    def _get(self, key, kind):
+        key = _encode(key)
+        if not self._alive(key):
+            return None
+        entry_kind, value = self._data[key]
+        if entry_kind != kind:
+            raise ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _get_or_create(self, key, kind, factory):
+        value = self._get(key, kind)
+        if value is None:
+            value = factory()
+            self._data[_encode(key)] = (kind, value)
+        self._touch(key)
+        return value
+
+    def _touch(self, key):
+        # Only watched keys carry a version, so the table is bounded by open WATCHes
+        key = _encode(key)
+        if key in self._versions:
+            self._versions[key] = next(self._stamps)
+
+    def _watch(self, key):
+        self._watchers[key] += 1
+        return self._versions.setdefault(key, next(self._stamps))
+
+    def _unwatch(self, key):
+        self._watchers[key] -= 1
+        if self._watchers[key] <= 0:
+            del self._watchers[key]
+            self._versions.pop(key, None)
+
+    def _delete(self, key):
+        self._expires.pop(key, None)
+        if self._data.pop(key, None) is None:
+            return False
+        self._touch(key)
+        return True
+
+    def _drop_if_empty(self, key, value):
+        if not value:
+            self._delete(_encode(key))
+
+    @_command
+    def ping(self):
+        return True
+
+    @_command
+    def delete(self, *names):
+        return sum(self._alive(_encode(name)) and self._delete(_encode(name)) for name in names)
+
+    @_command
+    def exists(self, *names):
+        return sum(self._alive(_encode(name)) for name in names)
+
+    @_command
+    def type(self, name):
+        name = _encode(name)
+        return self._data[name][0] if self._alive(name) else "none"
+
+    @_command
+    def keys(self, pattern="*"):
+        return [key for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    def scan_iter(self, match=None, count=None, _type=None):
+        for key in self.keys(match or "*"):
+            yield key
+
+    @_command
+    def dbsize(self):
+        return len(self.keys())
+
+    @_command
+    def flushdb(self):
+        for key in list(self._data):
+            self._delete(key)
+        return True
+
+    flushall = flushdb
+
+    # TTL
+
+    @_command
+    def expire(self, name, time_seconds):
+        return self._expire_at(name, time.time() + float(time_seconds))
+
+    @_command
+    def pexpire(self, name, time_ms):
+        return self._expire_at(name, time.time() + float(time_ms) / 1000)
+
+    @_command
+    def expireat(self, name, when):
+        """`when` in epoch seconds or a datetime, as in redis-py."""
+        return self._expire_at(name, when.timestamp() if isinstance(when, datetime) else float(when))
+
+    @_command
+    def pexpireat(self, name, when):
+        """`when` in epoch milliseconds or a datetime, as in redis-py."""
+        return self._expire_at(name, when.timestamp() if isinstance(when, datetime) else float(when) / 1000)
+
+    def _expire_at(self, name, deadline):
+        """Set an absolute deadline in epoch seconds (all expire variants funnel here)."""
+        name = _encode(name)
+        if not self._alive(name):
+            return False
+        if deadline <= time.time():
+            return self._delete(name)
+        self._expires[name] = deadline
+        heapq.heappush(self._expiry_heap, (deadline, name))
+        # Re-expired, persisted and deleted keys leave stale entries; rebuild once they dominate
+        if len(self._expiry_heap) > 2 * len(self._expires) + 64:
+            self._expiry_heap = [(when, key) for key, when in self._expires.items()]
+            heapq.heapify(self._expiry_heap)
+        self._start_sweeper()
+        return True
+
+    @_command
+    def persist(self, name):
+        name = _encode(name)
+        return self._alive(name) and self._expires.pop(name, None) is not None
+
+    @_command
+    def pttl(self, name):
+        name = _encode(name)
+        if not self._alive(name):
+            return -2
+        deadline = self._expires.get(name)
+        return -1 if deadline is None else max(int((deadline - time.time()) * 1000), 0)
+
+    @_command
+    def ttl(self, name):
+        remaining = self.pttl(name)
+        return remaining if remaining < 0 else int(math.ceil(remaining / 1000))
+
+    def _start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep, name="local-redis-expiry", daemon=True)
+            self._sweeper.start()
+
+    def _sweep(self):
+        while True:
+            time.sleep(EXPIRY_INTERVAL)
+            with self._lock:
+                now = time.time()
+                while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                    deadline, key = heapq.heappop(self._expiry_heap)
+                    if self._expires.get(key) == deadline:
+                        self._delete(key)
+
+    # Strings and counters
+
+    @_command
+    def get(self, name):
+        return self._get(name, "string")
+
+    @_command
+    def mget(self, keys, *args):
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        return [self._get(key, "string") for key in keys + list(args)]
+
+    @_command
+    def set(self, name, value, ex=None, px=None, nx=False, xx=False, keepttl=False, get=False):
+        name = _encode(name)
+        exists = self._alive(name)
+        old = self._get(name, "string") if get and exists else None
+        if (nx and exists) or (xx and not exists):
+            return old if get else None
+        ttl = self._expires.get(name) if keepttl else None
+        self._delete(name)
+        self._data[name] = ("string", _encode(value))
+        self._touch(name)
+        if ex is not None:
+            self.expire(name, ex)
+        elif px is not None:
+            self.pexpire(name, px)
+        elif ttl is not None:
+            self._expire_at(name, ttl)
+        return old if get else True
+
+    @_command
+    def setnx(self, name, value):
+        return bool(self.set(name, value, nx=True))
+
+    @_command
+    def setex(self, name, time_seconds, value):
+        return self.set(name, value, ex=time_seconds)
+
+    @_command
+    def incrby(self, name, amount=1):
+        current = self._get(name, "string")
+        try:
+            value = int(current or 0) + int(amount)
+        except ValueError:
+            raise ResponseError("value is not an integer or out of range")
+        self._set_keep_ttl(name, str(value))
+        return value
+
+    incr = incrby
+
+    @_command
+    def decrby(self, name, amount=1):
+        return self.incrby(name, -amount)
+
+    decr = decrby
+
+    @_command
+    def incrbyfloat(self, name, amount=1.0):
+        value = float(self._get(name, "string") or 0) + float(amount)
+        self._set_keep_ttl(name, repr(value))
+        return value
+
+    def _set_keep_ttl(self, name, value):
+        name = _encode(name)
+        self._data[name] = ("string", value)
+        self._touch(name)
+
+    # Hashes
+
+    @_command
+    def hset(self, name, key=None, value=None, mapping=None, items=None):
+        fields = dict(mapping or {})
+        if key is not None:
+            fields[key] = value
+        for i in range(0, len(items or ()), 2):
+            fields[items[i]] = items[i + 1]
+        hash_ = self._get_or_create(name, "hash", dict)
+        added = 0
+        for field, field_value in fields.items():
+            field = _encode(field)
+            added += field not in hash_
+            hash_[field] = _encode(field_value)
+        return added
+
+    @_command
+    def hsetnx(self, name, key, value):
+        hash_ = self._get_or_create(name, "hash", dict)
+        if _encode(key) in hash_:
+            return False
+        hash_[_encode(key)] = _encode(value)
+        return True
+
+    @_command
+    def hget(self, name, key):
+        return (self._get(name, "hash") or {}).get(_encode(key))
+
+    @_command
+    def hmget(self, name, keys, *args):
+        keys = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        hash_ = self._get(name, "hash") or {}
+        return [hash_.get(_encode(key)) for key in keys + list(args)]
+
+    @_command
+    def hgetall(self, name):
+        return dict(self._get(name, "hash") or {})
+
+    @_command
+    def hkeys(self, name):
+        return list(self._get(name, "hash") or {})
+
+    @_command
+    def hvals(self, name):
+        return list((self._get(name, "hash") or {}).values())
+
+    @_command
+    def hlen(self, name):
+        return len(self._get(name, "hash") or {})
+
+    @_command
+    def hexists(self, name, key):
+        return _encode(key) in (self._get(name, "hash") or {})
+
+    @_command
+    def hdel(self, name, *keys):
+        hash_ = self._get(name, "hash")
+        if not hash_:
+            return 0
+        removed = sum(hash_.pop(_encode(key), None) is not None for key in keys)
+        self._touch(name)
+        self._drop_if_empty(name, hash_)
+        return removed
+
+    @_command
+    def hincrby(self, name, key, amount=1):
+        hash_ = self._get_or_create(name, "hash", dict)
+        value = int(hash_.get(_encode(key), 0)) + int(amount)
+        hash_[_encode(key)] = str(value)
+        return value
+
+    @_command
+    def hincrbyfloat(self, name, key, amount=1.0):
+        hash_ = self._get_or_create(name, "hash", dict)
+        value = float(hash_.get(_encode(key), 0)) + float(amount)
+        hash_[_encode(key)] = repr(value)
+        return value
+
+    # Sets
+
+    @_command
+    def sadd(self, name, *values):
+        members = self._get_or_create(name, "set", set)
+        size = len(members)
+        members.update(_encode(value) for value in values)
+        return len(members) - size
+
+    @_command
+    def srem(self, name, *values):
+        members = self._get(name, "set")
+        if not members:
+            return 0
+        size = len(members)
+        members.difference_update(_encode(value) for value in values)
+        self._touch(name)
+        self._drop_if_empty(name, members)
+        return size - len(members)
+
+    @_command
+    def smembers(self, name):
+        return set(self._get(name, "set") or ())
+
+    @_command
+    def sismember(self, name, value):
+        return _encode(value) in (self._get(name, "set") or ())
+
+    @_command
+    def scard(self, name):
+        return len(self._get(name, "set") or ())
+
+    # Lists
+
+    @_command
+    def lpush(self, name, *values):
+        items = self._get_or_create(name, "list", collections.deque)
+        items.extendleft(_encode(value) for value in values)
+        return len(items)
+
+    @_command
+    def rpush(self, name, *values):
+        items = self._get_or_create(name, "list", collections.deque)
+        items.extend(_encode(value) for value in values)
+        return len(items)
+
+    @_command
+    def lpop(self, name):
+        items = self._get(name, "list")
+        if not items:
+            return None
+        value = items.popleft()
+        self._touch(name)
+        self._drop_if_empty(name, items)
+        return value
+
+    @_command
+    def rpop(self, name):
+        items = self._get(name, "list")
+        if not items:
+            return None
+        value = items.pop()
+        self._touch(name)
+        self._drop_if_empty(name, items)
+        return value
+
+    @_command
+    def llen(self, name):
+        return len(self._get(name, "list") or ())
+
+    @_command
+    def lrange(self, name, start, end):
+        items = list(self._get(name, "list") or ())
+        start, stop = self._index_range(len(items), start, end)
+        return items[start:stop]
+
+    # Sorted sets
+
+    @staticmethod
+    def _index_range(length, start, end):
+        """Redis inclusive (start, end) indexes, negatives from the end, as a Python slice."""
+        start = max(start + length if start < 0 else start, 0)
+        end = end + length if end < 0 else end
+        return start, min(end + 1, length)
+
+    @_command
+    def zadd(self, name, mapping, nx=False, xx=False, ch=False, incr=False, gt=False, lt=False):
+        zset = self._get_or_create(name, "zset", SortedSet)
+        added = changed = 0
+        result = None
+        for member, score in mapping.items():
+            member = _encode(member)
+            old = zset.score(member)
+            if (nx and old is not None) or (xx and old is None):
+                continue
+            score = float(score) + ((old or 0.0) if incr else 0.0)
+            if old is not None and ((gt and score <= old) or (lt and score >= old)):
+                continue
+            zset.add(member, score)
+            result = score
+            added += old is None
+            changed += old is None or old != score
+        self._drop_if_empty(name, zset)
+        if incr:
+            return result
+        return changed if ch else added
+
+    @_command
+    def zincrby(self, name, amount, value):
+        return self._get_or_create(name, "zset", SortedSet).increment(_encode(value), float(amount))
+
+    @_command
+    def zrem(self, name, *values):
+        zset = self._get(name, "zset")
+        if zset is None:
+            return 0
+        removed = sum(zset.remove(_encode(value)) for value in values)
+        self._touch(name)
+        self._drop_if_empty(name, zset)
+        return removed
+
+    @_command
+    def zscore(self, name, value):
+        zset = self._get(name, "zset")
+        return None if zset is None else zset.score(_encode(value))
+
+    @_command
+    def zmscore(self, name, members):
+        zset = self._get(name, "zset")
+        return [None if zset is None else zset.score(_encode(member)) for member in members]
+
+    @_command
+    def zcard(self, name):
+        return len(self._get(name, "zset") or ())
+
+    @_command
+    def zrank(self, name, value):
+        zset = self._get(name, "zset")
+        return None if zset is None else zset.rank(_encode(value))
+
+    @_command
+    def zrevrank(self, name, value):
+        zset = self._get(name, "zset")
+        return None if zset is None else zset.rank(_encode(value), reverse=True)
+
+    @_command
+    def zcount(self, name, min, max):
+        return len(self._range_by_score(name, min, max))
+
+    @_command
+    def zrange(self, name, start, end, desc=False, withscores=False, score_cast_func=float):
+        zset = self._get(name, "zset")
+        if zset is None:
+            return []
+        start, stop = self._index_range(len(zset), start, end)
+        items = zset.slice(start, stop, reverse=desc)
+        return [(member, score_cast_func(score)) for member, score in items] if withscores else [m for m, _ in items]
+
+    @_command
+    def zrevrange(self, name, start, end, withscores=False, score_cast_func=float):
+        return self.zrange(name, start, end, desc=True, withscores=withscores, score_cast_func=score_cast_func)
+
+    def _range_by_score(self, name, min, max, reverse=False, start=None, num=None):
+        zset = self._get(name, "zset")
+        if zset is None:
+            return []
+        (low, low_exclusive), (high, high_exclusive) = _score_bound(min), _score_bound(max)
+        return zset.range_by_score(low, high, reverse=reverse, offset=start or 0, count=num,
+                                   min_exclusive=low_exclusive, max_exclusive=high_exclusive)
+
+    @_command
+    def zrangebyscore(self, name, min, max, start=None, num=None, withscores=False, score_cast_func=float):
+        items = self._range_by_score(name, min, max, start=start, num=num)
+        return [(member, score_cast_func(score)) for member, score in items] if withscores else [m for m, _ in items]
+
+    @_command
+    def zrevrangebyscore(self, name, max, min, start=None, num=None, withscores=False, score_cast_func=float):
+        items = self._range_by_score(name, min, max, reverse=True, start=start, num=num)
+        return [(member, score_cast_func(score)) for member, score in items] if withscores else [m for m, _ in items]
+
+    @_command
+    def zremrangebyscore(self, name, min, max):
+        members = [member for member, _ in self._range_by_score(name, min, max)]
+        return self.zrem(name, *members) if members else 0
+
+    @_command
+    def zpopmin(self, name, count=1):
+        zset = self._get(name, "zset")
+        if zset is None:
+            return []
+        items = [zset.pop_min() for _ in range(min(count, len(zset)))]
+        self._touch(name)
+        self._drop_if_empty(name, zset)
+        return items
+
+    # GEO, stored as sorted sets scored by geohash like Redis
+
+    @_command
+    def geoadd(self, name, values, nx=False, xx=False, ch=False):
+        if len(values) % 3:
+            raise ResponseError("GEOADD requires longitude, latitude, member triples")
+        mapping = {}
+        for i in range(0, len(values), 3):
+            lon, lat = float(values[i]), float(values[i + 1])
+            if not (-180 <= lon <= 180 and -GEO_LAT_LIMIT <= lat <= GEO_LAT_LIMIT):
+                raise ResponseError(f"invalid longitude,latitude pair {lon},{lat}")
+            mapping[values[i + 2]] = geohash_score(lon, lat)
+        return self.zadd(name, mapping, nx=nx, xx=xx, ch=ch)
+
+    @_command
+    def geopos(self, name, *values):
+        zset = self._get(name, "zset")
+        positions = []
+        for value in values:
+            score = None if zset is None else zset.score(_encode(value))
+            positions.append(None if score is None else geohash_decode(score))
+        return positions
+
+    @_command
+    def geodist(self, name, place1, place2, unit=None):
+        first, second = self.geopos(name, place1, place2)
+        if first is None or second is None:
+            return None
+        return round(haversine_m(*first, *second) / GEO_UNITS[unit or "m"], 4)
+
+    @_command
+    def geosearch(self, name, member=None, longitude=None, latitude=None, unit="m", radius=None, width=None,
+                  height=None, sort=None, count=None, any=False, withcoord=False, withdist=False, withhash=False):
+        if member is not None:
+            center = self.geopos(name, member)[0]
+            if center is None:
+                raise ResponseError("could not decode requested zset member")
+            longitude, latitude = center
+        scale = GEO_UNITS[unit or "m"]
+        if radius is not None:
+            reach = float(radius) * scale
+            inside = lambda lon, lat, dist: dist <= reach
+        else:
+            half_w, half_h = float(width) * scale / 2, float(height) * scale / 2
+            reach = math.hypot(half_w, half_h)
+            inside = lambda lon, lat, dist: (haversine_m(longitude, lat, longitude, latitude) <= half_h and
+                                             haversine_m(lon, latitude, longitude, latitude) <= half_w)
+
+        zset = self._get(name, "zset")
+        matches = []
+        for low, high in ([] if zset is None else self._geo_ranges(longitude, latitude, reach)):
+            for found, score in zset.range_by_score(low, high, max_exclusive=True):
+                lon, lat = geohash_decode(score)
+                dist = haversine_m(longitude, latitude, lon, lat)
+                if inside(lon, lat, dist):
+                    matches.append((found, dist, score, (lon, lat)))
+        if sort or count:
+            matches.sort(key=lambda match: match[1], reverse=(sort == "DESC"))
+        if count:
+            matches = matches[:count]
+
+        if not (withcoord or withdist or withhash):
+            return [match[0] for match in matches]
+        results = []
+        for found, dist, score, coord in matches:
+            row = [found]
+            if withdist:
+                row.append(round(dist / scale, 4))
+            if withhash:
+                row.append(int(score))
+            if withcoord:
+                row.append(coord)
+            results.append(row)
+        return results
+
+    @_command
+    def georadius(self, name, longitude, latitude, radius, unit=None, withdist=False, withcoord=False,
+                  withhash=False, count=None, sort=None, store=None, store_dist=None, any=False):
+        return self.geosearch(name, longitude=longitude, latitude=latitude, radius=radius, unit=unit or "m",
+                              sort=sort, count=count, withcoord=withcoord, withdist=withdist, withhash=withhash)
+
+    @_command
+    def georadiusbymember(self, name, member, radius, unit=None, withdist=False, withcoord=False,
+                          withhash=False, count=None, sort=None, store=None, store_dist=None, any=False):
+        return self.geosearch(name, member=member, radius=radius, unit=unit or "m",
+                              sort=sort, count=count, withcoord=withcoord, withdist=withdist, withhash=withhash)
+
+    @staticmethod
+    def _geo_ranges(lon, lat, reach):
+        """Score ranges of the 3x3 geohash cells, at the finest step wider than reach, around a point."""
+        step = GEO_STEP
+        lat_cell = 2 * GEO_LAT_LIMIT / (1 << step) * 111320
+        lon_cell = 360 / (1 << step) * 111320 * max(math.cos(math.radians(min(abs(lat) + reach / 111320, 89))), 1e-6)
+        while step > 1 and (lat_cell < reach or lon_cell < reach):
+            step -= 1
+            lat_cell *= 2
+            lon_cell *= 2
+        shift = GEO_STEP - step
+        cells = 1 << step
+        lon_bits = min(int((lon + 180) / 360 * cells), cells - 1)
+        lat_bits = min(int((lat + GEO_LAT_LIMIT) / (2 * GEO_LAT_LIMIT) * cells), cells - 1)
+        ranges = set()
+        for d_lon in (-1, 0, 1):
+            for d_lat in (-1, 0, 1):
+                cell_lon, cell_lat = (lon_bits + d_lon) % cells, lat_bits + d_lat
+                if not 0 <= cell_lat < cells:
+                    continue
+                low = _interleave(cell_lon, cell_lat, step) << (2 * shift)
+                ranges.add((float(low), float(low + (1 << (2 * shift)))))
+        return sorted(ranges)
+
+    # HyperLogLog, kept as exact sets
+
+    @_command
+    def pfadd(self, name, *values):
+        members = self._get_or_create(name, "hll", set)
+        size = len(members)
+        members.update(_encode(value) for value in values)
+        return int(len(members) != size or size == 0)
+
+    @_command
+    def pfcount(self, *sources):
+        union = set()
+        for source in sources:
+            union |= self._get(source, "hll") or set()
+        return len(union)
+
+    @_command
+    def pfmerge(self, dest, *sources):
+        union = set()
+        for source in (dest,) + sources:
+            union |= self._get(source, "hll") or set()
+        self._get_or_create(dest, "hll", set).update(union)
+        return True
+
+    # Pipelines
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return LocalPipeline(self)
+
+class LocalPipeline:
+    """Buffers commands and runs them as one atomic batch, like a redis-py pipeline.
+
+    watch() switches to immediate mode until multi(); execute() raises WatchError if a
+    watched key was written in the meantime.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+        self.watched = {}
+        self.immediate = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.reset()
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        if self.immediate:
+            return method
+
+        def queue_command(*args, **kwargs):
+            self.commands.append((method, args, kwargs))
+            return self
+        return queue_command
+
+    def watch(self, *names):
+        with self.client._lock:
+            for name in names:
+                name = _encode(name)
+                if name not in self.watched:
+                    self.watched[name] = self.client._watch(name)
+        self.immediate = True
+        return True
+
+    def unwatch(self):
+        with self.client._lock:
+            for name in self.watched:
+                self.client._unwatch(name)
+        self.watched = {}
+        return True
+
+    def multi(self):
+        self.immediate = False
+
+    def execute(self, raise_on_error=True):
+        with self.client._lock:
+            try:
+                for name, version in self.watched.items():
+                    # Expiring a watched key counts as a write, as in Redis
+                    self.client._alive(name)
+                    if self.client._versions.get(name) != version:
+                        raise WatchError(f"Watched variable changed: {name}")
+                results = []
+                for method, args, kwargs in self.commands:
+                    try:
+                        results.append(method(*args, **kwargs))
+                    except ResponseError as e:
+                        if raise_on_error:
+                            raise
+                        results.append(e)
+                return results
+            finally:
+                self.reset()
+
+    def reset(self):
+        self.unwatch()
+        self.commands = []
+        self.immediate = False
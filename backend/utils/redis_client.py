@@ -0,0 +1,37 @@
+import json
+import os
+import threading
+
+REDIS_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database", "redis_config.json")
+
+_local_client = None
+_local_lock = threading.Lock()
+
+def load_redis_config():
+    """database/redis_config.json, overridden by REDIS_BACKEND/REDIS_HOST/REDIS_PORT/REDIS_DB"""
+    config = {"backend": "redis", "host": "localhost", "port": 6379, "db": 0}
+    try:
+        with open(REDIS_CONFIG_PATH) as f:
+            config.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    for key in ("backend", "host", "port", "db"):
+        value = os.getenv(f"REDIS_{key.upper()}")
+        if value:
+            config[key] = value
+    return config
+
+def get_redis_client():
+    """Redis client for the configured backend: a redis-py client, or with backend 'memory'
+    one LocalRedis shared by the whole process"""
+    global _local_client
+    config = load_redis_config()
+    if config["backend"] == "memory":
+        if _local_client is None:
+            with _local_lock:
+                if _local_client is None:
+                    from .local_redis import LocalRedis
+                    _local_client = LocalRedis()
+        return _local_client
+    import redis
+    return redis.StrictRedis(host=config["host"], port=int(config["port"]), db=int(config["db"]), decode_responses=True)
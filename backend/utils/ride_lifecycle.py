@@ -0,0 +1,135 @@
+from backend.utils.db_utils import get_db_connection
+from data_processing.kafka_producer import emit_event
+
+# action -> (statuses it may start from, resulting status)
+TRANSITIONS = {
+    "accept": (("pending",), "accepted"),
+    "start": (("accepted",), "in_progress"),
+    "complete": (("in_progress",), "completed"),
+    "cancel": (("pending", "accepted"), "cancelled"),
+    "decline": (("pending",), "pending"),  # the offered driver passes; the ride is unassigned
+    "offer": (("pending",), "pending"),  # dispatch hands an unassigned ride to the next driver
+    "expire": (("pending",), "cancelled"),  # no driver took the ride
+}
+# Actions only dispatch takes; they are not exposed to customers or drivers
+SYSTEM_ACTIONS = ("offer", "expire")
+# Statuses during which the ride's driver is busy
+ACTIVE_STATUSES = ("accepted", "in_progress")
+
+class TransitionError(Exception):
+    """A transition that cannot be applied; `reason` is 'not_found', 'invalid', 'conflict',
+    'forbidden' or 'driver_busy', and `ride` is the row as last read (if any)."""
+
+    def __init__(self, reason, message, ride=None):
+        super().__init__(message)
+        self.reason = reason
+        self.ride = ride
+
+def get_ride_state(ride_id, get_connection=get_db_connection):
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT ride_id, customer_id, driver_id, status, version FROM rides WHERE ride_id = %s",
+            (ride_id,)
+        )
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+def transition_ride(ride_id, action, actor_id, expected_version=None, get_connection=get_db_connection):
+    """Move a ride through its lifecycle with a single compare-and-set UPDATE.
+
+    The row is read without locks, the transition is validated, and the UPDATE only matches
+    if status and version are still what was read (or `expected_version`, when the caller
+    passes the version it last saw). Losing a race therefore affects zero rows instead of
+    waiting on a lock. The driver's availability is flipped in the same transaction, also
+    conditionally, so one driver can never hold two active rides.
+
+    Returns the updated ride with 'previous_status'; raises TransitionError otherwise.
+    """
+    if action not in TRANSITIONS:
+        raise TransitionError("invalid", f"Unknown action '{action}'")
+    sources, target = TRANSITIONS[action]
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT ride_id, customer_id, driver_id, status, version FROM rides WHERE ride_id = %s",
+            (ride_id,)
+        )
+        ride = cursor.fetchone()
+        if not ride:
+            raise TransitionError("not_found", "Ride not found")
+        if expected_version is not None and ride["version"] != expected_version:
+            raise TransitionError("conflict", f"Ride is at version {ride['version']}, not {expected_version}", ride)
+        if ride["status"] not in sources:
+            raise TransitionError("invalid", f"Cannot {action} a ride that is {ride['status']}", ride)
+
+        driver_id = ride["driver_id"]
+        if action == "accept":
+            if driver_id is not None and driver_id != actor_id:
+                raise TransitionError("forbidden", "Ride is assigned to another driver", ride)
+            driver_id = actor_id
+        elif action == "offer":
+            if driver_id is not None:
+                raise TransitionError("conflict", "Ride is already offered to a driver", ride)
+            driver_id = actor_id
+        elif action in ("start", "complete", "decline") and driver_id != actor_id:
+            raise TransitionError("forbidden", "Only the assigned driver can do this", ride)
+        elif action == "cancel" and actor_id not in (ride["customer_id"], driver_id):
+            raise TransitionError("forbidden", "Only the customer or driver can cancel", ride)
+
+        # completed_at is written once, here; the daily rollups use it as their watermark
+        completed_at = ", completed_at = NOW()" if target == "completed" else ""
+        cursor.execute(
+            f"UPDATE rides SET status = %s, driver_id = %s, version = version + 1{completed_at} "
+            "WHERE ride_id = %s AND status = %s AND version = %s",
+            (target, None if action == "decline" else driver_id, ride_id, ride["status"], ride["version"])
+        )
+        if cursor.rowcount != 1:
+            conn.rollback()
+            raise TransitionError("conflict", "Ride was changed by another request", get_ride_state(ride_id, get_connection))
+
+        driver_available = None
+        if action == "accept" and ride["driver_id"] == driver_id:
+            # Dispatched rides already hold the driver through a reservation
+            cursor.execute("UPDATE driver SET is_available = FALSE WHERE driver_id = %s", (driver_id,))
+            driver_available = False
+        elif action == "accept":
+            # Claim the driver only if they are still free; otherwise undo the ride update
+            cursor.execute(
+                "UPDATE driver SET is_available = FALSE WHERE driver_id = %s AND is_available = TRUE",
+                (driver_id,)
+            )
+            if cursor.rowcount != 1:
+                conn.rollback()
+                raise TransitionError("driver_busy", "Driver is not available", ride)
+            driver_available = False
+        elif target in ("completed", "cancelled") and ride["status"] in ACTIVE_STATUSES:
+            cursor.execute("UPDATE driver SET is_available = TRUE WHERE driver_id = %s", (driver_id,))
+            driver_available = True
+        conn.commit()
+    except TransitionError:
+        raise
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    ride_driver = None if action == "decline" else driver_id
+    emit_event("ride_status", ride_id=ride_id, status=target, driver_id=ride_driver)
+    if driver_available is not None:
+        emit_event("driver_status", driver_id=driver_id, is_available=driver_available)
+    return {
+        "ride_id": ride_id,
+        "customer_id": ride["customer_id"],
+        "driver_id": ride_driver,
+        "status": target,
+        "previous_status": ride["status"],
+        "version": ride["version"] + 1,
+    }
@@ -0,0 +1,232 @@
+import random
+
+MAX_LEVEL = 32
+P = 0.25
+
+
+class _Node:
+    __slots__ = ("member", "score", "forward", "span", "backward")
+
+    def __init__(self, level, member=None, score=None):
+        self.member = member
+        self.score = score
+        self.forward = [None] * level
+        self.span = [0] * level
+        self.backward = None
+
+
+class SortedSet:
+    """Members ordered by (score, member), like a Redis ZSET.
+
+    Backed by a skip list with span counts, so add, remove and rank lookups are
+    O(log n) and range reads are O(log n + k).
+    """
+
+    def __init__(self):
+        self._header = _Node(MAX_LEVEL)
+        self._tail = None
+        self._level = 1
+        self._scores = {}
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, member):
+        return member in self._scores
+
+    def __iter__(self):
+        node = self._header.forward[0]
+        while node:
+            yield node.member, node.score
+            node = node.forward[0]
+
+    def score(self, member):
+        return self._scores.get(member)
+
+    def add(self, member, score):
+        """Insert member or move it to a new score. Returns True if it was new."""
+        old_score = self._scores.get(member)
+        if old_score is not None:
+            if old_score == score:
+                return False
+            self._delete(old_score, member)
+        self._insert(score, member)
+        self._scores[member] = score
+        return old_score is None
+
+    def increment(self, member, amount):
+        score = self._scores.get(member, 0) + amount
+        self.add(member, score)
+        return score
+
+    def remove(self, member):
+        score = self._scores.pop(member, None)
+        if score is None:
+            return False
+        self._delete(score, member)
+        return True
+
+    def rank(self, member, reverse=False):
+        """0-based position of member, or None if absent."""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        key = (score, member)
+        node = self._header
+        traversed = 0
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] and (node.forward[i].score, node.forward[i].member) <= key:
+                traversed += node.span[i]
+                node = node.forward[i]
+        rank = traversed - 1
+        return len(self._scores) - 1 - rank if reverse else rank
+
+    def slice(self, start, stop=None, reverse=False):
+        """(member, score) pairs for positions [start, stop), highest score first if reverse."""
+        length = len(self._scores)
+        stop = length if stop is None else min(stop, length)
+        if start < 0 or start >= stop:
+            return []
+        if reverse:
+            node = self._node_at(length - start)
+            step = lambda n: n.backward
+        else:
+            node = self._node_at(start + 1)
+            step = lambda n: n.forward[0]
+        items = []
+        for _ in range(stop - start):
+            items.append((node.member, node.score))
+            node = step(node)
+        return items
+
+    def range_by_score(self, min_score=float("-inf"), max_score=float("inf"), reverse=False, offset=0, count=None,
+                       min_exclusive=False, max_exclusive=False):
+        """(member, score) pairs with min_score <= score <= max_score."""
+        above_min = (lambda s: s > min_score) if min_exclusive else (lambda s: s >= min_score)
+        below_max = (lambda s: s < max_score) if max_exclusive else (lambda s: s <= max_score)
+
+        if reverse:
+            node = self._last_where(below_max)
+            in_range = above_min
+            step = lambda n: n.backward
+        else:
+            node = self._first_where(above_min)
+            in_range = below_max
+            step = lambda n: n.forward[0]
+
+        items = []
+        while node is not None and in_range(node.score):
+            if offset > 0:
+                offset -= 1
+            else:
+                if count is not None and len(items) >= count:
+                    break
+                items.append((node.member, node.score))
+            node = step(node)
+        return items
+
+    def count(self, min_score=float("-inf"), max_score=float("inf")):
+        """Number of members with min_score <= score <= max_score, in O(log n)."""
+        first = self._first_where(lambda s: s >= min_score)
+        last = self._last_where(lambda s: s <= max_score)
+        if first is None or last is None or first.score > max_score:
+            return 0
+        return self.rank(last.member) - self.rank(first.member) + 1
+
+    def pop_min(self):
+        node = self._header.forward[0]
+        if node is None:
+            return None
+        self.remove(node.member)
+        return node.member, node.score
+
+    def _first_where(self, above):
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] and not above(node.forward[i].score):
+                node = node.forward[i]
+        return node.forward[0]
+
+    def _last_where(self, below):
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] and below(node.forward[i].score):
+                node = node.forward[i]
+        return None if node is self._header else node
+
+    def _node_at(self, rank):
+        """Node at 1-based rank."""
+        node = self._header
+        traversed = 0
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] and traversed + node.span[i] <= rank:
+                traversed += node.span[i]
+                node = node.forward[i]
+            if traversed == rank:
+                return node
+        return None
+
+    def _random_level(self):
+        level = 1
+        while level < MAX_LEVEL and random.random() < P:
+            level += 1
+        return level
+
+    def _insert(self, score, member):
+        key = (score, member)
+        update = [None] * MAX_LEVEL
+        rank = [0] * MAX_LEVEL
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while node.forward[i] and (node.forward[i].score, node.forward[i].member) < key:
+                rank[i] += node.span[i]
+                node = node.forward[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._header
+                self._header.span[i] = len(self._scores)
+            self._level = level
+
+        node = _Node(level, member, score)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+            node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+
+        node.backward = None if update[0] is self._header else update[0]
+        if node.forward[0]:
+            node.forward[0].backward = node
+        else:
+            self._tail = node
+
+    def _delete(self, score, member):
+        key = (score, member)
+        update = [None] * MAX_LEVEL
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] and (node.forward[i].score, node.forward[i].member) < key:
+                node = node.forward[i]
+            update[i] = node
+
+        node = node.forward[0]
+        for i in range(self._level):
+            if update[i].forward[i] is node:
+                update[i].span[i] += node.span[i] - 1
+                update[i].forward[i] = node.forward[i]
+            else:
+                update[i].span[i] -= 1
+
+        if node.forward[0]:
+            node.forward[0].backward = node.backward
+        else:
+            self._tail = node.backward
+        while self._level > 1 and self._header.forward[self._level - 1] is None:
+            self._level -= 1
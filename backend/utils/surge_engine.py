@@ -0,0 +1,168 @@
+import collections
+import math
+import os
+import threading
+import time
+
+SURGE_ENABLED = os.getenv("SURGE_ENABLED", "1") == "1"
+SURGE_CELL_DEG = float(os.getenv("SURGE_CELL_DEG", "0.02"))  # ~2.2 km zones
+SURGE_WINDOW_SECONDS = float(os.getenv("SURGE_WINDOW_SECONDS", "300"))
+SURGE_TICK_SECONDS = float(os.getenv("SURGE_TICK_SECONDS", "10"))
+SURGE_MAX_MULTIPLIER = float(os.getenv("SURGE_MAX_MULTIPLIER", "2.5"))
+# Requests in the window per available driver at which surge starts, and how fast it rises past that
+SURGE_THRESHOLD = float(os.getenv("SURGE_THRESHOLD", "1.0"))
+SURGE_SENSITIVITY = float(os.getenv("SURGE_SENSITIVITY", "0.5"))
+SURGE_SMOOTHING = float(os.getenv("SURGE_SMOOTHING", "0.3"))
+SURGE_MAX_STEP = float(os.getenv("SURGE_MAX_STEP", "0.25"))  # largest change per tick
+# Area polled for available drivers: min_lat, max_lat, min_lng, max_lng (Bengaluru)
+SURGE_BOUNDS = tuple(float(value) for value in os.getenv("SURGE_BOUNDS", "12.7,13.25,77.3,77.9").split(","))
+
+def _available_drivers():
+    from .db_utils import get_available_drivers_in_box
+    return [(driver["latitude"], driver["longitude"]) for driver in get_available_drivers_in_box(*SURGE_BOUNDS)]
+
+class SurgeEngine:
+    """Per-zone surge multipliers from live demand and supply.
+
+    Zones are cell_deg grid cells. Ride requests are counted into the current tick's
+    bucket; every tick the bucket joins a sliding window of per-zone totals, available
+    drivers are counted per zone from get_supply(), and each zone's multiplier moves
+    toward 1 + sensitivity * (requests per driver - threshold), exponentially smoothed,
+    at most max_step per tick and capped at max_multiplier. The result is published as a
+    new dict, so multiplier() is one lock-free dict lookup; zones back at 1.0 with no
+    demand are dropped from it.
+    """
+
+    def __init__(self, get_supply=_available_drivers, cell_deg=SURGE_CELL_DEG, window_seconds=SURGE_WINDOW_SECONDS,
+                 tick_seconds=SURGE_TICK_SECONDS, max_multiplier=SURGE_MAX_MULTIPLIER, threshold=SURGE_THRESHOLD,
+                 sensitivity=SURGE_SENSITIVITY, smoothing=SURGE_SMOOTHING, max_step=SURGE_MAX_STEP):
+        self.get_supply = get_supply
+        self.cell_deg = cell_deg
+        self.window_seconds = window_seconds
+        self.tick_seconds = tick_seconds
+        self.max_multiplier = max_multiplier
+        self.threshold = threshold
+        self.sensitivity = sensitivity
+        self.smoothing = smoothing
+        self.max_step = max_step
+        self._pending = collections.Counter()
+        self._buckets = collections.deque()  # (tick time, Counter of requests per zone)
+        self._demand = collections.Counter()  # totals over the buckets in the window
+        self._supply = {}
+        self._smoothed = {}
+        self._multipliers = {}
+        self._lock = threading.Lock()
+        self._tick_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_tick = None
+        self._tick_seconds_taken = 0.0
+
+    def zone_of(self, lat, lng):
+        return (math.floor(float(lat) / self.cell_deg), math.floor(float(lng) / self.cell_deg))
+
+    def multiplier(self, lat, lng):
+        """Current multiplier for the zone containing (lat, lng); 1.0 when nothing is surging there."""
+        if self._thread is None:
+            self.start()
+        return self._multipliers.get((math.floor(float(lat) / self.cell_deg), math.floor(float(lng) / self.cell_deg)), 1.0)
+
+    def record_request(self, lat, lng):
+        """Count one ride request (served or not) at its pickup point."""
+        if self._thread is None:
+            self.start()
+        zone = self.zone_of(lat, lng)
+        with self._lock:
+            self._pending[zone] += 1
+
+    def tick(self, now=None):
+        """Roll the demand window, recount supply and publish new multipliers."""
+        now = time.time() if now is None else now
+        began = time.perf_counter()
+        with self._tick_lock:
+            try:
+                supply = collections.Counter(self.zone_of(lat, lng) for lat, lng in self.get_supply())
+            except Exception as e:
+                print(f"Surge supply refresh failed, keeping last counts: {e}")
+                supply = self._supply
+
+            with self._lock:
+                bucket, self._pending = self._pending, collections.Counter()
+            self._buckets.append((now, bucket))
+            self._demand.update(bucket)
+            while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+                self._demand.subtract(self._buckets.popleft()[1])
+            self._demand = +self._demand  # drop zones that fell to zero
+
+            smoothed, published = {}, {}
+            for zone in set(self._demand) | set(self._smoothed):
+                demand = self._demand.get(zone, 0)
+                pressure = demand / max(supply.get(zone, 0), 1)
+                target = min(max(1.0 + self.sensitivity * (pressure - self.threshold), 1.0), self.max_multiplier)
+                previous = self._smoothed.get(zone, 1.0)
+                step = self.smoothing * (target - previous)
+                value = previous + max(-self.max_step, min(self.max_step, step))
+                if demand == 0 and value < 1.005:
+                    continue
+                smoothed[zone] = value
+                if round(value, 2) > 1.0:
+                    published[zone] = round(value, 2)
+
+            self._supply = supply
+            self._smoothed = smoothed
+            self._multipliers = published
+            self._last_tick = now
+            self._tick_seconds_taken = time.perf_counter() - began
+        return published
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="surge-engine", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.tick_seconds):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Surge tick failed: {e}")
+
+    def snapshot(self):
+        multipliers, supply = self._multipliers, self._supply
+        with self._tick_lock:
+            demand = dict(self._demand)
+        zones = []
+        for zone in set(multipliers) | set(demand):
+            zones.append({
+                "zone": f"{zone[0]}:{zone[1]}",
+                "center": [(zone[0] + 0.5) * self.cell_deg, (zone[1] + 0.5) * self.cell_deg],
+                "multiplier": multipliers.get(zone, 1.0),
+                "requests": demand.get(zone, 0),
+                "available_drivers": supply.get(zone, 0),
+            })
+        zones.sort(key=lambda entry: entry["multiplier"], reverse=True)
+        return {
+            "last_tick": self._last_tick,
+            "tick_ms": round(self._tick_seconds_taken * 1000, 3),
+            "window_seconds": self.window_seconds,
+            "surging_zones": len(multipliers),
+            "zones": zones,
+        }
+
+class _NoSurge:
+    def multiplier(self, lat, lng):
+        return 1.0
+
+    def record_request(self, lat, lng):
+        pass
+
+    def snapshot(self):
+        return {"enabled": False, "zones": []}
+
+surge_engine = SurgeEngine() if SURGE_ENABLED else _NoSurge()
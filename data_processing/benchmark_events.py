@@ -0,0 +1,69 @@
+import argparse
+import json
+import random
+import threading
+import time
+from data_processing.kafka_consumer import RedisEventApplier, RideEventWorker, create_consumer
+from data_processing.kafka_producer import RideEventProducer
+from data_processing.ride_events import encode_event
+
+def sample_event(rng, i):
+    kind = rng.random()
+    if kind < 0.7:
+        return "driver_location", {"driver_id": rng.randrange(5000), "latitude": 12.9 + rng.random() * 0.2,
+                                   "longitude": 77.5 + rng.random() * 0.2}
+    if kind < 0.8:
+        return "driver_status", {"driver_id": rng.randrange(5000), "is_available": rng.random() < 0.5}
+    if kind < 0.9:
+        return "ride_status", {"ride_id": i, "status": rng.choice(("accepted", "in_progress", "completed")),
+                               "driver_id": rng.randrange(5000)}
+    return "ride_booked", {"ride_id": i, "customer_id": rng.randrange(100_000), "driver_id": rng.randrange(5000),
+                           "pickup_lat": 12.97, "pickup_lng": 77.59, "dest_lat": 12.93, "dest_lng": 77.62, "fare": 180.0}
+
+def run(n_events=200_000, n_threads=4, broker="local", batch_size=500, seed=3):
+    """Produce n_events from n_threads through the shared producer while one worker applies them."""
+    from backend.utils.local_redis import LocalRedis
+    producer = RideEventProducer(broker=broker)
+    worker = RideEventWorker(create_consumer(f"benchmark-{time.time_ns()}", broker, batch_size),
+                             RedisEventApplier(LocalRedis()), batch_size, poll_timeout_ms=100)
+    events = [sample_event(random.Random(seed), i) for i in range(n_events)]
+    encoded = sum(len(encode_event(kind, **fields)) for kind, fields in events[:10_000])
+    as_json = sum(len(json.dumps({"type": kind, **fields})) for kind, fields in events[:10_000])
+
+    stop = threading.Event()
+    consumer_thread = threading.Thread(target=worker.run, args=(stop,))
+    consumer_thread.start()
+
+    def produce(worker_index):
+        for kind, fields in events[worker_index::n_threads]:
+            producer.emit(kind, **fields)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    producer.flush()
+    produce_seconds = time.perf_counter() - start
+    while worker.processed < n_events and time.perf_counter() - start < 120:
+        time.sleep(0.01)
+    end_to_end_seconds = time.perf_counter() - start
+    stop.set()
+    consumer_thread.join()
+    producer.close()
+
+    print(f"Encoded size: {encoded / 10_000:.1f} B/event (JSON {as_json / 10_000:.1f} B/event)")
+    print(f"Produced {n_events} events from {n_threads} threads in {produce_seconds:.2f}s "
+          f"({n_events / produce_seconds:,.0f} events/s)")
+    print(f"Consumed and applied {worker.processed}/{n_events} in {end_to_end_seconds:.2f}s "
+          f"({worker.processed / end_to_end_seconds:,.0f} events/s end to end, batches of {batch_size})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end ride event throughput")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--broker", choices=("local", "kafka"), default="local")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    run(args.events, args.threads, args.broker, args.batch_size)
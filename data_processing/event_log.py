@@ -0,0 +1,324 @@
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+from data_processing.ride_events import EVENT_SPECS, EVENT_TYPES, HEADER, decode_event
+
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", os.path.join(os.path.dirname(__file__), "..", "event_log"))
+
+# Every record is RECORD_SIZE bytes: a 16-byte header followed by the event payload, zero padded.
+# A zero length marks an unwritten slot in the preallocated active segment.
+RECORD_SIZE = 64
+RECORD_HEADER = struct.Struct("<dBBxxI")  # ts, type code, payload length, crc32 of payload
+PAYLOAD_SIZE = RECORD_SIZE - RECORD_HEADER.size
+RECORD_DTYPE = np.dtype([("ts", "<f8"), ("type", "u1"), ("length", "u1"), ("pad", "V2"), ("crc", "<u4"),
+                         ("payload", f"V{PAYLOAD_SIZE}")])
+INDEX_ENTRY = struct.Struct("<dI")  # max ts up to and including the record, record position
+
+SEGMENT_RECORDS = 1 << 20  # 64 MiB segments
+INDEX_INTERVAL = 1024
+KEEP_LATEST_ONLY = ("driver_location", "driver_status")  # compacted to the newest record per driver
+
+class Segment:
+    """One log file holding records [base, base + count) plus its sparse time index."""
+
+    def __init__(self, directory, base):
+        self.base = base
+        self.path = os.path.join(directory, f"{base:020d}.log")
+        self.index_path = os.path.join(directory, f"{base:020d}.idx")
+        self.count = 0
+        self.max_ts = float("-inf")
+        self.index_ts = []  # running max ts at every INDEX_INTERVAL-th record
+        self.index_pos = []
+
+    def load(self):
+        size = os.path.getsize(self.path)
+        self.count = self._written_records(size // RECORD_SIZE)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                for ts, pos in INDEX_ENTRY.iter_unpack(f.read()):
+                    if pos < self.count:
+                        self.index_ts.append(ts)
+                        self.index_pos.append(pos)
+        self.max_ts = float(self.columns()["ts"].max()) if self.count else float("-inf")
+        return self
+
+    def _written_records(self, slots):
+        """Records are written in order, so the filled slots are a prefix: binary search its end."""
+        if slots == 0:
+            return 0
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lengths = np.frombuffer(mm, RECORD_DTYPE, count=slots)["length"]
+            low, high = 0, slots
+            while low < high:
+                mid = (low + high) // 2
+                if lengths[mid]:
+                    low = mid + 1
+                else:
+                    high = mid
+            del lengths
+        return low
+
+    def columns(self):
+        """Zero-copy structured array over the written records (keeps the mmap open while referenced)."""
+        if self.count == 0:
+            return np.empty(0, RECORD_DTYPE)
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return np.frombuffer(mm, RECORD_DTYPE, count=self.count)
+
+    def seek(self, ts):
+        """Position of the first record that may have a timestamp >= ts."""
+        i = bisect.bisect_left(self.index_ts, ts)
+        return self.index_pos[i - 1] if i > 0 else 0
+
+class EventLog:
+    """Append-only ride event log split into fixed-size-record segment files.
+
+    Appends go through pwrite into a preallocated active segment; replay maps segments
+    read-only and walks them as NumPy structured arrays without copying. Each segment
+    keeps a sparse index of the running max timestamp every INDEX_INTERVAL records, so
+    time-range reads skip straight to the right neighbourhood. Old segments are dropped by
+    retention or rewritten by compaction, which keeps every ride lifecycle event and only
+    the newest location/status per driver.
+    """
+
+    def __init__(self, directory=EVENT_LOG_DIR, segment_records=SEGMENT_RECORDS, index_interval=INDEX_INTERVAL,
+                 fsync_interval=1.0):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.index_interval = index_interval
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._last_fsync = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        bases = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith(".log"))
+        self.segments = [Segment(directory, base).load() for base in bases]
+        if not self.segments:
+            self.segments.append(self._create_segment(0))
+        self._open_active()
+
+    @property
+    def end_offset(self):
+        active = self.segments[-1]
+        return active.base + active.count
+
+    def _create_segment(self, base):
+        segment = Segment(self.directory, base)
+        with open(segment.path, "wb") as f:
+            f.truncate(self.segment_records * RECORD_SIZE)
+        open(segment.index_path, "wb").close()
+        return segment
+
+    def _open_active(self):
+        active = self.segments[-1]
+        if os.path.getsize(active.path) < self.segment_records * RECORD_SIZE:
+            # Compacted or foreign-sized segment: start a fresh one after it
+            self.segments.append(self._create_segment(active.base + active.count))
+            active = self.segments[-1]
+        self._fd = os.open(active.path, os.O_RDWR)
+        self._index_file = open(active.index_path, "ab")
+
+    def _roll(self):
+        os.fsync(self._fd)
+        os.close(self._fd)
+        self._index_file.close()
+        self.segments.append(self._create_segment(self.end_offset))
+        self._open_active()
+
+    def append(self, event):
+        """Append one encoded ride event (see ride_events.encode_event); returns its offset."""
+        return self.append_many([event])[0]
+
+    def append_many(self, events):
+        with self._lock:
+            offsets = []
+            chunk = bytearray()
+            for event in events:
+                active = self.segments[-1]
+                if active.count + len(chunk) // RECORD_SIZE >= self.segment_records:
+                    self._write(chunk)
+                    chunk = bytearray()
+                    self._roll()
+                    active = self.segments[-1]
+                _, code, ts = HEADER.unpack_from(event)
+                payload = bytes(event[HEADER.size:])
+                if len(payload) > PAYLOAD_SIZE:
+                    raise ValueError(f"Event payload of {len(payload)} bytes exceeds {PAYLOAD_SIZE}")
+                chunk += RECORD_HEADER.pack(ts, code, len(payload), zlib.crc32(payload))
+                chunk += payload.ljust(PAYLOAD_SIZE, b"\0")
+                position = active.count + len(chunk) // RECORD_SIZE - 1
+                active.max_ts = max(active.max_ts, ts)
+                if position % self.index_interval == 0:
+                    active.index_ts.append(active.max_ts)
+                    active.index_pos.append(position)
+                    self._index_file.write(INDEX_ENTRY.pack(active.max_ts, position))
+                offsets.append(active.base + position)
+            self._write(chunk)
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._fd)
+                self._index_file.flush()
+                self._last_fsync = time.monotonic()
+            return offsets
+
+    def _write(self, chunk):
+        if chunk:
+            active = self.segments[-1]
+            os.pwrite(self._fd, chunk, active.count * RECORD_SIZE)
+            active.count += len(chunk) // RECORD_SIZE
+
+    def flush(self):
+        with self._lock:
+            os.fsync(self._fd)
+            self._index_file.flush()
+
+    def close(self):
+        with self._lock:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._index_file.close()
+
+    def scan(self, start_ts=None, end_ts=None):
+        """Yield (base offset, structured array) chunks covering [start_ts, end_ts); zero-copy views."""
+        for segment in list(self.segments):
+            if segment.count == 0 or (start_ts is not None and segment.max_ts < start_ts):
+                continue
+            columns = segment.columns()
+            begin = segment.seek(start_ts) if start_ts is not None else 0
+            columns = columns[begin:]
+            mask = np.ones(len(columns), dtype=bool)
+            if start_ts is not None:
+                mask &= columns["ts"] >= start_ts
+            if end_ts is not None:
+                mask &= columns["ts"] < end_ts
+            if mask.all():
+                yield segment.base + begin, columns
+            elif mask.any():
+                yield segment.base + begin, columns[mask]
+
+    def replay(self, start_ts=None, end_ts=None, types=None):
+        """Decoded events (dicts as from ride_events.decode_event) in log order."""
+        wanted = None if types is None else {code for code, (name, _, _) in EVENT_TYPES.items() if name in types}
+        for _, records in self.scan(start_ts, end_ts):
+            for record in records:
+                code = int(record["type"])
+                if wanted is not None and code not in wanted:
+                    continue
+                yield _decode_record(record)
+
+    def tail(self, from_offset=None, poll_interval=0.2, stop=None):
+        """Follow the log from an offset (default: the end), yielding (offset, event) as they land."""
+        offset = self.end_offset if from_offset is None else from_offset
+        while stop is None or not stop.is_set():
+            for segment in list(self.segments):
+                if segment.base + segment.count <= offset:
+                    continue
+                columns = segment.columns()
+                for position in range(max(offset - segment.base, 0), segment.count):
+                    yield segment.base + position, _decode_record(columns[position])
+                offset = segment.base + segment.count
+            time.sleep(poll_interval)
+
+    def counts_by_type(self, start_ts=None, end_ts=None):
+        """Event counts per type over a time range, computed on the mapped columns."""
+        totals = np.zeros(256, dtype=np.int64)
+        for _, records in self.scan(start_ts, end_ts):
+            totals += np.bincount(records["type"], minlength=256)
+        return {name: int(totals[code]) for code, (name, _, _) in EVENT_TYPES.items()}
+
+    def apply_retention(self, max_age_seconds=None, max_bytes=None, now=None):
+        """Delete closed segments older than max_age or beyond the size budget, oldest first."""
+        now = time.time() if now is None else now
+        removed = []
+        with self._lock:
+            while len(self.segments) > 1:
+                oldest = self.segments[0]
+                total = sum(os.path.getsize(segment.path) for segment in self.segments)
+                too_old = max_age_seconds is not None and oldest.max_ts < now - max_age_seconds
+                too_big = max_bytes is not None and total > max_bytes
+                if not (too_old or too_big):
+                    break
+                os.remove(oldest.path)
+                os.remove(oldest.index_path)
+                removed.append(self.segments.pop(0).base)
+        return removed
+
+    def compact(self, before_ts):
+        """Rewrite closed segments whose events are all older than before_ts, keeping every ride
+        event but only the newest location/status record per driver across those segments.
+
+        Offsets inside a compacted segment are renumbered from its base.
+        """
+        with self._lock:
+            closed = [segment for segment in self.segments[:-1] if segment.max_ts < before_ts]
+            if not closed:
+                return 0
+            latest = {}  # (type code, driver_id) -> (segment base, position)
+            for segment in closed:
+                columns = segment.columns()
+                for code in (EVENT_SPECS[name][0] for name in KEEP_LATEST_ONLY):
+                    positions = np.flatnonzero(columns["type"] == code)
+                    if len(positions):
+                        # Both compacted payloads start with the driver id
+                        payloads = np.frombuffer(columns["payload"][positions].tobytes(), dtype="<u8")
+                        drivers = payloads.reshape(len(positions), -1)[:, 0]
+                        for driver_id, position in zip(drivers.tolist(), positions.tolist()):
+                            latest[(code, driver_id)] = (segment.base, position)
+            keep_latest = set(latest.values())
+            compacted_codes = [EVENT_SPECS[name][0] for name in KEEP_LATEST_ONLY]
+            dropped = 0
+            for segment in closed:
+                columns = segment.columns()
+                keep = ~np.isin(columns["type"], compacted_codes)
+                for base, position in keep_latest:
+                    if base == segment.base:
+                        keep[position] = True
+                dropped += int((~keep).sum())
+                data = columns[keep].tobytes()
+                del columns
+                tmp_path = segment.path + ".compacting"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, segment.path)
+                kept = np.frombuffer(data, RECORD_DTYPE)
+                running_max = np.maximum.accumulate(kept["ts"]) if len(kept) else kept["ts"]
+                positions = list(range(0, len(kept), self.index_interval))
+                with open(segment.index_path, "wb") as f:
+                    for position in positions:
+                        f.write(INDEX_ENTRY.pack(running_max[position], position))
+                segment.count = len(kept)
+                segment.index_ts = [float(running_max[position]) for position in positions]
+                segment.index_pos = positions
+            return dropped
+
+def _decode_record(record):
+    data = HEADER.pack(1, int(record["type"]), float(record["ts"])) + record["payload"].tobytes()
+    return decode_event(data)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and maintain the ride event log")
+    parser.add_argument("--dir", default=EVENT_LOG_DIR)
+    parser.add_argument("--retention-days", type=float, help="Drop closed segments older than this")
+    parser.add_argument("--max-gb", type=float, help="Drop oldest closed segments beyond this size")
+    parser.add_argument("--compact-days", type=float, help="Compact closed segments older than this")
+    args = parser.parse_args()
+
+    log = EventLog(args.dir)
+    if args.compact_days is not None:
+        print(f"Compaction dropped {log.compact(time.time() - args.compact_days * 86400)} records")
+    if args.retention_days is not None or args.max_gb is not None:
+        removed = log.apply_retention(
+            args.retention_days * 86400 if args.retention_days is not None else None,
+            int(args.max_gb * 2 ** 30) if args.max_gb is not None else None
+        )
+        print(f"Retention removed segments {removed}")
+    print(f"{len(log.segments)} segments, end offset {log.end_offset}")
+    print(f"Events by type: {log.counts_by_type()}")
+    log.close()
@@ -1,5 +1,131 @@
-from kafka import KafkaConsumer
+import argparse
+import os
+import time
+from data_processing.ride_events import RIDE_EVENTS_TOPIC, decode_event, encode_event
 
-consumer = KafkaConsumer('rides', bootstrap_servers='localhost:9092')
-for message in consumer:
-    print(message.value)
\ No newline at end of file
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+EVENT_BROKER = os.getenv("EVENT_BROKER", "kafka")
+
+def create_consumer(group_id="ride-event-workers", broker=EVENT_BROKER, max_poll_records=500):
+    """Consumer-group member with auto-commit off; offsets are committed per applied batch."""
+    if broker == "local":
+        from data_processing.local_broker import LocalConsumer, local_broker
+        return LocalConsumer(RIDE_EVENTS_TOPIC, local_broker, group_id, max_poll_records)
+    from kafka import KafkaConsumer
+    return KafkaConsumer(
+        RIDE_EVENTS_TOPIC,
+        bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS,
+        group_id=group_id,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        max_poll_records=max_poll_records
+    )
+
+class RedisEventApplier:
+    """Applies a batch of ride events to Redis in one pipeline: driver positions in a GEO
+    index, the available-driver set, and per-status ride counters."""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+    def __call__(self, events):
+        pipe = self.redis.pipeline(transaction=False)
+        locations = {}
+        for event in events:
+            if event["type"] == "driver_location":
+                # Only the newest position per driver in a batch matters
+                locations[event["driver_id"]] = (event["longitude"], event["latitude"])
+            elif event["type"] == "driver_status":
+                if event["is_available"]:
+                    pipe.sadd("drivers:available", event["driver_id"])
+                else:
+                    pipe.srem("drivers:available", event["driver_id"])
+            elif event["type"] == "ride_booked":
+                pipe.hincrby("rides:status_counts", "booked", 1)
+            elif event["type"] == "ride_status":
+                pipe.hincrby("rides:status_counts", event["status"], 1)
+        if locations:
+            values = []
+            for driver_id, (lon, lat) in locations.items():
+                values.extend((lon, lat, driver_id))
+            pipe.geoadd("drivers:locations", values)
+        pipe.execute()
+
+class EventLogApplier:
+    """Appends each batch, re-encoded, to the on-disk ride event log for replay by analytics."""
+
+    def __init__(self, event_log):
+        self.event_log = event_log
+
+    def __call__(self, events):
+        self.event_log.append_many([encode_event(event.pop("type"), **event) for event in events])
+
+class RideEventWorker:
+    """Polls batches, decodes them, hands them to `apply` and commits only after it succeeds.
+
+    A crash between apply and commit replays the batch, so appliers must be idempotent or
+    tolerate at-least-once delivery.
+    """
+
+    def __init__(self, consumer, apply, batch_size=500, poll_timeout_ms=500):
+        self.consumer = consumer
+        self.apply = apply
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        self.processed = 0
+
+    def run_once(self):
+        batches = self.consumer.poll(timeout_ms=self.poll_timeout_ms, max_records=self.batch_size)
+        records = [record for partition_records in batches.values() for record in partition_records]
+        if not records:
+            return 0
+        events = []
+        for record in records:
+            try:
+                events.append(decode_event(record.value))
+            except (ValueError, KeyError) as e:
+                print(f"Skipping undecodable event at {record.partition}:{record.offset}: {e}")
+        try:
+            self.apply(events)
+        except Exception:
+            # Rewind to the batch start so the same records are polled again
+            for tp, partition_records in batches.items():
+                self.consumer.seek(tp, partition_records[0].offset)
+            raise
+        self.consumer.commit()
+        self.processed += len(records)
+        return len(records)
+
+    def run(self, stop=None):
+        while stop is None or not stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Ride event batch failed, retrying: {e}")
+                time.sleep(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consume ride events in batches and apply them to Redis or the event log")
+    parser.add_argument("--group", default=None, help="Defaults to one group per sink")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sink", choices=("redis", "log"), default="redis")
+    args = parser.parse_args()
+
+    if args.sink == "log":
+        from data_processing.event_log import EventLog
+        apply = EventLogApplier(EventLog())
+    else:
+        from backend.utils.redis_client import get_redis_client
+        apply = RedisEventApplier(get_redis_client())
+    group = args.group or ("ride-event-workers" if args.sink == "redis" else "ride-event-log")
+    worker = RideEventWorker(create_consumer(group, max_poll_records=args.batch_size), apply, args.batch_size)
+    last_report = time.monotonic()
+    while True:
+        try:
+            worker.run_once()
+        except Exception as e:
+            print(f"Ride event batch failed, retrying: {e}")
+            time.sleep(1)
+        if time.monotonic() - last_report >= 10:
+            print(f"Processed {worker.processed} ride events")
+            last_report = time.monotonic()
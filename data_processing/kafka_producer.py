@@ -1,4 +1,93 @@
-from kafka import KafkaProducer
+import os
+import threading
+import time
+from data_processing.ride_events import RIDE_EVENTS_TOPIC, encode_event, event_key
 
-producer = KafkaProducer(bootstrap_servers='localhost:9092')
-producer.send('rides', b'Ride event')
\ No newline at end of file
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+EVENT_BROKER = os.getenv("EVENT_BROKER", "off")  # 'kafka', 'local' or 'off'
+
+# Batching settings: wait up to LINGER_MS to fill BATCH_SIZE-byte batches, compress whole batches
+PRODUCER_SETTINGS = {
+    "linger_ms": int(os.getenv("KAFKA_LINGER_MS", "20")),
+    "batch_size": int(os.getenv("KAFKA_BATCH_SIZE", str(64 * 1024))),
+    "compression_type": os.getenv("KAFKA_COMPRESSION", "gzip"),
+}
+# send() waits at most this long for metadata or buffer space before giving up on an event
+KAFKA_MAX_BLOCK_MS = int(os.getenv("KAFKA_MAX_BLOCK_MS", "100"))
+RETRY_SECONDS = 30
+
+class RideEventProducer:
+    """Process-wide ride event publisher shared by every request handler.
+
+    The Kafka client is connected on a background thread started by the first emit; events
+    emitted before it is ready are dropped. If the broker is unreachable the connection is
+    retried after RETRY_SECONDS, and send() is capped at KAFKA_MAX_BLOCK_MS, so publishing
+    never fails or stalls a booking.
+    """
+
+    def __init__(self, broker=EVENT_BROKER, topic=RIDE_EVENTS_TOPIC):
+        self.broker = broker
+        self.topic = topic
+        self._producer = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _client(self):
+        if self._producer is None and self.broker != "off" and time.monotonic() >= self._retry_at:
+            with self._lock:
+                if self._producer is None and time.monotonic() >= self._retry_at:
+                    if self.broker == "local":
+                        self._connect()
+                    else:
+                        # Bootstrapping can take the whole request timeout, keep it off the caller
+                        self._retry_at = float("inf")
+                        threading.Thread(target=self._connect, name="ride-events-connect", daemon=True).start()
+        return self._producer
+
+    def _connect(self):
+        try:
+            self._producer = self._create_client()
+            self._retry_at = 0.0
+        except Exception as e:
+            print(f"Ride events disabled for {RETRY_SECONDS}s, producer unavailable: {e}")
+            self._retry_at = time.monotonic() + RETRY_SECONDS
+
+    def _create_client(self):
+        if self.broker == "local":
+            from data_processing.local_broker import LocalProducer, local_broker
+            return LocalProducer(local_broker, **PRODUCER_SETTINGS)
+        from kafka import KafkaProducer
+        return KafkaProducer(bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS, acks=1,
+                             max_block_ms=KAFKA_MAX_BLOCK_MS, **PRODUCER_SETTINGS)
+
+    def emit(self, event_type, **fields):
+        """Queue a typed event; returns the send future, or None if it was dropped."""
+        producer = self._client()
+        if producer is None:
+            return None
+        try:
+            return producer.send(self.topic, value=encode_event(event_type, **fields), key=event_key(event_type, **fields))
+        except Exception as e:
+            print(f"Failed to emit {event_type} event: {e}")
+            return None
+
+    def flush(self):
+        if self._producer is not None:
+            self._producer.flush()
+
+    def close(self):
+        if self._producer is not None:
+            self._producer.close()
+            self._producer = None
+
+ride_event_producer = RideEventProducer()
+
+def emit_event(event_type, **fields):
+    return ride_event_producer.emit(event_type, **fields)
+
+if __name__ == "__main__":
+    producer = RideEventProducer(broker="local" if EVENT_BROKER == "local" else "kafka")
+    producer._connect()  # connect inline so the sample event is not dropped
+    producer.emit("ride_booked", ride_id=1, customer_id=1, driver_id=2, pickup_lat=12.9716, pickup_lng=77.5946,
+                  dest_lat=12.9352, dest_lng=77.6245, fare=150.0)
+    producer.flush()
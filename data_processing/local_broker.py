@@ -0,0 +1,135 @@
+import collections
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+TopicPartition = collections.namedtuple("TopicPartition", ["topic", "partition"])
+ConsumerRecord = collections.namedtuple("ConsumerRecord", ["topic", "partition", "offset", "timestamp", "key", "value"])
+
+class LocalBroker:
+    """In-process stand-in for a Kafka cluster: partitioned append-only topics plus
+    committed offsets per consumer group."""
+
+    def __init__(self, partitions=4):
+        self.partitions = partitions
+        self.topics = collections.defaultdict(lambda: [[] for _ in range(self.partitions)])
+        self.committed = {}  # (group_id, TopicPartition) -> next offset
+        self.cond = threading.Condition()
+
+    def append(self, topic, partition, records):
+        with self.cond:
+            log = self.topics[topic][partition]
+            base = len(log)
+            log.extend(records)
+            self.cond.notify_all()
+        return base
+
+    def read(self, topic, partition, offset, limit):
+        with self.cond:
+            return self.topics[topic][partition][offset:offset + limit]
+
+    def end_offset(self, topic, partition):
+        with self.cond:
+            return len(self.topics[topic][partition])
+
+class LocalProducer:
+    """KafkaProducer-like client for LocalBroker with the same linger/batch behaviour:
+    records are buffered per partition and appended once linger_ms passes or a batch fills.
+    compression_type is accepted for parity but records are stored as sent."""
+
+    def __init__(self, broker, linger_ms=20, batch_size=16384, compression_type=None):
+        self.broker = broker
+        self.linger = linger_ms / 1000
+        self.batch_size = batch_size
+        self.compression_type = compression_type
+        self._batches = {}  # (topic, partition) -> [records, size, futures, first_at]
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._linger_loop, name="local-producer", daemon=True)
+        self._thread.start()
+
+    def send(self, topic, value=None, key=None):
+        partition = zlib.crc32(key) % self.broker.partitions if key else 0
+        future = Future()
+        with self._lock:
+            batch = self._batches.setdefault((topic, partition), [[], 0, [], time.monotonic()])
+            batch[0].append((key, value))
+            batch[1] += len(value) + len(key or b"")
+            batch[2].append(future)
+            if batch[1] >= self.batch_size:
+                self._send_batch(topic, partition, self._batches.pop((topic, partition)))
+        return future
+
+    def flush(self, timeout=None):
+        with self._lock:
+            batches, self._batches = self._batches, {}
+            for (topic, partition), batch in batches.items():
+                self._send_batch(topic, partition, batch)
+
+    def close(self, timeout=None):
+        self._closed.set()
+        self.flush()
+
+    def _send_batch(self, topic, partition, batch):
+        records, _, futures, _ = batch
+        now = time.time()
+        base = self.broker.append(topic, partition, [(now, key, value) for key, value in records])
+        for i, future in enumerate(futures):
+            future.set_result((topic, partition, base + i))
+
+    def _linger_loop(self):
+        while not self._closed.wait(self.linger or 0.005):
+            now = time.monotonic()
+            with self._lock:
+                due = [key for key, batch in self._batches.items() if now - batch[3] >= self.linger]
+                for topic, partition in due:
+                    self._send_batch(topic, partition, self._batches.pop((topic, partition)))
+
+class LocalConsumer:
+    """KafkaConsumer-like client for LocalBroker. One consumer per group owns every partition;
+    poll() continues from the group's committed offsets and commit() stores the positions."""
+
+    def __init__(self, topic, broker, group_id, max_poll_records=500):
+        self.topic = topic
+        self.broker = broker
+        self.group_id = group_id
+        self.max_poll_records = max_poll_records
+        self.positions = {}
+        for partition in range(broker.partitions):
+            tp = TopicPartition(topic, partition)
+            self.positions[tp] = broker.committed.get((group_id, tp), 0)
+
+    def poll(self, timeout_ms=0, max_records=None):
+        max_records = max_records or self.max_poll_records
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            batches = {}
+            remaining = max_records
+            for tp, offset in self.positions.items():
+                if remaining <= 0:
+                    break
+                rows = self.broker.read(tp.topic, tp.partition, offset, remaining)
+                if rows:
+                    batches[tp] = [ConsumerRecord(tp.topic, tp.partition, offset + i, ts, key, value)
+                                   for i, (ts, key, value) in enumerate(rows)]
+                    self.positions[tp] = offset + len(rows)
+                    remaining -= len(rows)
+            wait = deadline - time.monotonic()
+            if batches or wait <= 0:
+                return batches
+            with self.broker.cond:
+                self.broker.cond.wait(min(wait, 0.05))
+
+    def seek(self, partition, offset):
+        self.positions[partition] = offset
+
+    def commit(self, offsets=None):
+        with self.broker.cond:
+            for tp, offset in (offsets or self.positions).items():
+                self.broker.committed[(self.group_id, tp)] = offset
+
+    def close(self):
+        pass
+
+local_broker = LocalBroker()
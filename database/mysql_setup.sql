@@ -24,9 +24,12 @@ CREATE TABLE rides (
     dropoff_lat DECIMAL(10, 8),
     dropoff_lon DECIMAL(11, 8),
     fare DECIMAL(10, 2) DEFAULT 150.00,
+    surge_multiplier DECIMAL(3, 2) NOT NULL DEFAULT 1.00,
     status ENUM('pending', 'accepted', 'in_progress', 'completed', 'cancelled') DEFAULT 'pending',
+    version INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL DEFAULT NULL,  -- set once by the 'complete' transition; the rollup watermark
     FOREIGN KEY (customer_id) REFERENCES users(user_id),
     FOREIGN KEY (driver_id) REFERENCES users(user_id)
 );
@@ -46,6 +49,7 @@ CREATE TABLE driver (
     latitude DECIMAL(10, 8) DEFAULT 12.9716,
     longitude DECIMAL(11, 8) DEFAULT 77.5946,
     is_available BOOLEAN DEFAULT TRUE,
+    driver_data_id VARCHAR(255) UNIQUE,  -- the driver's driver_data/leaderboard id, e.g. DRV0001
     FOREIGN KEY (driver_id) REFERENCES users(user_id)
 );
 
@@ -56,8 +60,35 @@ CREATE TABLE IF NOT EXISTS prebooked_rides (
     ward VARCHAR(50) NOT NULL,
     pickup_time DATETIME NOT NULL,
     status ENUM('pending', 'accepted', 'cancelled') DEFAULT 'pending',
+    driver_id VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (customer_id) REFERENCES users(user_id)
+    FOREIGN KEY (customer_id) REFERENCES users(user_id),
+    INDEX idx_prebooked_driver (driver_id, pickup_time)
+);
+
+-- Windows during which drivers expect to be free for prebooked pickups in a ward
+CREATE TABLE IF NOT EXISTS driver_availability (
+    driver_id VARCHAR(255) NOT NULL,
+    ward VARCHAR(50) NOT NULL,
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL,
+    INDEX idx_availability_end (end_time)
+);
+
+-- Pending prebooking acceptance deadlines, re-armed after a restart
+CREATE TABLE IF NOT EXISTS prebooking_timers (
+    ride_id INT PRIMARY KEY,
+    ward VARCHAR(50) NOT NULL,
+    deadline DOUBLE NOT NULL,
+    ride_details TEXT NOT NULL
+);
+
+-- Cancellation penalties; score decays by half every half-life from updated_at (epoch seconds)
+CREATE TABLE IF NOT EXISTS prebooking_penalties (
+    party_id VARCHAR(50) PRIMARY KEY,
+    score DOUBLE NOT NULL DEFAULT 0,
+    total_count INT NOT NULL DEFAULT 0,
+    updated_at DOUBLE NOT NULL
 );
 
 -- Create the 'driver_data' table
@@ -87,6 +118,24 @@ CREATE TABLE ride_data (
     FOREIGN KEY (driver_id) REFERENCES driver_data(driver_id)
 );
 
+-- Per-driver daily ride rollups for windowed leaderboards (filled by gamification/rollups.py)
+CREATE TABLE driver_daily_stats (
+    driver_id VARCHAR(255) NOT NULL,
+    day DATE NOT NULL,
+    rides INT NOT NULL DEFAULT 0,
+    fare DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    peak_rides INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, driver_id),
+    INDEX (driver_id, day)
+);
+
+-- Last ride folded into the rollups, per source table
+CREATE TABLE rollup_watermarks (
+    source VARCHAR(64) PRIMARY KEY,
+    last_ts DATETIME NOT NULL,
+    last_id VARCHAR(255) NOT NULL
+);
+
 -- Add an admin user for testing
 INSERT INTO users (name, email, password_hash, user_type)
 VALUES ('Admin User', 'admin@nammayatri.com', 'admin123', 'admin');
@@ -116,4 +165,5 @@ VALUES (LAST_INSERT_ID(), TRUE, 12.9352, 77.6245, 'Koramangala');
 
 -- Optimize 'rides' table for large data
 ALTER TABLE rides ADD INDEX (driver_id);
-ALTER TABLE rides ADD INDEX (customer_id);
\ No newline at end of file
+ALTER TABLE rides ADD INDEX (customer_id);
+ALTER TABLE rides ADD INDEX (completed_at, ride_id);
\ No newline at end of file
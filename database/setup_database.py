@@ -65,6 +65,14 @@ def load_csv_data(connection):
                 VALUES (%s, %s, %s, %s, %s, %s)
             """, (row['driver_id'], row['experience_months'], row['primary_ward'], row['base_acceptance_rate'], row['peak_acceptance_rate'], row['avg_daily_hours']))
 
+        # Link the test driver accounts to the first driver_data profiles for the leaderboard
+        cursor.execute("SELECT driver_id FROM driver ORDER BY driver_id")
+        driver_ids = [row[0] for row in cursor.fetchall()]
+        cursor.executemany(
+            "UPDATE driver SET driver_data_id = %s WHERE driver_id = %s",
+            list(zip(driver_df['driver_id'], driver_ids))
+        )
+
         # Load ride data (first 100k rows)
         ride_data_path = os.path.join(datasets_dir, 'rides_data.csv')
         ride_df = pd.read_csv(ride_data_path,nrows=500000)  # Limit to 100k rows
@@ -0,0 +1,53 @@
+import argparse
+import time
+import numpy as np
+from . import routing
+from .benchmark_routing import grid_city
+from .matrix import distance_matrix, haversine_matrix_km
+from .routing import RoadGraph
+
+def run(n_origins=100, n_destinations=1000, size=300, seed=4):
+    rng = np.random.default_rng(seed)
+    span = size * 0.0008
+    origins = np.column_stack([rng.uniform(12.85, 12.85 + span, n_origins), rng.uniform(77.48, 77.48 + span, n_origins)])
+    destinations = np.column_stack([rng.uniform(12.85, 12.85 + span, n_destinations),
+                                    rng.uniform(77.48, 77.48 + span, n_destinations)])
+
+    # Pair-at-a-time cost, measured on a sample
+    start = time.perf_counter()
+    for o in origins[:10]:
+        for d in destinations[:100]:
+            haversine_matrix_km([o], [d])
+    per_pair = (time.perf_counter() - start) / 1000
+    start = time.perf_counter()
+    distance_matrix(origins, destinations, mode="haversine")
+    print(f"haversine {n_origins}x{n_destinations}: {(time.perf_counter() - start) * 1000:.1f}ms "
+          f"(pair at a time: ~{per_pair * n_origins * n_destinations * 1000:.0f}ms)")
+
+    graph = routing._graph = RoadGraph.from_edges(*grid_city(size))
+    graph.cost_matrix("time"), graph.cost_matrix("length")
+    start = time.perf_counter()
+    result = distance_matrix(origins, destinations, mode="road")
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    distance_matrix(origins, destinations, mode="road", distances=False)
+    eta_only = time.perf_counter() - start
+    start = time.perf_counter()
+    distance_matrix(origins, destinations, mode="road", distances=False, max_eta_min=10)
+    eta_limited = time.perf_counter() - start
+    start = time.perf_counter()
+    for o, d in zip(origins[:20], destinations[:20]):
+        graph.shortest_path(graph.snap(*o)[0], graph.snap(*d)[0])
+    per_route = (time.perf_counter() - start) / 20
+    print(f"road {n_origins}x{n_destinations} on {len(graph)} nodes: {elapsed * 1000:.0f}ms, "
+          f"median ETA {np.median(result['durations_min']):.1f} min "
+          f"(point-to-point A*: ~{per_route * n_origins * n_destinations:.0f}s)")
+    print(f"road ETAs only: {eta_only * 1000:.0f}ms; ETAs within 10 min: {eta_limited * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time many-to-many distance/ETA matrices")
+    parser.add_argument("--origins", type=int, default=100)
+    parser.add_argument("--destinations", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=300, help="Synthetic street grid is size x size")
+    args = parser.parse_args()
+    run(args.origins, args.destinations, args.size)
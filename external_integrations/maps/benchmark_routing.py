@@ -0,0 +1,75 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+from .routing import HIGHWAY_SPEEDS_KMH, RoadGraph, _cost_matrix, _haversine_array
+
+def grid_city(size=300, spacing_deg=0.0008, seed=5):
+    """A size x size street grid over Bengaluru with mixed road classes, jittered nodes,
+    some one-way streets and some missing blocks."""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.divmod(np.arange(size * size), size)
+    lat = 12.85 + rows * spacing_deg + rng.normal(0, spacing_deg / 10, size * size)
+    lng = 77.48 + cols * spacing_deg + rng.normal(0, spacing_deg / 10, size * size)
+    ids = np.arange(size * size).reshape(size, size)
+    pairs = np.concatenate([
+        np.column_stack([ids[:, :-1].ravel(), ids[:, 1:].ravel()]),
+        np.column_stack([ids[:-1, :].ravel(), ids[1:, :].ravel()]),
+    ])
+    pairs = pairs[rng.random(len(pairs)) > 0.08]
+    # Every 10th street is an arterial, the rest residential
+    arterial = (rows[pairs[:, 0]] % 10 == 0) & (rows[pairs[:, 1]] % 10 == 0) \
+        | (cols[pairs[:, 0]] % 10 == 0) & (cols[pairs[:, 1]] % 10 == 0)
+    speed = np.where(arterial, HIGHWAY_SPEEDS_KMH["primary"], HIGHWAY_SPEEDS_KMH["residential"]) / 3.6
+    oneway = rng.random(len(pairs)) < 0.15
+    sources = np.concatenate([pairs[:, 0], pairs[~oneway, 1]])
+    targets = np.concatenate([pairs[:, 1], pairs[~oneway, 0]])
+    speed = np.concatenate([speed, speed[~oneway]])
+    length = _haversine_array(lat[sources], lng[sources], lat[targets], lng[targets])
+    return lat, lng, sources, targets, length, length / speed
+
+def run(size=300, queries=200, seed=9):
+    lat, lng, sources, targets, length, seconds = grid_city(size)
+    start = time.perf_counter()
+    graph = RoadGraph.from_edges(lat, lng, sources, targets, length, seconds)
+    build_s = time.perf_counter() - start
+
+    path = os.path.join(tempfile.mkdtemp(), "roads.npz")
+    graph.save(path)
+    start = time.perf_counter()
+    graph = RoadGraph.load(path)
+    load_s = time.perf_counter() - start
+    print(f"{len(graph)} nodes, {len(graph.fwd_indices)} edges: built in {build_s:.2f}s, "
+          f"loaded from {os.path.getsize(path) / 2 ** 20:.1f} MiB in {load_s * 1000:.0f}ms")
+
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, len(graph), (queries, 2))
+    # Reference answers from SciPy's Dijkstra on the graph as built (largest component only)
+    matrix = _cost_matrix(len(graph), np.repeat(np.arange(len(graph)), np.diff(graph.fwd_indptr)),
+                          graph.fwd_indices, graph.fwd_time.astype(np.float64))
+
+    timings, mismatches = [], 0
+    for source, target in pairs.tolist():
+        start = time.perf_counter()
+        cost, _ = graph.shortest_path(source, target)
+        timings.append(time.perf_counter() - start)
+        expected = dijkstra(matrix, indices=source)[target]
+        mismatches += not np.isclose(cost, expected, rtol=1e-4)
+    timings = np.array(timings) * 1000
+    print(f"{queries} bidirectional A* queries: median {np.median(timings):.1f}ms, "
+          f"p95 {np.percentile(timings, 95):.1f}ms, {mismatches} mismatches vs full Dijkstra")
+
+    start = time.perf_counter()
+    for _ in range(queries):
+        graph.route((float(rng.uniform(12.85, 12.85 + size * 0.0008)), float(rng.uniform(77.48, 77.48 + size * 0.0008))),
+                    (float(rng.uniform(12.85, 12.85 + size * 0.0008)), float(rng.uniform(77.48, 77.48 + size * 0.0008))))
+    print(f"{queries} snapped route() calls: {(time.perf_counter() - start) / queries * 1000:.1f}ms each")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time offline routing queries on a synthetic street grid")
+    parser.add_argument("--size", type=int, default=300, help="Grid is size x size intersections")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    run(args.size, args.queries)
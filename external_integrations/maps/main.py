@@ -1,2 +1,37 @@
-def get_route(start, end):
-    return f"Route from {start} to {end}"
\ No newline at end of file
+from .route_cache import create_route_cache
+from .routing import get_road_graph, haversine_m
+
+# Used when no road graph is available: straight line stretched by a typical detour factor
+DETOUR_FACTOR = 1.3
+FALLBACK_SPEED_KMH = 22.0
+
+route_cache = create_route_cache()
+
+def _coords(point):
+    if isinstance(point, dict):
+        return float(point["latitude"]), float(point["longitude"])
+    return float(point[0]), float(point[1])
+
+def _estimate(start, end):
+    distance_km = haversine_m(*start, *end) / 1000 * DETOUR_FACTOR
+    return {
+        "distance_km": round(distance_km, 3),
+        "duration_min": round(distance_km / FALLBACK_SPEED_KMH * 60, 2),
+        "path": [start, end],
+        "source": "haversine",
+    }
+
+def _graph_route(start, end):
+    return get_road_graph().route(start, end) or _estimate(start, end)
+
+def get_route(start, end, depart_at=None):
+    """Route between two (lat, lng) points (or dicts with latitude/longitude).
+
+    Returns distance_km, duration_min, path and source ('road_graph', or 'haversine' when the
+    offline graph has not been built or the points are not connected). Graph routes go
+    through route_cache, keyed on ~110 m cells and the time-of-day bucket of depart_at.
+    """
+    start, end = _coords(start), _coords(end)
+    if get_road_graph() is None:
+        return _estimate(start, end)
+    return route_cache.get_or_compute(start, end, _graph_route, depart_at)
@@ -0,0 +1,59 @@
+import numpy as np
+from .main import DETOUR_FACTOR, FALLBACK_SPEED_KMH, _coords
+from .routing import EARTH_RADIUS_M, get_road_graph
+
+def haversine_matrix_km(origins, destinations):
+    """Great-circle km from every origin (rows) to every destination (columns); points are
+    (lat, lng) pairs or an (n, 2) array."""
+    origins = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    destinations = np.radians(np.asarray(destinations, dtype=float).reshape(-1, 2))
+    lat1, lng1 = origins[:, :1], origins[:, 1:]
+    lat2, lng2 = destinations[:, 0][None, :], destinations[:, 1][None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M / 1000 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def distance_matrix(origins, destinations, mode="auto", max_eta_min=None, distances=True):
+    """N origins x M destinations of distance (km) and ETA (minutes).
+
+    mode 'road' searches the offline road graph: shortest road distance and fastest travel
+    time, one Dijkstra per point on the smaller side, sharing the graph's cached sparse
+    matrices. mode 'haversine' is vectorized great-circle math with the same detour factor
+    and speed as get_route's fallback. 'auto' uses the graph when it has been built.
+    Pairs beyond max_eta_min (road mode only) are inf. With distances=False road mode skips
+    the second (length) search and returns distances_km as None. Points too far from the
+    graph to snap get the haversine estimate in road mode, as get_route falls back for them.
+    """
+    origins = [_coords(point) for point in origins]
+    destinations = [_coords(point) for point in destinations]
+    graph = get_road_graph() if mode in ("auto", "road") else None
+    if mode == "road" and graph is None:
+        raise ValueError("Road graph has not been built")
+
+    if graph is None:
+        distances = haversine_matrix_km(origins, destinations) * DETOUR_FACTOR
+        return {"mode": "haversine", "distances_km": distances, "durations_min": distances / FALLBACK_SPEED_KMH * 60}
+
+    sources = [graph.snap(*point)[0] for point in origins]
+    targets = [graph.snap(*point)[0] for point in destinations]
+    rows = [i for i, node in enumerate(sources) if node is not None]
+    cols = [j for j, node in enumerate(targets) if node is not None]
+    limit = np.inf if max_eta_min is None else max_eta_min * 60
+
+    # Start from the estimate and overwrite the pairs whose both ends snapped
+    estimate_km = haversine_matrix_km(origins, destinations) * DETOUR_FACTOR
+    seconds = estimate_km / FALLBACK_SPEED_KMH * 3600
+    seconds[seconds > limit] = np.inf
+    snapped = np.ix_(rows, cols)
+    if rows and cols:
+        seconds[snapped] = graph.many_to_many([sources[i] for i in rows], [targets[j] for j in cols], "time", limit)
+    distances_km = None
+    if distances:
+        distances_km = estimate_km
+        if rows and cols:
+            distances_km[snapped] = graph.many_to_many([sources[i] for i in rows], [targets[j] for j in cols], "length") / 1000
+        distances_km[np.isinf(seconds)] = np.inf
+    return {"mode": "road", "distances_km": distances_km, "durations_min": seconds / 60}
+
+def to_json_matrix(matrix, digits=3):
+    """Nested lists with None for unreachable pairs."""
+    return [[None if np.isinf(value) else round(value, digits) for value in row] for row in np.asarray(matrix).tolist()]
@@ -0,0 +1,133 @@
+import collections
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "50000"))
+ROUTE_CACHE_TTL = int(os.getenv("ROUTE_CACHE_TTL", "900"))
+ROUTE_CACHE_CELL_DEG = float(os.getenv("ROUTE_CACHE_CELL_DEG", "0.001"))  # ~110 m
+ROUTE_CACHE_BUCKET_MINUTES = int(os.getenv("ROUTE_CACHE_BUCKET_MINUTES", "15"))
+ROUTE_CACHE_REDIS = os.getenv("ROUTE_CACHE_REDIS", "0") == "1"
+
+class RouteCache:
+    """LRU + TTL cache of routes keyed on quantized endpoints and time-of-day bucket.
+
+    Endpoints are snapped to the centre of a cell_deg grid cell and the route is computed
+    between the centres, so every request that falls in the same pair of cells and bucket
+    gets the same answer no matter who filled the entry. A local OrderedDict serves hits;
+    with a Redis client the entries are also shared between processes (local miss -> Redis
+    -> compute). Counters cover hits, misses, evictions and time spent on each path.
+    """
+
+    def __init__(self, maxsize=ROUTE_CACHE_SIZE, ttl=ROUTE_CACHE_TTL, cell_deg=ROUTE_CACHE_CELL_DEG,
+                 bucket_minutes=ROUTE_CACHE_BUCKET_MINUTES, redis_client=None, prefix="route"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cell_deg = cell_deg
+        self.bucket_minutes = bucket_minutes
+        self.redis = redis_client
+        self.prefix = prefix
+        self._entries = collections.OrderedDict()  # key -> (expires_at, route)
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+        self._seconds = collections.Counter()
+
+    def _cell(self, point):
+        return math.floor(point[0] / self.cell_deg), math.floor(point[1] / self.cell_deg)
+
+    def _centre(self, cell):
+        return ((cell[0] + 0.5) * self.cell_deg, (cell[1] + 0.5) * self.cell_deg)
+
+    def key(self, start, end, depart_at=None):
+        depart_at = depart_at or datetime.now()
+        bucket = (depart_at.hour * 60 + depart_at.minute) // self.bucket_minutes
+        return (self._cell(start), self._cell(end), bucket)
+
+    def get_or_compute(self, start, end, compute, depart_at=None):
+        """Cached route for start -> end, calling compute(start_centre, end_centre) on a miss."""
+        began = time.perf_counter()
+        key = self.key(start, end, depart_at)
+        route = self._get_local(key)
+        if route is not None:
+            self._record("hits", began)
+            return route
+
+        redis_key = None
+        if self.redis is not None:
+            redis_key = f"{self.prefix}:{key[0][0]}:{key[0][1]}:{key[1][0]}:{key[1][1]}:{key[2]}"
+            try:
+                cached = self.redis.get(redis_key)
+            except Exception as e:
+                print(f"Route cache Redis read failed: {e}")
+                cached = None
+            if cached is not None:
+                route = json.loads(cached)
+                self._put_local(key, route)
+                self._record("redis_hits", began)
+                return route
+
+        route = compute(self._centre(key[0]), self._centre(key[1]))
+        self._put_local(key, route)
+        if redis_key is not None:
+            try:
+                self.redis.set(redis_key, json.dumps(route), ex=self.ttl)
+            except Exception as e:
+                print(f"Route cache Redis write failed: {e}")
+        self._record("misses", began)
+        return route
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._counters["expired"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _put_local(self, key, route):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, route)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _record(self, outcome, began):
+        elapsed = time.perf_counter() - began
+        with self._lock:
+            self._counters[outcome] += 1
+            self._seconds[outcome] += elapsed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            counters, seconds, size = dict(self._counters), dict(self._seconds), len(self._entries)
+        lookups = sum(counters.get(name, 0) for name in ("hits", "redis_hits", "misses"))
+        stats = {
+            "size": size,
+            "lookups": lookups,
+            "hit_rate": round((counters.get("hits", 0) + counters.get("redis_hits", 0)) / lookups, 4) if lookups else 0.0,
+        }
+        for name in ("hits", "redis_hits", "misses", "evictions", "expired"):
+            stats[name] = counters.get(name, 0)
+        for name in ("hits", "redis_hits", "misses"):
+            count = counters.get(name, 0)
+            stats[f"avg_{name}_ms"] = round(seconds.get(name, 0.0) / count * 1000, 3) if count else None
+        return stats
+
+def create_route_cache():
+    redis_client = None
+    if ROUTE_CACHE_REDIS:
+        from backend.utils.redis_client import get_redis_client
+        redis_client = get_redis_client()
+    return RouteCache(redis_client=redis_client)
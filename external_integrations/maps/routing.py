@@ -0,0 +1,383 @@
+import argparse
+import heapq
+import math
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH", os.path.join(os.path.dirname(__file__), "data", "bengaluru_roads.npz"))
+
+EARTH_RADIUS_M = 6371000.0
+SNAP_CELL_DEG = 0.005  # ~550 m grid buckets for nearest-node lookup
+
+# Free-flow car speeds (km/h) per OSM highway class; ways of other classes are not routable
+HIGHWAY_SPEEDS_KMH = {
+    "motorway": 80, "motorway_link": 45, "trunk": 60, "trunk_link": 40,
+    "primary": 45, "primary_link": 35, "secondary": 40, "secondary_link": 30,
+    "tertiary": 35, "tertiary_link": 30, "unclassified": 25, "residential": 25,
+    "living_street": 10, "service": 15, "road": 25,
+}
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+def _csr(n_nodes, sources, targets, *weights):
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n_nodes), out=indptr[1:])
+    return (indptr, targets[order].astype(np.int32)) + tuple(weight[order].astype(np.float32) for weight in weights)
+
+def _speed_kmh(tags):
+    maxspeed = tags.get("maxspeed", "").split()
+    if maxspeed and maxspeed[0].isdigit():
+        return float(maxspeed[0]) * (1.609 if "mph" in maxspeed else 1.0)
+    return float(HIGHWAY_SPEEDS_KMH[tags["highway"]])
+
+def parse_osm(osm_path):
+    """Routable car edges from an OSM XML extract: (lat, lng, sources, targets, length_m, time_s)."""
+    coords = {}
+    edges = []  # (osm node a, osm node b, speed m/s)
+    refs, tags = [], {}
+    for _, elem in ET.iterparse(osm_path, events=("end",)):
+        if elem.tag == "node":
+            coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+        elif elem.tag == "nd":
+            refs.append(int(elem.get("ref")))
+            continue
+        elif elem.tag == "tag":
+            tags[elem.get("k")] = elem.get("v")
+            continue
+        elif elem.tag == "way":
+            if tags.get("highway") in HIGHWAY_SPEEDS_KMH and tags.get("access") not in ("no", "private"):
+                speed = _speed_kmh(tags) / 3.6
+                oneway = tags.get("oneway", "no")
+                if tags["highway"] == "motorway" or tags.get("junction") == "roundabout":
+                    oneway = tags.get("oneway", "yes")
+                for a, b in zip(refs, refs[1:]):
+                    if oneway != "-1":
+                        edges.append((a, b, speed))
+                    if oneway not in ("yes", "1", "true"):
+                        edges.append((b, a, speed))
+            refs, tags = [], {}
+        elif elem.tag == "relation":
+            refs, tags = [], {}
+        elem.clear()
+
+    used = sorted({node for a, b, _ in edges for node in (a, b) if node in coords})
+    index = {node: i for i, node in enumerate(used)}
+    lat = np.array([coords[node][0] for node in used])
+    lng = np.array([coords[node][1] for node in used])
+    edges = [(index[a], index[b], speed) for a, b, speed in edges if a in index and b in index]
+    sources = np.array([a for a, _, _ in edges], dtype=np.int64)
+    targets = np.array([b for _, b, _ in edges], dtype=np.int64)
+    speeds = np.array([speed for _, _, speed in edges])
+    length_m = _haversine_array(lat[sources], lng[sources], lat[targets], lng[targets])
+    return lat, lng, sources, targets, length_m, length_m / speeds
+
+def _haversine_array(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def _cost_matrix(n_nodes, sources, targets, costs):
+    """Sparse cost matrix keeping the cheapest of any parallel edges (csr_matrix would sum them)."""
+    order = np.lexsort((costs, targets, sources))
+    sources, targets, costs = sources[order], targets[order], costs[order]
+    first = np.ones(len(sources), dtype=bool)
+    first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+    return csr_matrix((costs[first], (sources[first], targets[first])), shape=(n_nodes, n_nodes))
+
+class RoadGraph:
+    """Directed road graph in CSR form with a snapping grid and bidirectional A* queries.
+
+    Only the largest strongly connected component is kept, so every snapped pair of points
+    has a route. Forward and reverse adjacency are stored as indptr/indices/length/time
+    arrays; together with the grid and the landmark tables they are saved to one .npz, so
+    loading is a handful of array reads. Edge costs are travel times.
+
+    The A* bounds come from landmarks (ALT): exact travel times to and from a few far-apart
+    nodes, precomputed at build time. By the triangle inequality they never overestimate,
+    so results are exact shortest times, and they are far tighter than straight-line bounds.
+    """
+
+    ARRAYS = ("lat", "lng", "fwd_indptr", "fwd_indices", "fwd_length", "fwd_time",
+              "bwd_indptr", "bwd_indices", "bwd_length", "bwd_time", "cell_keys", "cell_starts", "cell_nodes",
+              "landmark_from", "landmark_to")
+    QUERY_LANDMARKS = 4
+    BOUND_SLACK_S = 0.01  # absorbs float32 rounding in the landmark tables
+
+    def __init__(self, arrays, cell_deg=SNAP_CELL_DEG):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.cell_deg = float(cell_deg)
+        # Plain lists are several times faster than NumPy scalars inside the search loops
+        self._lat, self._lng = self.lat.tolist(), self.lng.tolist()
+        self._fwd = (self.fwd_indptr.tolist(), self.fwd_indices.tolist(), self.fwd_time.tolist())
+        self._fwd_length = self.fwd_length.tolist()
+        self._cost_matrices = {}
+        self._bwd = (self.bwd_indptr.tolist(), self.bwd_indices.tolist(), self.bwd_time.tolist())
+        self._cos_lat = math.cos(math.radians(float(self.lat.mean()))) if len(self.lat) else 1.0
+        starts = self.cell_starts.tolist()
+        self._cells = {key: (starts[i], starts[i + 1]) for i, key in enumerate(self.cell_keys.tolist())}
+
+    def __len__(self):
+        return len(self.lat)
+
+    @classmethod
+    def from_edges(cls, lat, lng, sources, targets, length_m, time_s, cell_deg=SNAP_CELL_DEG, landmarks=8):
+        lat, lng = np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64)
+        sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+        length_m, time_s = np.asarray(length_m, dtype=np.float64), np.asarray(time_s, dtype=np.float64)
+
+        # Keep the largest strongly connected component and renumber its nodes
+        _, labels = connected_components(_cost_matrix(len(lat), sources, targets, time_s), connection="strong")
+        keep = labels == np.bincount(labels).argmax()
+        new_id = np.cumsum(keep) - 1
+        inside = keep[sources] & keep[targets]
+        lat, lng = lat[keep], lng[keep]
+        sources, targets = new_id[sources[inside]], new_id[targets[inside]]
+        length_m, time_s = length_m[inside], time_s[inside]
+
+        arrays = {"lat": lat, "lng": lng}
+        for prefix, (a, b) in (("fwd", (sources, targets)), ("bwd", (targets, sources))):
+            indptr, indices, length, time = _csr(len(lat), a, b, length_m, time_s)
+            arrays.update({f"{prefix}_indptr": indptr, f"{prefix}_indices": indices,
+                           f"{prefix}_length": length, f"{prefix}_time": time})
+        keys = cls._cell_key(np.floor(lat / cell_deg), np.floor(lng / cell_deg))
+        order = np.argsort(keys, kind="stable")
+        cell_keys, cell_starts = np.unique(keys[order], return_index=True)
+        arrays.update(cell_keys=cell_keys, cell_starts=np.append(cell_starts, len(order)).astype(np.int64),
+                      cell_nodes=order.astype(np.int32))
+        arrays["landmark_from"], arrays["landmark_to"] = cls._select_landmarks(
+            _cost_matrix(len(lat), sources, targets, time_s), landmarks)
+        return cls(arrays, cell_deg)
+
+    @staticmethod
+    def _select_landmarks(matrix, count):
+        """Farthest-point landmarks; returns (count, n) tables of times from and to each."""
+        n = matrix.shape[0]
+        count = min(count, n)
+        from_rows, to_rows = [], []
+        nearest = np.full(n, np.inf)
+        landmark = 0
+        for _ in range(count):
+            from_landmark = dijkstra(matrix, indices=landmark)
+            to_landmark = dijkstra(matrix.T.tocsr(), indices=landmark)
+            from_rows.append(from_landmark)
+            to_rows.append(to_landmark)
+            nearest = np.minimum(nearest, from_landmark + to_landmark)
+            landmark = int(nearest.argmax())
+        return np.array(from_rows, dtype=np.float32), np.array(to_rows, dtype=np.float32)
+
+    @classmethod
+    def from_osm(cls, osm_path, cell_deg=SNAP_CELL_DEG, landmarks=8):
+        return cls.from_edges(*parse_osm(osm_path), cell_deg=cell_deg, landmarks=landmarks)
+
+    @classmethod
+    def load(cls, path=ROAD_GRAPH_PATH):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in cls.ARRAYS}
+            return cls(arrays, float(data["cell_deg"]))
+
+    def save(self, path=ROAD_GRAPH_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, cell_deg=self.cell_deg, **{name: getattr(self, name) for name in self.ARRAYS})
+
+    @staticmethod
+    def _cell_key(row, col):
+        return (np.asarray(row, dtype=np.int64) << 32) + (np.asarray(col, dtype=np.int64) & 0xFFFFFFFF)
+
+    def snap(self, lat, lng, max_rings=8):
+        """Nearest graph node to a coordinate, searching grid rings outward; (node, metres)."""
+        row, col = math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+        best, best_m = None, float("inf")
+        for ring in range(max_rings + 1):
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    span = self._cells.get((r << 32) + (c & 0xFFFFFFFF))
+                    if span is None:
+                        continue
+                    for node in self.cell_nodes[span[0]:span[1]].tolist():
+                        d = haversine_m(lat, lng, self._lat[node], self._lng[node])
+                        if d < best_m:
+                            best, best_m = node, d
+            # Anything in a further ring is at least `ring` cells away
+            if best is not None and best_m <= ring * self.cell_deg * 111000 * self._cos_lat:
+                break
+        return best, best_m
+
+    def _potential(self, source, target):
+        """p(v) = (h_t(v) - h_s(v)) / 2, where h_t(v) <= time(v -> target) and h_s(v) <= time(source -> v)
+        come from the landmarks that give the best bound on the whole trip."""
+        lf, lt = self.landmark_from, self.landmark_to
+        trip = np.maximum(lt[:, source] - lt[:, target], lf[:, target] - lf[:, source])
+        chosen = np.argsort(trip)[::-1][:self.QUERY_LANDMARKS].tolist()
+        rows = [(lf[k].item, lt[k].item, lf[k, target].item(), lt[k, target].item(),
+                 lf[k, source].item(), lt[k, source].item()) for k in chosen]
+        slack = self.BOUND_SLACK_S
+        cache = {}
+
+        def potential(v):
+            value = cache.get(v)
+            if value is None:
+                h_t = h_s = 0.0
+                for from_l, to_l, from_l_t, to_l_t, from_l_s, to_l_s in rows:
+                    from_v, to_v = from_l(v), to_l(v)
+                    # Triangle inequality through the landmark, both ways round
+                    if to_v - to_l_t > h_t:
+                        h_t = to_v - to_l_t
+                    if from_l_t - from_v > h_t:
+                        h_t = from_l_t - from_v
+                    if from_v - from_l_s > h_s:
+                        h_s = from_v - from_l_s
+                    if to_l_s - to_v > h_s:
+                        h_s = to_l_s - to_v
+                value = cache[v] = (max(h_t - slack, 0.0) - max(h_s - slack, 0.0)) / 2
+            return value
+
+        return potential
+
+    def shortest_path(self, source, target):
+        """Bidirectional A* on travel time: (seconds, [node, ...]) or (inf, []) if unreachable.
+
+        Both searches use the averaged potential p(v) = (h_t(v) - h_s(v)) / 2, which keeps
+        reduced costs non-negative in both directions, so the usual bidirectional stopping
+        rule (top keys sum to at least the best meeting cost) stays exact.
+        """
+        if source == target:
+            return 0.0, [source]
+        p = self._potential(source, target)
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: -1}, {target: -1})
+        heaps = ([(p(source), source)], [(-p(target), target)])
+        settled = (set(), set())
+        graphs = (self._fwd, self._bwd)
+        signs = (1.0, -1.0)
+        best, meet = float("inf"), -1
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            key, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+            indptr, indices, costs = graphs[side]
+            d_u = dist[side][u]
+            this_dist, other_dist, this_parent = dist[side], dist[1 - side], parent[side]
+            sign = signs[side]
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                d_v = d_u + costs[i]
+                if d_v < this_dist.get(v, float("inf")):
+                    this_dist[v] = d_v
+                    this_parent[v] = u
+                    heapq.heappush(heaps[side], (d_v + sign * p(v), v))
+                    if v in other_dist and d_v + other_dist[v] < best:
+                        best, meet = d_v + other_dist[v], v
+        if meet < 0:
+            return float("inf"), []
+        path = []
+        node = meet
+        while node != -1:
+            path.append(node)
+            node = parent[0][node]
+        path.reverse()
+        node = parent[1][meet]
+        while node != -1:
+            path.append(node)
+            node = parent[1][node]
+        return best, path
+
+    def path_length_m(self, path):
+        indptr, indices, _ = self._fwd
+        total = 0.0
+        for u, v in zip(path, path[1:]):
+            total += min(self._fwd_length[i] for i in range(indptr[u], indptr[u + 1]) if indices[i] == v)
+        return total
+
+    def cost_matrix(self, weight="time", reverse=False):
+        """Sparse node x node matrix of edge times or lengths, built once and shared by all
+        many-to-many queries."""
+        key = (weight, reverse)
+        if key not in self._cost_matrices:
+            sources = np.repeat(np.arange(len(self)), np.diff(self.fwd_indptr))
+            costs = (self.fwd_time if weight == "time" else self.fwd_length).astype(np.float64)
+            if reverse:
+                matrix = _cost_matrix(len(self), self.fwd_indices.astype(np.int64), sources, costs)
+            else:
+                matrix = _cost_matrix(len(self), sources, self.fwd_indices.astype(np.int64), costs)
+            self._cost_matrices[key] = matrix
+        return self._cost_matrices[key]
+
+    def many_to_many(self, sources, targets, weight="time", limit=np.inf):
+        """Shortest times (s) or lengths (m) from every source node to every target node.
+
+        Runs one SciPy Dijkstra per node on the smaller side: forward from the sources, or
+        backward over the reversed graph from the targets. `limit` stops each search early;
+        pairs beyond it come back as inf.
+        """
+        sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+        if len(sources) <= len(targets):
+            unique, inverse = np.unique(sources, return_inverse=True)
+            rows = dijkstra(self.cost_matrix(weight), indices=unique, limit=limit)
+            return rows[inverse][:, targets]
+        unique, inverse = np.unique(targets, return_inverse=True)
+        rows = dijkstra(self.cost_matrix(weight, reverse=True), indices=unique, limit=limit)
+        return rows[inverse][:, sources].T
+
+    def route(self, start, end):
+        """Snap two (lat, lng) points and return distance, duration and geometry, or None."""
+        source, source_m = self.snap(*start)
+        target, target_m = self.snap(*end)
+        if source is None or target is None:
+            return None
+        seconds, path = self.shortest_path(source, target)
+        if not path:
+            return None
+        return {
+            "distance_km": round(self.path_length_m(path) / 1000, 3),
+            "duration_min": round(seconds / 60, 2),
+            "path": [(self._lat[node], self._lng[node]) for node in path],
+            "snap_m": round(max(source_m, target_m), 1),
+            "source": "road_graph",
+        }
+
+_graph = None
+_graph_missing = False
+
+def get_road_graph(path=ROAD_GRAPH_PATH):
+    """The preprocessed graph, loaded once; None when no graph file has been built."""
+    global _graph, _graph_missing
+    if _graph is None and not _graph_missing:
+        if os.path.exists(path):
+            _graph = RoadGraph.load(path)
+        else:
+            print(f"No road graph at {path}; routes fall back to straight-line estimates")
+            _graph_missing = True
+    return _graph
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preprocess an OSM extract into the routing graph, or query it")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("osm_path")
+    build.add_argument("--out", default=ROAD_GRAPH_PATH)
+    query = sub.add_parser("route")
+    query.add_argument("coords", nargs=4, type=float, metavar=("FROM_LAT", "FROM_LNG", "TO_LAT", "TO_LNG"))
+    query.add_argument("--graph", default=ROAD_GRAPH_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        graph = RoadGraph.from_osm(args.osm_path)
+        graph.save(args.out)
+        print(f"Saved {len(graph)} nodes and {len(graph.fwd_indices)} edges to {args.out}")
+    else:
+        result = RoadGraph.load(args.graph).route(tuple(args.coords[:2]), tuple(args.coords[2:]))
+        print(result and {key: value for key, value in result.items() if key != "path"})